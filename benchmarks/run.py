@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark ChromeSeleniumDrive against a stub WebDriver or a real Chrome.
+
+    python -m benchmarks.run --mode stub --output bench.json
+    python -m benchmarks.run --mode real --iterations 20
+
+Measures session creation, navigation plus wait_page_load, scrap_tab_two
+and scrap_tabs pages per minute, and wait_for_selector latency. Results are
+written as JSON with percentiles.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from os.path import abspath, dirname, join
+from time import perf_counter
+
+sys.path.append(abspath("."))
+
+import selenium
+from selenium import webdriver
+
+from chrome_manager.chrome_driver import ChromeSeleniumDrive
+from chrome_manager.version_cache import browser_version
+from benchmarks.stub_webdriver import StubConfig, StubWebDriver
+
+FIXTURES_DIR = join(dirname(abspath(__file__)), "fixtures")
+
+
+def percentiles(samples) -> dict:
+    """Summarize samples in seconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 6)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "min": round(ordered[0], 6),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 6),
+    }
+
+
+class FixtureServer:
+    """Serve the fixture pages from a local http.server."""
+
+    def __init__(self) -> None:
+        handler = partial(_QuietHandler, directory=FIXTURES_DIR)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, page="page.html") -> str:
+        """Return the URL of a fixture page."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{page}"
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def remote_factory(executor_url):
+    """Return a driver_factory opening webdriver.Remote sessions on executor_url."""
+
+    def create(service, options):  # pylint: disable=unused-argument
+        return webdriver.Remote(command_executor=executor_url, options=options)
+
+    return create
+
+
+class StubChromeSeleniumDrive(ChromeSeleniumDrive):
+    """ChromeSeleniumDrive talking to the stub server through webdriver.Remote."""
+
+    def __init__(self, executor_url, **kwargs) -> None:
+        super().__init__(service=None, driver_factory=remote_factory(executor_url), **kwargs)
+        self.executor_url = executor_url
+
+
+def make_drive_factory(mode, stub):
+    """Return a callable building a new, not yet started, drive."""
+    if mode == "stub":
+        return lambda: StubChromeSeleniumDrive(stub.url, headless=True)
+    from chrome_manager.service import create_service  # pylint: disable=import-outside-toplevel
+
+    return lambda: ChromeSeleniumDrive(service=create_service(), headless=True)
+
+
+def bench_session_creation(factory, iterations) -> dict:
+    """Time create_driver followed by quit."""
+    samples = []
+    for _ in range(iterations):
+        drive = factory()
+        started = perf_counter()
+        drive.create_driver()
+        samples.append(perf_counter() - started)
+        drive.quit()
+    return percentiles(samples)
+
+
+def bench_navigation(drive, url, iterations) -> dict:
+    """Time driver.get plus wait_page_load."""
+    samples = []
+    for _ in range(iterations):
+        started = perf_counter()
+        drive.driver.get(url)
+        loaded = drive.wait_page_load(wait_time=10, verbose=False)
+        samples.append(perf_counter() - started)
+        assert loaded, f"{url} did not load: {loaded!r}"
+    return percentiles(samples)
+
+
+def bench_scrap_tab_two(drive, url, iterations) -> dict:
+    """Time scrap_tab_two and report pages per minute."""
+    samples = []
+    for _ in range(iterations):
+        started = perf_counter()
+        html = drive.scrap_tab_two(url, wait_time=0)
+        samples.append(perf_counter() - started)
+        assert html is not None, f"scrap_tab_two returned None for {url}"
+    result = percentiles(samples)
+    result["pages_per_minute"] = round(60 * len(samples) / sum(samples), 2) if samples else 0
+    return result
+
+
+def bench_scrap_tabs(drive, url, iterations, tabs) -> dict:
+    """Time scrap_tabs over iterations URLs and report pages per minute."""
+    samples = []
+    started = perf_counter()
+    for page_url, html, timings in drive.scrap_tabs([url] * iterations, tabs=tabs, wait_time=30):
+        assert html is not None, f"scrap_tabs returned None for {page_url}"
+        samples.append(timings["total"])
+    assert len(samples) == iterations, f"scrap_tabs returned {len(samples)} of {iterations} pages"
+    elapsed = perf_counter() - started
+    result = percentiles(samples)
+    result["tabs"] = tabs
+    result["pages_per_minute"] = round(60 * len(samples) / elapsed, 2) if elapsed else 0
+    return result
+
+
+def bench_wait_helpers(drive, url, iterations) -> dict:
+    """Time wait_for_selector on an element added after page load."""
+    samples = []
+    for _ in range(iterations):
+        drive.driver.get(url)
+        started = perf_counter()
+        element = drive.wait_for_selector("#late", wait_time=10)
+        samples.append(perf_counter() - started)
+        assert element is not None, "wait_for_selector did not find #late"
+    return percentiles(samples)
+
+
+def run(mode="auto", iterations=10, tabs=4, config=None) -> dict:
+    """Run every benchmark and return the results."""
+    if mode == "auto":
+        mode = "real" if browser_version() else "stub"
+    config = config or StubConfig()
+    fixtures = FixtureServer()
+    stub = StubWebDriver(config).start() if mode == "stub" else None
+    factory = make_drive_factory(mode, stub)
+    url = fixtures.url()
+    try:
+        results = {"session_creation": bench_session_creation(factory, max(1, iterations // 2))}
+        drive = factory()
+        drive.create_driver()
+        try:
+            results["navigation"] = bench_navigation(drive, url, iterations)
+            results["scrap_tab_two"] = bench_scrap_tab_two(drive, url, iterations)
+            results["scrap_tabs"] = bench_scrap_tabs(drive, url, iterations, tabs)
+            results["wait_for_selector"] = bench_wait_helpers(drive, url, iterations)
+        finally:
+            drive.quit()
+    finally:
+        fixtures.stop()
+        if stub:
+            stub.stop()
+
+    return {
+        "mode": mode,
+        "iterations": iterations,
+        "python": platform.python_version(),
+        "selenium": selenium.__version__,
+        "stub_config": config.as_dict() if mode == "stub" else None,
+        "results": results,
+    }
+
+
+def main(argv=None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("auto", "stub", "real"), default="auto")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--tabs", type=int, default=4)
+    parser.add_argument("--output", help="JSON file for the results, stdout when missing.")
+    parser.add_argument("--command-latency", type=float, default=StubConfig().command_latency)
+    parser.add_argument("--session-latency", type=float, default=StubConfig().session_latency)
+    parser.add_argument("--navigation-latency", type=float, default=StubConfig().navigation_latency)
+    parser.add_argument("--load-latency", type=float, default=StubConfig().load_latency)
+    parser.add_argument("--selector-delay", type=float, default=StubConfig().selector_delay)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        command_latency=args.command_latency,
+        session_latency=args.session_latency,
+        navigation_latency=args.navigation_latency,
+        load_latency=args.load_latency,
+        selector_delay=args.selector_delay,
+    )
+    report = run(mode=args.mode, iterations=args.iterations, tabs=args.tabs, config=config)
+    data = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as output_file:
+            output_file.write(data)
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
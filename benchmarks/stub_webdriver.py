@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+
+"""Minimal W3C WebDriver HTTP server with configurable latencies.
+
+It answers the commands ChromeSeleniumDrive sends, keeps windows and
+navigation state in memory and serves page sources fetched from a local
+fixture server, so benchmarks run without Chrome or network access.
+"""
+
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.request import urlopen
+
+from chrome_manager import browser_contexts, tab_fetcher
+from chrome_manager.load_strategies import (
+    PREDICATE_SCRIPT,
+    READY_STATE_SCRIPT,
+    RESOURCE_IDLE_SCRIPT,
+    TIMINGS_SCRIPT,
+)
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+LOAD_SCRIPTS = (READY_STATE_SCRIPT, RESOURCE_IDLE_SCRIPT, TIMINGS_SCRIPT)
+PREDICATE_PREFIX = PREDICATE_SCRIPT.split("__PREDICATE__", 1)[0]
+
+
+class StubConfig:
+    """Latencies, in seconds, simulated by the stub server."""
+
+    def __init__(
+        self,
+        command_latency=0.002,
+        session_latency=0.2,
+        navigation_latency=0.05,
+        load_latency=0.05,
+        selector_delay=0.02,
+    ) -> None:
+        self.command_latency = command_latency
+        self.session_latency = session_latency
+        self.navigation_latency = navigation_latency
+        self.load_latency = load_latency
+        self.selector_delay = selector_delay
+
+    def as_dict(self) -> dict:
+        """Return the config as a plain dict."""
+        return dict(vars(self))
+
+
+class _Window:
+    """A tab of a stub session."""
+
+    def __init__(self) -> None:
+        self.url = "about:blank"
+        self.source = "<html><head></head><body></body></html>"
+        self.interactive_at = 0.0
+        self.complete_at = 0.0
+
+    def ready_state(self) -> str:
+        now = monotonic()
+        if now >= self.complete_at:
+            return "complete"
+        return "interactive" if now >= self.interactive_at else "loading"
+
+
+class _Session:
+    """State of one stub session."""
+
+    def __init__(self) -> None:
+        first = _Window()
+        self.windows = {uuid.uuid4().hex: first}
+        self.current = next(iter(self.windows))
+        self.lock = threading.Lock()
+
+    def window(self) -> _Window:
+        return self.windows[self.current]
+
+    def new_window(self) -> str:
+        handle = uuid.uuid4().hex
+        self.windows[handle] = _Window()
+        return handle
+
+
+class WebDriverError(Exception):
+    """W3C error answered to the client."""
+
+    def __init__(self, status, error, message="") -> None:
+        super().__init__(message)
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+class StubWebDriver:
+    """Stub server running on a background thread."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0) -> None:
+        self.config = config or StubConfig()
+        self.sessions = {}
+        self.commands = 0
+        handler = type("Handler", (_Handler,), {"stub": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Command executor URL for webdriver.Remote."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving in the background."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _navigate(self, window, url, blocking) -> None:
+        config = self.config
+        with urlopen(url) as response:
+            window.source = response.read().decode("utf8", errors="replace")
+        window.url = url
+        now = monotonic()
+        window.interactive_at = now + config.navigation_latency
+        window.complete_at = window.interactive_at + config.load_latency
+        if blocking:
+            sleep(config.navigation_latency)
+
+    def _find(self, session, selector, multiple):
+        window = session.window()
+        if "missing" in selector or monotonic() < window.interactive_at + self.config.selector_delay:
+            return [] if multiple else None
+        element = {ELEMENT_KEY: f"{session.current}-{abs(hash(selector))}"}
+        return [element] if multiple else element
+
+    @staticmethod
+    def _wait_load(window, target, timeout_ms):
+        # Every load strategy other than DOMContentLoaded settles at complete.
+        target = "interactive" if target == "interactive" else "complete"
+        ranks = {"loading": 0, "interactive": 1, "complete": 2}
+        started = monotonic()
+        deadline = started + timeout_ms / 1000
+        while ranks[window.ready_state()] < ranks[target] and monotonic() < deadline:
+            sleep(0.005)
+        state = window.ready_state()
+        return {
+            "ok": ranks[state] >= ranks[target],
+            "value": None,
+            "state": state,
+            "timings": {},
+            "waited_ms": int((monotonic() - started) * 1000),
+        }
+
+    def _execute(self, session, script, args, asynchronous):
+        window = session.window()
+        if asynchronous and (script in LOAD_SCRIPTS or script.startswith(PREDICATE_PREFIX)):
+            return self._wait_load(window, args[0], args[1])
+        if asynchronous:
+            selector, multiple, timeout_ms = args[0], args[1], args[2]
+            deadline = monotonic() + timeout_ms / 1000
+            while True:
+                found = self._find(session, selector, multiple)
+                if found or monotonic() >= deadline:
+                    return found or None
+                sleep(0.005)
+        if script in (tab_fetcher.NAVIGATE_SCRIPT, browser_contexts.NAVIGATE_SCRIPT):
+            self._navigate(window, args[0], blocking=False)
+            return None
+        if script == tab_fetcher.STATE_SCRIPT:
+            return [False, window.ready_state()]
+        if "document.readyState" in script:
+            return window.ready_state()
+        if "window.open" in script:
+            session.new_window()
+            return None
+        if "window.close" in script:
+            del session.windows[session.current]
+            return None
+        if re.search(r"return\s+1\s*;?", script):
+            return 1
+        return None
+
+    def dispatch(self, method, path, body):
+        """Answer one WebDriver command, return its value."""
+        self.commands += 1
+        sleep(self.config.command_latency)
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["status"]:
+            return {"ready": True, "message": "stub"}
+        if parts == ["session"] and method == "POST":
+            sleep(self.config.session_latency)
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = _Session()
+            return {
+                "sessionId": session_id,
+                "capabilities": {
+                    "browserName": "chrome",
+                    "browserVersion": "stub",
+                    "chrome": {"chromedriverVersion": "stub"},
+                    "pageLoadStrategy": "eager",
+                },
+            }
+
+        session = self.sessions.get(parts[1]) if len(parts) > 1 else None
+        if session is None:
+            raise WebDriverError(404, "invalid session id", "No such session")
+        command = "/".join(parts[2:])
+
+        with session.lock:
+            if method == "DELETE" and not command:
+                del self.sessions[parts[1]]
+                return None
+            if command not in ("window", "window/handles", "window/new") and session.current not in session.windows:
+                raise WebDriverError(404, "no such window", "Window was closed")
+            return self._session_command(session, method, command, body)
+
+    def _session_command(self, session, method, command, body):
+        # pylint: disable=too-many-return-statements,too-many-branches
+        if command == "url":
+            if method == "POST":
+                self._navigate(session.window(), body["url"], blocking=True)
+                return None
+            return session.window().url
+        if command == "title":
+            match = re.search(r"<title>(.*?)</title>", session.window().source, re.S)
+            return match.group(1) if match else ""
+        if command == "source":
+            return session.window().source
+        if command in ("execute/sync", "execute/async"):
+            return self._execute(session, body["script"], body.get("args", []), command == "execute/async")
+        if command == "window":
+            if method == "GET":
+                if session.current not in session.windows:
+                    raise WebDriverError(404, "no such window", "Window was closed")
+                return session.current
+            if method == "POST":
+                if body["handle"] not in session.windows:
+                    raise WebDriverError(404, "no such window", "Unknown handle")
+                session.current = body["handle"]
+                return None
+            session.windows.pop(session.current, None)
+            return list(session.windows)
+        if command == "window/handles":
+            return list(session.windows)
+        if command == "window/new":
+            return {"handle": session.new_window(), "type": "tab"}
+        if command in ("element", "elements"):
+            found = self._find(session, body.get("value", ""), command == "elements")
+            if found is None:
+                raise WebDriverError(404, "no such element", "Element not found")
+            return found
+        if command.startswith("element/") and command.endswith("/click"):
+            return None
+        if command.startswith("alert"):
+            raise WebDriverError(404, "no such alert", "No alert open")
+        if command in ("timeouts", "cookie", "window/maximize"):
+            return None
+        raise WebDriverError(404, "unknown command", f"{method} {command}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    stub = None
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _answer(self):
+        length = int(self.headers.get("content-length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        try:
+            status, payload = 200, {"value": self.stub.dispatch(self.command, self.path, body)}
+        except WebDriverError as error:
+            status = error.status
+            payload = {"value": {"error": error.error, "message": error.message, "stacktrace": ""}}
+        data = json.dumps(payload).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_DELETE = _answer
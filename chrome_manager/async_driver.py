@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""asyncio front-end for ChromeSeleniumDrive."""
+
+import asyncio
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from chrome_manager.chrome_driver import ChromeSeleniumDrive
+from chrome_manager.load_strategies import LoadResult
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_LAUNCH_LIMIT = 4
+
+# A semaphore binds to the first loop that waits on it, so one per loop.
+_LAUNCH_SEMAPHORES = weakref.WeakKeyDictionary()
+
+
+def launch_semaphore(limit=None) -> asyncio.Semaphore:
+    """Return the semaphore shared by the async sessions of the running loop to cap browser launches.
+
+    Passing limit replaces the semaphore of the running loop.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _LAUNCH_SEMAPHORES.get(loop)
+    if limit is not None or semaphore is None:
+        semaphore = _LAUNCH_SEMAPHORES[loop] = asyncio.Semaphore(limit or DEFAULT_LAUNCH_LIMIT)
+    return semaphore
+
+
+class AsyncChromeSeleniumDrive:
+    """Run a ChromeSeleniumDrive from asyncio code.
+
+    Every WebDriver command runs on a single worker thread owned by the
+    session, so commands to one browser stay serialized. Waits are split in
+    short slices, so cancelling them (asyncio.wait_for, task.cancel) frees the
+    session after at most wait_slice seconds.
+    """
+
+    def __init__(self, drive=None, semaphore=None, wait_slice=0.5, **drive_kwargs) -> None:
+        self.drive = drive if drive is not None else ChromeSeleniumDrive(**drive_kwargs)
+        self.semaphore = semaphore
+        self.wait_slice = wait_slice
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chrome-session")
+
+    async def __aenter__(self):
+        if self.drive.driver is None:
+            await self.create_driver()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.quit()
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking call on the session thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def create_driver(self, options=None):
+        """Launch the browser, waiting for a free launch slot."""
+        semaphore = self.semaphore or launch_semaphore()
+        await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self.drive.create_driver, options)
+        # The launch keeps running in its thread when the caller is cancelled,
+        # so only give the slot back once it really finished.
+        future.add_done_callback(lambda _: semaphore.release())
+        return await asyncio.shield(future)
+
+    async def get(self, url) -> None:
+        """Navigate to url."""
+        await self.run(self.drive.driver.get, url)
+
+    async def execute_script(self, script, *args):
+        """Run script in the current page."""
+        return await self.run(self.drive.driver.execute_script, script, *args)
+
+    async def page_source(self) -> str:
+        """Return the current page source."""
+        return await self.run(lambda: self.drive.driver.page_source)
+
+    async def _sliced_wait(self, func, wait_time, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_time
+        while True:
+            remaining = max(0, deadline - loop.time())
+            result = await self.run(func, *args, wait_time=min(self.wait_slice, remaining), **kwargs)
+            if result or loop.time() >= deadline:
+                return result
+
+    async def wait_for_selector(self, selector, wait_time=10, click=False):
+        """Async version of ChromeSeleniumDrive.wait_for_selector."""
+        return await self._sliced_wait(self.drive.wait_for_selector, wait_time, selector, click=click)
+
+    async def wait_for_selectors(self, selector, wait_time=10, click=False):
+        """Async version of ChromeSeleniumDrive.wait_for_selectors."""
+        return await self._sliced_wait(self.drive.wait_for_selectors, wait_time, selector, click=click)
+
+    async def wait_for_alert(self, wait_time=10) -> bool:
+        """Async version of ChromeSeleniumDrive.wait_for_alert."""
+        return await self._sliced_wait(self.drive.wait_for_alert, wait_time)
+
+    async def wait_page_load(self, wait_time=2, states=("complete",), interval=0.1, strategy=None) -> LoadResult:
+        """Wait for document.readyState to be one of states, the result is falsy on timeout.
+
+        With strategy, run ChromeSeleniumDrive.wait_page_load on the session
+        thread instead, cancelling frees the session only once the strategy
+        gives up.
+        """
+        if strategy is not None:
+            return await self.run(self.drive.wait_page_load, wait_time, verbose=False, strategy=strategy)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + wait_time
+        while True:
+            state = await self.execute_script("return document.readyState;")
+            if state in states or loop.time() >= deadline:
+                return LoadResult(state in states, "readyState", loop.time() - started, state)
+            await asyncio.sleep(min(interval, max(0, deadline - loop.time())))
+
+    async def scrap_tab_two(self, url, wait_time=2, load_strategy="load"):
+        """Async version of ChromeSeleniumDrive.scrap_tab_two."""
+        return await self.run(self.drive.scrap_tab_two, url, wait_time=wait_time, load_strategy=load_strategy)
+
+    async def scrap_tabs(self, urls, tabs=4, wait_time=45):
+        """Async generator version of ChromeSeleniumDrive.scrap_tabs."""
+        results = self.drive.scrap_tabs(urls, tabs=tabs, wait_time=wait_time)
+        try:
+            while True:
+                item = await self.run(next, results, None)
+                if item is None:
+                    return
+                yield item
+        finally:
+            await self.run(results.close)
+
+    async def close(self) -> None:
+        """Close the current window."""
+        await self.run(self.drive.close)
+
+    async def quit(self) -> None:
+        """Quit the browser and release the session thread."""
+        try:
+            await self.run(self.drive.quit)
+        finally:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""Named resource blocking policies applied with CDP Network.setBlockedURLs."""
+
+import logging
+import threading
+
+from chrome_manager.perf_log import performance_log
+
+LOG = logging.getLogger(__name__)
+
+EXTENSIONS_BY_TYPE = {
+    "Image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "Stylesheet": ("css",),
+    "Font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "Media": ("mp4", "webm", "mp3", "ogg", "wav", "m4a", "m3u8"),
+    "Script": ("js", "mjs"),
+}
+
+# Average transfer size per resource type, used to estimate bytes saved
+# since a blocked request never tells how big it would have been.
+ESTIMATED_BYTES = {
+    "Image": 60 * 1024,
+    "Stylesheet": 30 * 1024,
+    "Font": 40 * 1024,
+    "Media": 500 * 1024,
+    "Script": 80 * 1024,
+}
+DEFAULT_ESTIMATED_BYTES = 20 * 1024
+
+TRACKER_DOMAINS = (
+    "doubleclick.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "scorecardresearch.com",
+    "criteo.com",
+    "amazon-adsystem.com",
+    "taboola.com",
+    "outbrain.com",
+)
+
+
+def _domain_matches(domain, other) -> bool:
+    return domain == other or domain.endswith("." + other)
+
+
+class BlockingPolicy:
+    """Resource types, URL globs and domains a session should not download.
+
+    exempt_domains only take entries, and their subdomains, out of
+    deny_domains, e.g. to keep one tracker a site needs. It is not an
+    allowlist: hosts on neither list are never blocked, since
+    Network.setBlockedURLs can only block. Resource types are matched by
+    file extension globs, so they apply to every host, exempt ones too.
+    Domains go in URLPattern syntax, where a host wildcard stays inside the
+    host; a plain glob like *.doubleclick.net/* also matches the domain in
+    the query string of any other site.
+    """
+
+    def __init__(self, name, resource_types=(), url_patterns=(), deny_domains=(), exempt_domains=()) -> None:
+        self.name = name
+        self.resource_types = tuple(resource_types)
+        self.url_patterns = tuple(url_patterns)
+        self.deny_domains = tuple(deny_domains)
+        self.exempt_domains = tuple(exempt_domains)
+
+    def patterns(self) -> list:
+        """Return the wildcard patterns for the urls of Network.setBlockedURLs."""
+        patterns = list(self.url_patterns)
+        for resource_type in self.resource_types:
+            for extension in EXTENSIONS_BY_TYPE.get(resource_type, ()):
+                patterns.extend((f"*.{extension}", f"*.{extension}?*"))
+        return patterns
+
+    def domain_patterns(self) -> list:
+        """Return the URLPattern strings for the urlPatterns of Network.setBlockedURLs."""
+        patterns = []
+        for domain in self.deny_domains:
+            if any(_domain_matches(domain, exempt) for exempt in self.exempt_domains):
+                continue
+            patterns.extend((f"*://{domain}/*", f"*://*.{domain}/*"))
+        return patterns
+
+
+POLICIES = {}
+
+
+def register_policy(policy) -> BlockingPolicy:
+    """Make a policy available by name."""
+    POLICIES[policy.name] = policy
+    return policy
+
+
+register_policy(BlockingPolicy("none"))
+register_policy(BlockingPolicy("images", resource_types=("Image",)))
+register_policy(BlockingPolicy("no-trackers", deny_domains=TRACKER_DOMAINS))
+register_policy(
+    BlockingPolicy(
+        "lean",
+        resource_types=("Image", "Stylesheet", "Font", "Media"),
+        deny_domains=TRACKER_DOMAINS,
+    )
+)
+
+
+def get_policy(policy) -> BlockingPolicy:
+    """Accept a policy or the name of a registered one."""
+    if isinstance(policy, BlockingPolicy):
+        return policy
+    try:
+        return POLICIES[policy]
+    except KeyError as error:
+        raise ValueError(f"Unknown blocking policy {policy!r}") from error
+
+
+class ResourceBlocker:
+    """Apply a BlockingPolicy to the tabs of a driver and count what it blocks.
+
+    Counters come from Network.loadingFailed events of the performance log,
+    which must be enabled in the session options. stats, as returned by
+    stats(), carries the counters of a previous session over.
+    """
+
+    def __init__(self, driver, policy="none", stats=None) -> None:
+        self.driver = driver
+        self.policy = get_policy(policy)
+        self._stats = {
+            name: dict(counters, by_type=dict(counters["by_type"])) for name, counters in (stats or {}).items()
+        }
+        self._lock = threading.Lock()
+        performance_log(driver).subscribe("Network.loadingFailed", self._on_loading_failed)
+
+    def set_policy(self, policy) -> None:
+        """Switch policy and apply it to the current tab."""
+        self.collect()
+        self.policy = get_policy(policy)
+        self.apply()
+
+    def apply(self) -> None:
+        """Apply the policy to the current tab, CDP Network state is per tab."""
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd(
+            "Network.setBlockedURLs",
+            {
+                "urls": self.policy.patterns(),
+                "urlPatterns": [{"urlPattern": pattern, "block": True} for pattern in self.policy.domain_patterns()],
+            },
+        )
+
+    def _on_loading_failed(self, params, _entry) -> None:
+        if params.get("blockedReason") != "inspector":
+            return
+        resource_type = params.get("type", "Other")
+        with self._lock:
+            stats = self._stats.setdefault(
+                self.policy.name, {"blocked": 0, "bytes_saved": 0, "by_type": {}}
+            )
+            stats["blocked"] += 1
+            stats["bytes_saved"] += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+            stats["by_type"][resource_type] = stats["by_type"].get(resource_type, 0) + 1
+
+    def collect(self) -> None:
+        """Read pending performance log events into the counters."""
+        performance_log(self.driver).poll()
+
+    def stats(self, collect=True) -> dict:
+        """Return blocked requests and estimated bytes saved per policy.
+
+        collect=False skips reading the log, e.g. once the browser is gone.
+        """
+        if collect:
+            self.collect()
+        with self._lock:
+            return {
+                name: dict(stats, by_type=dict(stats["by_type"]))
+                for name, stats in self._stats.items()
+            }
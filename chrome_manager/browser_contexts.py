@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""Isolated sessions sharing one Chrome through CDP browser contexts."""
+
+import logging
+import threading
+from time import monotonic, perf_counter
+
+from selenium.common.exceptions import WebDriverException
+
+from chrome_manager.extraction import ExtractionResult
+from chrome_manager.load_strategies import PredicateStrategy
+from chrome_manager.page_capture import CHUNK_SIZE
+
+LOG = logging.getLogger(__name__)
+
+# The flag lives on the old document, so its absence means the new one is in.
+NAVIGATE_SCRIPT = "window.__cmNavigating = true; window.location.href = arguments[0];"
+NEW_DOCUMENT = PredicateStrategy("return !window.__cmNavigating;", name="new document")
+
+
+class ContextHost:
+    """Create browser contexts on the browser of a ChromeSeleniumDrive.
+
+    Each context has its own cookies, storage and cache and one tab. The
+    drive talks to one window at a time, so sessions switch to their tab
+    under lock, and waits are cut in slices of wait_slice seconds to let
+    other sessions in between.
+    """
+
+    def __init__(self, drive, wait_slice=0.25) -> None:
+        self.drive = drive
+        self.wait_slice = wait_slice
+        self.lock = threading.RLock()
+        self.sessions = {}
+        self.default_handle = drive.driver.current_window_handle
+
+    def new_session(self, proxy=None, url="about:blank") -> "ContextSession":
+        """Create a browser context with one tab and return its session."""
+        started = perf_counter()
+        with self.lock:
+            driver = self.drive.driver
+            params = {"disposeOnDetach": False}
+            if proxy:
+                params["proxyServer"] = proxy
+            context_id = driver.execute_cdp_cmd("Target.createBrowserContext", params)["browserContextId"]
+            try:
+                target_id = driver.execute_cdp_cmd(
+                    "Target.createTarget", {"url": url, "browserContextId": context_id}
+                )["targetId"]
+                # chromedriver uses the DevTools target id as window handle.
+                if target_id not in driver.window_handles:
+                    raise RuntimeError(f"Target {target_id} has no window handle.")
+            except BaseException:
+                driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+                raise
+            session = ContextSession(self, context_id, target_id)
+            self.sessions[target_id] = session
+            self.switch(target_id)
+            self.drive.prepare_tab()
+        LOG.info(f"Contexto {context_id} criado em {perf_counter() - started:.3f}s.")
+        return session
+
+    def switch(self, handle) -> None:
+        """Make handle the window the drive talks to, the lock must be held.
+
+        Always switches: scrap_tab_two, TabFetcher, restart and the pool
+        move the drive between windows too, so a cached handle goes stale.
+        """
+        self.drive.driver.switch_to.window(handle)
+
+    def owns(self, handle) -> bool:
+        """Tell if handle is the tab of one of the context sessions."""
+        return handle in self.sessions
+
+    def dispose(self, session) -> None:
+        """Close the tab and the browser context of session."""
+        with self.lock:
+            self.sessions.pop(session.handle, None)
+            driver = self.drive.driver
+            try:
+                driver.execute_cdp_cmd("Target.closeTarget", {"targetId": session.handle})
+                driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": session.context_id})
+            except WebDriverException as error:
+                LOG.info(f"Falha ao descartar contexto {session.context_id}: {error!r}")
+            self.switch(self.default_handle)
+
+    def close(self) -> None:
+        """Dispose every session, the browser keeps running."""
+        for session in list(self.sessions.values()):
+            session.close()
+
+
+class ContextSession:
+    """One isolated browser context, with the ChromeSeleniumDrive helpers."""
+
+    def __init__(self, host, context_id, handle) -> None:
+        self.host = host
+        self.context_id = context_id
+        self.handle = handle
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def call(self, func, *args, **kwargs):
+        """Run func(drive, ...) with this session tab selected."""
+        if self.closed:
+            raise RuntimeError("Context session is closed.")
+        with self.host.lock:
+            self.host.switch(self.handle)
+            return func(self.host.drive, *args, **kwargs)
+
+    def _sliced(self, method, wait_time, *args, **kwargs):
+        deadline = monotonic() + wait_time
+        while True:
+            remaining = max(0, deadline - monotonic())
+            result = self.call(method, *args, wait_time=min(self.host.wait_slice, remaining), **kwargs)
+            if result or monotonic() >= deadline:
+                return result
+
+    def get(self, url) -> None:
+        """Start loading url without waiting for it, see wait_page_load."""
+        self.call(lambda drive: drive.driver.execute_script(NAVIGATE_SCRIPT, url))
+
+    def execute_script(self, script, *args):
+        """Run script in this session page."""
+        return self.call(lambda drive: drive.driver.execute_script(script, *args))
+
+    @property
+    def page_source(self) -> str:
+        """Return this session page source."""
+        return self.call(lambda drive: drive.driver.page_source)
+
+    def get_cookies(self) -> list:
+        """Return the cookies of this context."""
+        return self.call(lambda drive: drive.driver.get_cookies())
+
+    def wait_page_load(self, wait_time=10, strategy="load"):
+        """See ChromeSeleniumDrive.wait_page_load."""
+        return self._sliced(
+            lambda drive, wait_time: drive.wait_page_load(wait_time=wait_time, verbose=False, strategy=strategy),
+            wait_time,
+        )
+
+    def wait_for_selector(self, selector, wait_time=10, click=False):
+        """See ChromeSeleniumDrive.wait_for_selector."""
+        return self._sliced(
+            lambda drive, wait_time: drive.wait_for_selector(selector, wait_time=wait_time, click=click), wait_time
+        )
+
+    def wait_for_selectors(self, selector, wait_time=10, click=False):
+        """See ChromeSeleniumDrive.wait_for_selectors."""
+        return self._sliced(
+            lambda drive, wait_time: drive.wait_for_selectors(selector, wait_time=wait_time, click=click), wait_time
+        )
+
+    def extract(self, spec, ready_selectors=(), ready_state="interactive", wait_time=10) -> ExtractionResult:
+        """See ChromeSeleniumDrive.extract."""
+        return self._sliced(
+            lambda drive, wait_time: drive.extract(
+                spec, ready_selectors=ready_selectors, ready_state=ready_state, wait_time=wait_time
+            ),
+            wait_time,
+        )
+
+    def save_page_source(self, dest, compress=None, chunk_size=CHUNK_SIZE) -> int:
+        """See ChromeSeleniumDrive.save_page_source."""
+        return self.call(lambda drive: drive.save_page_source(dest, compress=compress, chunk_size=chunk_size))
+
+    def scrap(self, url, wait_time=45, spec=None, load_strategy="load") -> None | str | dict:
+        """Load url in this context and return its page source or spec fields.
+
+        Return None when the page does not load within wait_time. Pages count
+        in the session_health of the drive, recycling is left to the drive
+        since a restart ends every context.
+        """
+        started = perf_counter()
+        try:
+            return self._scrap(url, wait_time, spec, load_strategy)
+        finally:
+            health = self.host.drive.session_health
+            if health:
+                with self.host.lock:
+                    health.record_page(perf_counter() - started)
+
+    def _scrap(self, url, wait_time, spec, load_strategy):
+        deadline = monotonic() + wait_time
+        self.get(url)
+        if not self.wait_page_load(wait_time=wait_time, strategy=NEW_DOCUMENT):
+            return None
+        if not self.wait_page_load(wait_time=max(0, deadline - monotonic()), strategy=load_strategy):
+            return None
+        if spec:
+            return self.extract(spec, wait_time=0).data
+        return self.page_source
+
+    def close(self) -> None:
+        """Dispose the browser context."""
+        if not self.closed:
+            self.closed = True
+            self.host.dispose(self)
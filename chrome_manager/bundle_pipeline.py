@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""Download, hash and unzip an archive in one pass, then publish it atomically."""
+
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import stat
+import struct
+import tempfile
+import threading
+import zlib
+from os.path import abspath, basename, dirname, exists, join
+
+from chrome_manager.downloader import shared_session
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+QUEUE_CHUNKS = 64
+
+LOCAL_HEADER = b"PK\x03\x04"
+CENTRAL_HEADER = b"PK\x01\x02"
+DATA_DESCRIPTOR = b"PK\x07\x08"
+END_HEADERS = (b"PK\x05\x06", b"PK\x06\x06")
+LOCAL_FIELDS = struct.Struct("<HHHHHIIIHH")
+CENTRAL_FIELDS = struct.Struct("<HHHHHHIIIHHHHHII")
+FLAG_DATA_DESCRIPTOR = 0x08
+STORED, DEFLATED = 0, 8
+
+
+class _ChunkStream:
+    """Bounded queue of network chunks read as a file by the extractor."""
+
+    def __init__(self) -> None:
+        self._queue = queue.Queue(QUEUE_CHUNKS)
+        self._buffer = b""
+        self._eof = False
+        self.aborted = threading.Event()
+
+    def put(self, chunk) -> None:
+        """Hand a chunk to the extractor, dropping it when extraction stopped."""
+        while not self.aborted.is_set():
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self) -> None:
+        """Mark the end of the download."""
+        self.put(None)
+
+    def _fill(self, size) -> None:
+        parts = [self._buffer]
+        available = len(self._buffer)
+        while available < size and not self._eof:
+            chunk = self._queue.get()
+            if chunk is None:
+                self._eof = True
+                break
+            parts.append(chunk)
+            available += len(chunk)
+        self._buffer = b"".join(parts)
+
+    def read(self, size) -> bytes:
+        """Return exactly size bytes, fewer only at the end of the archive."""
+        self._fill(size)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def read_some(self, limit=CHUNK_SIZE) -> bytes:
+        """Return up to limit bytes, whatever is buffered or the next chunk."""
+        if not self._buffer:
+            self._fill(1)
+        data, self._buffer = self._buffer[:limit], self._buffer[limit:]
+        return data
+
+    def unread(self, data) -> None:
+        """Push back bytes read past the end of a member."""
+        self._buffer = data + self._buffer
+
+    def drain(self) -> None:
+        """Consume the rest of the download."""
+        while not self._eof:
+            self._buffer = b""
+            self._fill(1)
+
+
+def _zip64_sizes(extra, compressed, uncompressed):
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<HH", extra, offset)
+        if header_id == 0x0001:
+            values = iter(struct.unpack_from(f"<{size // 8}Q", extra, offset + 4))
+            if uncompressed == 0xFFFFFFFF:
+                uncompressed = next(values)
+            if compressed == 0xFFFFFFFF:
+                compressed = next(values)
+            return compressed, uncompressed, True
+        offset += 4 + size
+    return compressed, uncompressed, False
+
+
+def _member_path(dest_dir, name) -> str:
+    path = abspath(join(dest_dir, name))
+    if not path.startswith(abspath(dest_dir) + os.sep):
+        raise IOError(f"Caminho invalido no arquivo: {name!r}.")
+    return path
+
+
+def _read_descriptor(stream, zip64) -> int:
+    """Consume the data descriptor after a member and return its CRC."""
+    descriptor = stream.read(4)
+    if descriptor != DATA_DESCRIPTOR:
+        stream.unread(descriptor)
+    crc = struct.unpack("<I", stream.read(4))[0]
+    stream.read(16 if zip64 else 8)
+    return crc
+
+
+def _extract_member(stream, dest_dir) -> None:
+    fields = LOCAL_FIELDS.unpack(stream.read(LOCAL_FIELDS.size))
+    _, flags, method, _, _, crc, compressed, uncompressed, name_len, extra_len = fields
+    name = stream.read(name_len).decode("utf8" if flags & 0x800 else "cp437")
+    compressed, uncompressed, zip64 = _zip64_sizes(stream.read(extra_len), compressed, uncompressed)
+    path = _member_path(dest_dir, name)
+    streamed = bool(flags & FLAG_DATA_DESCRIPTOR)
+    if name.endswith("/"):
+        os.makedirs(path, exist_ok=True)
+        if streamed:
+            _read_descriptor(stream, zip64)
+        return
+
+    if method not in (STORED, DEFLATED) or (streamed and method == STORED):
+        raise ValueError(f"Formato de membro nao suportado: {name!r}.")
+
+    os.makedirs(dirname(path), exist_ok=True)
+    decompressor = zlib.decompressobj(-15) if method == DEFLATED else None
+    written_crc = 0
+    with open(path, "wb") as member_file:
+        remaining = compressed
+        while (streamed and not decompressor.eof) or (not streamed and remaining):
+            chunk = stream.read_some(CHUNK_SIZE if streamed else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise IOError(f"Arquivo truncado em {name!r}.")
+            remaining -= len(chunk)
+            data = decompressor.decompress(chunk) if decompressor else chunk
+            written_crc = zlib.crc32(data, written_crc)
+            member_file.write(data)
+        if decompressor:
+            if streamed and decompressor.unused_data:
+                stream.unread(decompressor.unused_data)
+            tail = decompressor.flush()
+            written_crc = zlib.crc32(tail, written_crc)
+            member_file.write(tail)
+
+    if streamed:
+        crc = _read_descriptor(stream, zip64)
+    if written_crc != crc:
+        raise IOError(f"CRC invalido em {name!r}.")
+
+
+def _read_central(stream):
+    fields = CENTRAL_FIELDS.unpack(stream.read(CENTRAL_FIELDS.size))
+    made_by, flags = fields[0], fields[2]
+    name_len, extra_len, comment_len, external_attr = fields[9], fields[10], fields[11], fields[14]
+    name = stream.read(name_len).decode("utf8" if flags & 0x800 else "cp437")
+    stream.read(extra_len + comment_len)
+    # Only archives made on unix carry st_mode in the high 16 bits.
+    return name, external_attr >> 16 if made_by >> 8 == 3 else 0
+
+
+def _apply_modes(dest_dir, modes) -> None:
+    for name, mode in modes.items():
+        if not mode or name.endswith("/"):
+            continue
+        path = _member_path(dest_dir, name)
+        if stat.S_ISLNK(mode):
+            with open(path, encoding="utf8") as link_file:
+                target = link_file.read()
+            os.remove(path)
+            os.symlink(target, path)
+        else:
+            os.chmod(path, stat.S_IMODE(mode))
+
+
+def _extract_stream(stream, dest_dir) -> None:
+    modes = {}
+    while True:
+        signature = stream.read(4)
+        if signature == LOCAL_HEADER:
+            _extract_member(stream, dest_dir)
+        elif signature == CENTRAL_HEADER:
+            name, mode = _read_central(stream)
+            modes[name] = mode
+        elif signature in END_HEADERS:
+            # End of central directory, nothing left to extract.
+            break
+        else:
+            raise IOError("Arquivo zip invalido ou truncado.")
+    stream.drain()
+    _apply_modes(dest_dir, modes)
+
+
+def stream_extract(url, dest_dir, session=None, expected_sha256=None, progress=None, timeout=30) -> str:
+    """Download a zip from url and extract it into dest_dir while it arrives.
+
+    The response is hashed as it is read and members are written by a worker
+    thread as soon as their bytes come in, the archive itself never touches
+    the disk. Return the sha256 of the archive, raise IOError when it does
+    not match expected_sha256.
+    """
+    session = session or shared_session()
+    stream = _ChunkStream()
+    failure = []
+
+    def extract():
+        try:
+            _extract_stream(stream, dest_dir)
+        except BaseException as error:  # pylint: disable=broad-except
+            failure.append(error)
+            stream.aborted.set()
+
+    worker = threading.Thread(target=extract, name="bundle-extract", daemon=True)
+    worker.start()
+    digest = hashlib.sha256()
+    try:
+        with session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            total = int(response.headers.get("Content-Length", 0))
+            downloaded = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if stream.aborted.is_set():
+                    break
+                digest.update(chunk)
+                stream.put(chunk)
+                downloaded += len(chunk)
+                if progress:
+                    progress(downloaded, total)
+    finally:
+        stream.close()
+        worker.join()
+
+    if failure:
+        raise failure[0]
+    sha256 = digest.hexdigest()
+    if expected_sha256 and sha256 != expected_sha256.lower():
+        raise IOError(f"Hash inesperado para {url}.")
+    return sha256
+
+
+def publish_dir(staging, dest_dir) -> None:
+    """Move a finished staging folder to dest_dir with renames only.
+
+    A new dest_dir appears in one rename. Replacing an existing one takes
+    two, so between them dest_dir does not exist and a reader may see it
+    missing; the old tree is never half overwritten though. Directories
+    cannot be swapped atomically on every platform, callers that must
+    never see the gap publish into versioned folders and switch a symlink
+    with os.replace, as ChromeDownloader.install_linux does.
+    """
+    os.chmod(staging, 0o755)
+    if not exists(dest_dir):
+        os.rename(staging, dest_dir)
+        return
+    old = tempfile.mkdtemp(prefix=f".{basename(dest_dir)}.old.", dir=dirname(dest_dir))
+    os.rename(dest_dir, join(old, "tree"))
+    os.rename(staging, dest_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def download_and_extract(url, dest_dir, session=None, expected_sha256=None, progress=None, timeout=30) -> str:
+    """Stream extract url into a staging folder next to dest_dir and publish it.
+
+    Return the sha256 of the archive. dest_dir is left untouched on errors,
+    see publish_dir for what readers see while it is replaced.
+    """
+    os.makedirs(dirname(abspath(dest_dir)), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{basename(dest_dir)}.", dir=dirname(abspath(dest_dir)))
+    try:
+        sha256 = stream_extract(
+            url, staging, session=session, expected_sha256=expected_sha256, progress=progress, timeout=timeout
+        )
+        publish_dir(staging, dest_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return sha256
@@ -4,9 +4,9 @@
 
 import logging
 import sys
-from os.path import expanduser, join, abspath, dirname
+from os.path import expanduser, join, abspath, dirname, isdir
 from random import random, randrange
-from time import sleep
+from time import monotonic, perf_counter, sleep
 
 from selenium import webdriver
 from selenium.webdriver.remote.webelement import WebElement
@@ -21,14 +21,27 @@ from selenium.common.exceptions import (
     NoSuchElementException,
     WebDriverException,
 )
-from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.remote_connection import LOGGER as SELENIUM_LOGGER
 from urllib3.exceptions import MaxRetryError, NewConnectionError
-from webdriver_manager.core.utils import ChromeType, get_browser_version_from_os
+from webdriver_manager.core.utils import ChromeType
 
 sys.path.append(abspath("."))
 
+from chrome_manager.blocking import ResourceBlocker
+from chrome_manager.browser_contexts import ContextHost
+from chrome_manager.crx import unpacked_extension_dir
+from chrome_manager.extraction import ExtractionResult, extract
+from chrome_manager.instrumentation import instrumented
+from chrome_manager.load_strategies import LoadResult, get_strategy
+from chrome_manager.page_capture import CHUNK_SIZE, iter_page_source, save_page_source
+from chrome_manager.perf_log import enable_performance_log, performance_log
+from chrome_manager.procfs import drive_pid
+from chrome_manager.recycling import SessionHealth
+from chrome_manager.screenshots import ScreenshotPipeline
 from chrome_manager.service import create_service
+from chrome_manager.tab_fetcher import TabFetcher
+from chrome_manager.version_cache import browser_version, pinned_binary, pinned_version
+from chrome_manager.waits import poll_with_backoff, wait_for_css
 
 SELENIUM_LOGGER.setLevel(logging.ERROR)
 
@@ -48,15 +61,43 @@ class ChromeSeleniumDrive:
         user_data_dir=None,
         profile=None,
         silent=False,
+        profile_template=None,
+        blocking_policy=None,
+        instrumentation=None,
+        recycle_policy=None,
+        page_cache=None,
+        chrome_root=None,
+        driver_factory=None,
     ) -> None:
         super().__init__()
         self.silent = silent
+        self.instrumentation = instrumentation
+        self.recycle_policy = recycle_policy
+        self.page_cache = page_cache
+        self.performance_log_enabled = False
+        self.context_host = None
+        self.screenshot_pipeline = None
+        self.session_health = None
+        self.recycles = 0
+        self._options = None
+        self.blocking_policy = blocking_policy
+        self.blocker = None
+        self.profile_template = profile_template
+        self.profile_clone = None
+        # Run the Chrome pinned by ChromeDownloader.install_linux, True for its default root.
+        self.chrome_root = chrome_root
+        # Called as driver_factory(service=..., options=...), webdriver.Chrome when None.
+        self.driver_factory = driver_factory
 
         self._driver = None
         self.headless = headless
         self.maximize = maximize
         self.service = service
 
+        self.user_agent = (
+            "Mozilla/5.0 (Windows NT 4.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) "
+            f"Chrome/{pinned_version(chrome_root) if chrome_root else browser_version(ChromeType.GOOGLE)} Safari/537.36"
+        )
         # https://peter.sh/experiments/chromium-command-line-switches/
         self.chrome_args = [
             # "--disable-notifications", # NÃO PASSA NAS PERMISSÕES
@@ -91,9 +132,14 @@ class ChromeSeleniumDrive:
             "--allow-running-insecure-content",
             "--window-position=0,0",
             f"--window-size={width},{height}",
-            f"--user-agent=Mozilla/5.0 (Windows NT 4.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{get_browser_version_from_os(ChromeType.GOOGLE)} Safari/537.36",
+            f"--user-agent={self.user_agent}",
         ]
 
+        if profile_template:
+            # Each session gets its own copy, so parallel sessions do not clash.
+            self.profile_clone = profile_template.clone()
+            user_data_dir = self.profile_clone
+
         if user_data_dir:
             if isinstance(user_data_dir, bool):
                 user_data_dir = join(expanduser("~"), ".chrome_storage")
@@ -104,10 +150,19 @@ class ChromeSeleniumDrive:
                 profile = "Default"
             self.chrome_args.append(rf"--profile-directory={profile}")
 
-    def set_options(self, extensions=None, proxy=None):
-        """Setup ChromeOptions."""
+    def set_options(self, extensions=None, proxy=None, unpack_extensions=False, performance_log=False):
+        """Setup ChromeOptions.
+
+        Extensions are packed into the capabilities with add_extension. With
+        unpack_extensions they are unpacked once into a cache and loaded with
+        --load-extension instead, which saves the per launch base64 payload
+        but is ignored by branded Google Chrome 137+, so only use it with
+        Chromium or Chrome for Testing builds.
+        """
         options = webdriver.ChromeOptions()
         options.page_load_strategy = "eager"
+        if self.chrome_root:
+            options.binary_location = pinned_binary("chrome", self.chrome_root)
 
         # https://tarunlalwani.com/post/selenium-disable-image-loading-different-browsers/
         chrome_prefs = dict()
@@ -121,6 +176,10 @@ class ChromeSeleniumDrive:
         if proxy:
             options.add_argument(f"--proxy-server=https://{proxy}")
 
+        if performance_log or self.blocking_policy:
+            enable_performance_log(options)
+            self.performance_log_enabled = True
+
         if self.headless:
             self.maximize = False
             self.chrome_args.append("--headless")
@@ -128,7 +187,10 @@ class ChromeSeleniumDrive:
         for arg in self.chrome_args:
             options.add_argument(arg)
 
-        if extensions:
+        if extensions and unpack_extensions:
+            ext_dirs = [ext if isdir(ext) else unpacked_extension_dir(ext) for ext in extensions]
+            options.add_argument(f"--load-extension={','.join(ext_dirs)}")
+        elif extensions:
             for ext in extensions:
                 options.add_extension(ext)
         else:
@@ -137,10 +199,12 @@ class ChromeSeleniumDrive:
 
     def create_driver(self, options=None) -> webdriver.Chrome:
         """Create a configured Chrome driver."""
+        # Kept for restart(), set_options is not meant to run twice.
+        self._options = options if options else self.set_options()
         try:
-            self._driver = webdriver.Chrome(
+            self._driver = (self.driver_factory or webdriver.Chrome)(
                 service=self.service,
-                options=options if options else self.set_options(),
+                options=self._options,
             )
             if self.silent:
                 LOG.info(
@@ -160,6 +224,18 @@ class ChromeSeleniumDrive:
         except KeyboardInterrupt:
             sys.exit(0)
 
+        if self.instrumentation:
+            self.instrumentation.attach(self._driver)
+
+        if self.blocking_policy:
+            # restart() keeps the counts of the previous browser.
+            previous = self.blocker.stats(collect=False) if self.blocker else None
+            self.blocker = ResourceBlocker(self._driver, self.blocking_policy, stats=previous)
+            self.blocker.apply()
+
+        if self.recycle_policy:
+            self.session_health = SessionHealth(self.recycle_policy)
+
         if self.maximize:
             print()
             print()
@@ -169,29 +245,36 @@ class ChromeSeleniumDrive:
 
         return self._driver
 
+    @instrumented
     def wait_for_alert(self, wait_time=10) -> None | bool:
         """Aguarda um alert ser clicado."""
-        while True:
-            try:
-                alert = self._driver.switch_to.alert
-                LOG.info(f"Switch to Success! -> {alert}")
-                return True
-            except NoAlertPresentException:
-                sleep(1)
-                wait_time -= 1
-            if wait_time <= 0:
-                break
+        alert = poll_with_backoff(
+            lambda: self._driver.switch_to.alert,
+            wait_time=wait_time,
+            ignored=(NoAlertPresentException,),
+            sleep_func=self._sleep,
+        )
+        if alert:
+            LOG.info(f"Switch to Success! -> {alert}")
+            return True
         return False
 
-    def wait_for_selector(self, selector, wait_time=10, click=False) -> WebElement:
-        """Wait for CSS and Selector."""
-        counter = 0
-        while counter < wait_time:
+    def _sleep(self, seconds) -> None:
+        if self.instrumentation:
+            self.instrumentation.sleep(seconds)
+        else:
+            sleep(seconds)
+
+    def _wait_css(self, selector, wait_time, click, multiple):
+        deadline = monotonic() + wait_time
+        while True:
             try:
-                element = self._driver.find_element(By.CSS_SELECTOR, selector)
+                element = wait_for_css(
+                    self._driver, selector, deadline - monotonic(), multiple=multiple, sleep_func=self._sleep
+                )
                 if element:
                     if click:
-                        element.click()
+                        (element[0] if multiple else element).click()
                     return element
             except (
                 WebDriverException,
@@ -200,83 +283,220 @@ class ChromeSeleniumDrive:
                 ElementClickInterceptedException,
                 InvalidSessionIdException,
                 JavascriptException,
-                ElementNotInteractableException,
             ):
                 pass
-            counter += 0.1
-            sleep(1)
+            if monotonic() >= deadline:
+                return None
+            self._sleep(min(0.1, max(0, deadline - monotonic())))
 
-    def wait_for_selectors(self, selector, wait_time=10, click=False) -> WebElement:
+    @instrumented
+    def wait_for_selector(self, selector, wait_time=10, click=False) -> WebElement:
         """Wait for CSS and Selector."""
-        counter = 0
-        while counter < wait_time:
-            try:
-                element = self._driver.find_elements(By.CSS_SELECTOR, selector)
-                if element:
-                    if click:
-                        element.click()
-                    return element
-            except (
-                WebDriverException,
-                NoSuchElementException,
-                ElementNotInteractableException,
-                ElementClickInterceptedException,
-                InvalidSessionIdException,
-                JavascriptException,
-                ElementNotInteractableException,
-            ):
-                pass
-            counter += 1
-            sleep(1)
-
-    def wait_page_load(self, wait_time=2, verbose=True) -> bool:
-        """Wait page complete load."""
-        load_counter = 0
-        states = ["complete"]
-        while self._driver.execute_script("return document.readyState;") not in states:
-            if load_counter == wait_time:
-                break
-            if verbose:
-                print(self._driver.execute_script("return document.readyState;"))
-            sleep(1)
-            load_counter += 1
-        return True
-
-    def scrap_tab_two(self, url, wait_time=2) -> None | str:
+        return self._wait_css(selector, wait_time, click, multiple=False)
+
+    @instrumented
+    def wait_for_selectors(self, selector, wait_time=10, click=False) -> list[WebElement]:
+        """Wait for CSS and Selector."""
+        return self._wait_css(selector, wait_time, click, multiple=True)
+
+    @instrumented
+    def wait_page_load(self, wait_time=2, verbose=True, strategy="load") -> LoadResult:
+        """Wait page load for at most wait_time seconds.
+
+        strategy is "domcontentloaded", "load", "networkidle0", "networkidle2"
+        or a strategy object (see load_strategies). The result is falsy on
+        timeout and carries the navigation timings.
+        """
+        result = get_strategy(strategy).wait(
+            self._driver, wait_time, sleep_func=self._sleep, network_events=self.performance_log_enabled
+        )
+        self.drain_performance_log()
+        if verbose and not result:
+            print(result.state)
+        return result
+
+    @instrumented
+    def scrap_tab_two(
+        self, url, wait_time=2, spec=None, stream_to=None, compress=None, use_cache=True, load_strategy="load"
+    ) -> None | str | dict:
+        """Load url in a second tab and return its page source.
+
+        With spec, return only the fields of that extraction spec (see extract).
+        With stream_to, write the source there in chunks and return stream_to.
+        With recycle_policy, the browser may be restarted before loading.
+        With page_cache, page sources are served from and stored in it.
+        The page is read as soon as load_strategy is satisfied; it is
+        refreshed after 30s and given up after 45s.
+        """
+        cacheable = self.page_cache is not None and use_cache and spec is None and stream_to is None
+        if cacheable:
+            page_html = self.page_cache.get(url, self.cache_variant)
+            if page_html is not None:
+                return page_html
+
+        self.recycle_if_needed()
+        started = perf_counter()
+        try:
+            page_html = self._scrap_tab_two(url, wait_time, spec, stream_to, compress, load_strategy)
+        finally:
+            if self.session_health:
+                self.session_health.record_page(perf_counter() - started)
+        if cacheable and page_html:
+            self.page_cache.put(url, page_html, self.cache_variant)
+        return page_html
+
+    @property
+    def cache_variant(self) -> str:
+        """Return the session settings that change what a page looks like."""
+        policy = getattr(self.blocking_policy, "name", self.blocking_policy)
+        return f"{self.user_agent}|headless={self.headless}|blocking={policy}"
+
+    def _own_handles(self) -> list:
+        """Return the window handles of this drive, tabs of context sessions left out."""
+        handles = self._driver.window_handles
+        if self.context_host is None:
+            return handles
+        return [handle for handle in handles if not self.context_host.owns(handle)]
+
+    def _scrap_tab_two(self, url, wait_time, spec, stream_to, compress, load_strategy):
         page_html = None
         self.wait_page_load(wait_time=5)
         try:
-            if len(self._driver.window_handles) == 1:
+            handles = self._own_handles()
+            if len(handles) == 1:
+                # window.open from a context tab would open in that context.
+                self._driver.switch_to.window(handles[0])
                 self._driver.execute_script("window.open()")
+                handles = self._own_handles()
 
-            if len(self._driver.window_handles) == 2:
-                self._driver.switch_to.window(self._driver.window_handles[-1])
+            if len(handles) == 2:
+                self._driver.switch_to.window(handles[-1])
+                self.prepare_tab()
                 self._driver.get(url)
-                load_counter = 0
-                while self._driver.execute_script(
-                    "return document.readyState;"
-                ) not in ["complete"]:
-                    sleep(1)
-                    if load_counter == 30:
-                        self._driver.refresh()
-                    elif load_counter == 45:
-                        self._driver.execute_script("window.close()")
-                    load_counter += 1
-                else:
-                    sleep(1)
-                    page_html = self._driver.page_source
-                    sleep(wait_time)
-                    self._driver.execute_script("window.close()")
-                if len(self._driver.window_handles) == 1:
-                    self._driver.switch_to.window(self._driver.window_handles[-1])
+                loaded = self.wait_page_load(wait_time=30, verbose=False, strategy=load_strategy)
+                if not loaded:
+                    self._driver.refresh()
+                    loaded = self.wait_page_load(wait_time=15, verbose=False, strategy=load_strategy)
+                if loaded:
+                    if spec:
+                        page_html = self.extract(spec, wait_time=0).data
+                    elif stream_to is not None:
+                        self.save_page_source(stream_to, compress=compress)
+                        page_html = stream_to
+                    else:
+                        page_html = self._driver.page_source
+                    self._sleep(wait_time)
+                self._driver.execute_script("window.close()")
+                self._driver.switch_to.window(handles[0])
                 # return page_html
             return page_html
         except (JavascriptException, TimeoutError):
             pass
+        except InvalidSessionIdException:
+            # Dead session, let supervisors see it instead of touching it again.
+            raise
         except WebDriverException:
-            self._driver.switch_to.window(self._driver.window_handles[-1])
+            self._driver.switch_to.window(self._own_handles()[0])
         return None
 
+    @instrumented
+    def extract(self, spec, ready_selectors=(), ready_state="interactive", wait_time=10) -> ExtractionResult:
+        """Extract a spec of selectors in a single round trip.
+
+        spec maps names to a CSS selector (text of the first match) or to
+        {"selector": ..., "get": "text" | "inner_text" | "html" | "outer_html"
+        | "value" | "@attribute", "all": bool}. The page is read once
+        ready_state is reached and every ready_selectors matches, or when
+        wait_time runs out (result.ready is False then).
+        """
+        return extract(
+            self._driver, spec, ready_selectors=ready_selectors, ready_state=ready_state, wait_time=wait_time
+        )
+
+    def stream_page_source(self, chunk_size=CHUNK_SIZE):
+        """Yield the current page source in chunks instead of one string."""
+        return iter_page_source(self._driver, chunk_size=chunk_size)
+
+    @instrumented
+    def save_page_source(self, dest, compress=None, chunk_size=CHUNK_SIZE) -> int:
+        """Write the current page source to dest ("gzip"/"zlib" compressed or not)."""
+        return save_page_source(self._driver, dest, compress=compress, chunk_size=chunk_size)
+
+    def set_blocking_policy(self, policy) -> None:
+        """Change the resource blocking policy of the running session."""
+        self.blocking_policy = policy
+        if self.blocker is None:
+            self.blocker = ResourceBlocker(self._driver, policy)
+            self.blocker.apply()
+        else:
+            self.blocker.set_policy(policy)
+
+    def drain_performance_log(self) -> None:
+        """Dispatch the pending performance log events.
+
+        chromedriver buffers them until read, so page loads drain the log
+        instead of leaving it to blocking_stats.
+        """
+        if self.performance_log_enabled and self._driver is not None:
+            performance_log(self._driver).poll()
+
+    def blocking_stats(self) -> dict:
+        """Return blocked requests and estimated bytes saved per policy."""
+        return self.blocker.stats() if self.blocker else {}
+
+    def prepare_tab(self) -> None:
+        """Apply per tab CDP settings to the current window."""
+        if self.blocker:
+            self.blocker.apply()
+
+    def capture_screenshot(self, dest, fmt="png", quality=None, clip=None, full_page=False):
+        """Capture the current page through CDP and write it on a worker thread.
+
+        Return a Future of dest. See ScreenshotPipeline, set
+        screenshot_pipeline beforehand to change workers, queue or max_width.
+        """
+        if self.screenshot_pipeline is None:
+            self.screenshot_pipeline = ScreenshotPipeline()
+        return self.screenshot_pipeline.capture(
+            self._driver, dest, fmt=fmt, quality=quality, clip=clip, full_page=full_page
+        )
+
+    def new_context(self, proxy=None):
+        """Return a ContextSession, an isolated browser context on this browser."""
+        if self.context_host is None:
+            self.context_host = ContextHost(self)
+        return self.context_host.new_session(proxy=proxy)
+
+    def scrap_tabs(self, urls, tabs=4, wait_time=45):
+        """Scrap many URLs keeping up to tabs pages loading at once.
+
+        Yield (url, html, timings) in completion order. With recycle_policy,
+        the browser may be restarted before the first page, not in between.
+        """
+        self.recycle_if_needed()
+        return TabFetcher(self, tabs=tabs, wait_time=wait_time).fetch(urls)
+
+    def restart(self) -> webdriver.Chrome:
+        """Start a fresh browser with the same options and profile."""
+        self._quit_driver()
+        self.recycles += 1
+        return self.create_driver(self._options)
+
+    def recycle_if_needed(self) -> None | str:
+        """Restart the browser when recycle_policy says so, return the reason."""
+        if self.session_health is None:
+            return None
+        reason = self.session_health.reason(drive_pid(self))
+        if reason:
+            LOG.info(f"Reciclando navegador: {reason}.")
+            self.restart()
+        return reason
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        """Return the underlying Chrome driver."""
+        return self._driver
+
     def close(self) -> None:
         """Close driver."""
         try:
@@ -289,6 +509,39 @@ class ChromeSeleniumDrive:
             WebDriverException,
         ):
             pass
+        if self.profile_clone:
+            self.quit()
+
+    def quit(self) -> None:
+        """Quit browser and stop the chromedriver process."""
+        if self.screenshot_pipeline:
+            self.screenshot_pipeline.close()
+            self.screenshot_pipeline = None
+        self._quit_driver()
+        if self.profile_clone:
+            self.profile_template.release(self.profile_clone)
+            self.profile_clone = None
+
+    def _quit_driver(self) -> None:
+        # Contexts die with the browser.
+        self.context_host = None
+        if self._driver is not None:
+            try:
+                # Counts still in the log would be lost with the browser.
+                self.drain_performance_log()
+            except (ConnectionRefusedError, MaxRetryError, NewConnectionError, WebDriverException):
+                pass
+            try:
+                self._driver.quit()
+            except (
+                ConnectionRefusedError,
+                MaxRetryError,
+                NewConnectionError,
+                InvalidSessionIdException,
+                WebDriverException,
+            ):
+                pass
+            self._driver = None
 
 
 def rand_time():
@@ -305,6 +558,6 @@ if __name__ == "__main__":
         "https://intoli.com/blog/not-possible-to-block-chrome-headless/chrome-headless-test.html"
     )
     sleep(10)
-    DRIVER.save_screenshot(join(dirname(abspath(".")), "teste.png"))
+    SET_DRIVER.capture_screenshot(join(dirname(abspath(".")), "teste.png")).result()
     SET_DRIVER.close()
     pass
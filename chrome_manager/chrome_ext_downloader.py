@@ -9,18 +9,29 @@
 import os
 import re
 import sys
+import logging
 import tempfile
 import platform
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import requests
 from urllib.parse import urlparse
-from os.path import basename, exists
-from webdriver_manager.core.utils import get_browser_version_from_os, ChromeType
+from os.path import basename
+from webdriver_manager.core.utils import ChromeType
+
+sys.path.append(os.path.abspath("."))
+
+from chrome_manager.downloader import download_file, print_progress, shared_session
+from chrome_manager.extension_cache import ExtensionCache
+from chrome_manager.version_cache import browser_version
 
 
 ARCH = platform.architecture()
 
+EXTENSION_ID_PATTERN = re.compile(r"[a-p]{32}")
+
+LOG = logging.getLogger(__name__)
+
 
 class ChromeExtensionDownloader():
     """Class to download Chrome Extension by URL."""
@@ -28,13 +39,15 @@ class ChromeExtensionDownloader():
     def __init__(self):
         self.ext_download_url = "https://clients2.google.com/service/update2/crx?response=redirect&prodversion={chrome_version}&acceptformat=crx2,crx3&x=id%3D{extension_id}%26uc&nacl_arch={arch}"
 
-    def download(self, chrome_store_url, version_string=get_browser_version_from_os(ChromeType.GOOGLE)):
+    def download(self, chrome_store_url, version_string=None):
         """
             Download the given URL into given filename.
             :param chrome_store_url:
-            :param _file_name_:
+            :param version_string: Chrome version, the installed one by default.
             :return:
         """
+        if version_string is None:
+            version_string = browser_version(ChromeType.GOOGLE)
         arch = self.get_arch()
         extension_id, file_name = self.parse_extension_url(
             chrome_store_url=chrome_store_url
@@ -52,6 +65,48 @@ class ChromeExtensionDownloader():
             file_name=file_name + ".crx"
         )
 
+    def download_many(self, chrome_store_urls, version_string=None, max_workers=4, cache=None):
+        """
+            Download many extensions at once through a content addressed cache.
+            :param chrome_store_urls: Chrome store URLs or bare extension ids.
+            :param version_string: Chrome version, the installed one by default.
+            :param max_workers: Concurrent downloads.
+            :param cache: ExtensionCache, the default one when not given.
+            :return: Dict of extension id to CRX path, None when it failed.
+        """
+        if version_string is None:
+            version_string = browser_version(ChromeType.GOOGLE)
+        cache = cache or ExtensionCache()
+        session = shared_session()
+        arch = self.get_arch()
+
+        def fetch(extension_id):
+            url = self.ext_download_url.format(
+                chrome_version=version_string,
+                extension_id=extension_id,
+                arch=arch
+            )
+            key = cache.key(extension_id, version_string, arch)
+            return cache.fetch(session, url, key)
+
+        extension_ids = []
+        for item in chrome_store_urls:
+            if EXTENSION_ID_PATTERN.fullmatch(item):
+                extension_ids.append(item)
+            else:
+                extension_ids.append(self.parse_extension_url(chrome_store_url=item)[0])
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {ext_id: executor.submit(fetch, ext_id) for ext_id in dict.fromkeys(extension_ids)}
+            for extension_id, future in futures.items():
+                try:
+                    results[extension_id] = future.result()
+                except Exception as error:  # pylint: disable=broad-except
+                    LOG.error(f"Falha ao baixar extensao {extension_id}: {error!r}")
+                    results[extension_id] = None
+        return results
+
     def parse_extension_url(self, chrome_store_url):
         """
             Validate the given input is chrome store URL or not.
@@ -93,34 +148,16 @@ class ChromeExtensionDownloader():
             dest_dir = tempfile.gettempdir()
 
         dest_file = Path(dest_dir, file_name)
-        if exists(dest_file):
-            os.remove(path=dest_file)
-            print(f"Arquivo deletado: {dest_file}")
-
-        with open(dest_file, "wb") as binary_file:
-            print()
-            response = requests.get(download_url, stream=True)
-            total = response.headers.get("content-length")
-
-            if total is None:
-                binary_file.write(response.content)
-                return False
-            else:
-                downloaded = 0
-                total = int(total)
-                try:
-                    for data in response.iter_content(chunk_size=max(int(total / 1000), 1024 * 1024)):
-                        downloaded += len(data)
-                        binary_file.write(data)
-                        done = int(50 * downloaded / total)
-                        str_to_format = f"\rBaixando: {dest_file} {'█' * done}{'.' * (50 - done)} | {self.sizeof_fmt(downloaded)}/{self.sizeof_fmt(total)}"
-                        print(str_to_format, end="\r")
-                        if downloaded == total:
-                            return dest_file
-                except KeyboardInterrupt:
-                    print("\nDonwload interrompido")
-                    return False
-                print()
+        print()
+        try:
+            dest_file = Path(download_file(
+                download_url, dest_file, progress=print_progress(dest_file, self.sizeof_fmt)
+            ))
+        except KeyboardInterrupt:
+            print("\nDonwload interrompido")
+            return False
+        print()
+        return dest_file
 
     def get_arch(self):
         """Return a compatible architecture to use in download url."""
@@ -2,18 +2,25 @@
 import os
 import sys
 
+import shutil
 import tempfile
 import subprocess
 
-from os.path import exists, dirname, basename, join
-
-import requests
+from os.path import abspath, dirname, basename, exists, join
 
 WORK_DIR = dirname(__file__)
 
 sys.path.insert(0, WORK_DIR)
+# The repository root, so chrome_manager imports when run as a script.
+sys.path.append(dirname(abspath(WORK_DIR)))
+
+from webdriver_manager.core.utils import ChromeType
 
-from webdriver_manager.core.utils import get_browser_version_from_os, ChromeType
+from chrome_manager.bundle_pipeline import download_and_extract, publish_dir, stream_extract
+from chrome_manager.downloader import download_file, print_progress
+from chrome_manager.storage import FileLock
+from chrome_manager.version_cache import CHROME_ROOT, browser_version, pinned_version
+from chrome_manager.version_manifest import VersionManifest
 
 
 class OSType():
@@ -32,33 +39,25 @@ class ChromeArch():
 class ChromeNeedUpdate():
     """Detect if Chrome Need update."""
 
-    def __init__(self) -> None:
+    def __init__(self, manifest=None, chrome_root=None) -> None:
+        """With chrome_root, compare the install_linux build instead of the system Chrome."""
+        self.manifest = manifest or VersionManifest()
         self.installed_version = None
         try:
-            browser_version = get_browser_version_from_os(ChromeType.GOOGLE)
+            installed = pinned_version(chrome_root) if chrome_root else browser_version(ChromeType.GOOGLE)
             self.installed_version = [
-                int(x) for x in browser_version.split(".")
-            ] if browser_version else [0] * 3
+                int(x) for x in installed.split(".")
+            ] if installed else [0] * 3
         except AttributeError:
             pass
 
     def remote_version_info(self):
-        """Get the remote chrome version form Google download page."""
-        json_versions = requests.get(
-            "https://omahaproxy.appspot.com/json"
-        ).json()
-        for item in json_versions:
-            os_type = item['os']
-            if os_type == "win64":
-                versions = item['versions']
-                for version in versions:
-                    if version["channel"] == "stable":
-                        return [
-                            int(x) for x in version["current_version"].split(".")[:3]
-                        ]
+        """Get the remote stable chrome version from the cached manifest."""
+        return [int(x) for x in self.manifest.version("Stable").split(".")[:3]]
 
     def check(self):
         """Check if chrome need be updated."""
+        remote_version = self.remote_version_info()
         print()
         print("-" * 45)
         print(
@@ -67,7 +66,7 @@ class ChromeNeedUpdate():
         )
         print(
             "Versão remota (para download):", "{}.{}.{}".format(
-                *self.remote_version_info())
+                *remote_version)
         )
         print("-" * 45)
 
@@ -75,7 +74,7 @@ class ChromeNeedUpdate():
             print()
             print("Parece que o Chrome não esta instalado!")
             return True
-        return any([k < y for k, y in zip(self.installed_version, self.remote_version_info())])
+        return any([k < y for k, y in zip(self.installed_version, remote_version)])
 
 
 class ChromeDownloader():
@@ -87,6 +86,9 @@ class ChromeDownloader():
     def install(self, dest_dir=None):
         """Install Chrome."""
 
+        if sys.platform.startswith(OSType.LINUX):
+            return self.install_linux(root=dest_dir)
+
         if not ChromeNeedUpdate().check():
             print()
             print("Chrome já instalado e na ultima versão.")
@@ -107,6 +109,73 @@ class ChromeDownloader():
         subprocess.call(["msiexec.exe", "/i", downloaded_file, "/qb"])
         return True
 
+    def install_linux(
+        self, root=None, channel="Stable", platform="linux64", components=("chrome", "chromedriver"), manifest=None
+    ):
+        """Install Chrome for Testing under root/versions/<version> and point root/current to it.
+
+        Archives are unpacked while they download into a temporary folder
+        renamed into place, and the current symlink is swapped with a rename,
+        so running browsers and readers always see a complete tree.
+        """
+        root = root or CHROME_ROOT
+        manifest = manifest or VersionManifest()
+        version = manifest.version(channel)
+        version_dir = join(root, "versions", version)
+        os.makedirs(join(root, "versions"), exist_ok=True)
+
+        with FileLock(join(root, "install.lock")):
+            if exists(version_dir):
+                print()
+                print("Chrome já instalado e na ultima versão.")
+            else:
+                print()
+                print(f"Baixando o Chrome {version}.")
+                staging = tempfile.mkdtemp(prefix=f".{version}.", dir=join(root, "versions"))
+                try:
+                    for name in components:
+                        print()
+                        stream_extract(
+                            manifest.download_url(name, platform, channel),
+                            staging,
+                            progress=print_progress(f"{name}-{platform}", self.sizeof_fmt),
+                        )
+                    print()
+                    publish_dir(staging, version_dir)
+                except KeyboardInterrupt:
+                    shutil.rmtree(staging, ignore_errors=True)
+                    print("\nDonwload interrompido")
+                    return False
+                except BaseException:
+                    shutil.rmtree(staging, ignore_errors=True)
+                    raise
+
+            current = join(root, "current")
+            tmp_link = f"{current}.tmp"
+            if os.path.lexists(tmp_link):
+                os.remove(tmp_link)
+            os.symlink(join("versions", version), tmp_link)
+            os.replace(tmp_link, current)
+        return version_dir
+
+    def download_bundle(self, dest_dir=None, arch=ChromeArch.X64):
+        """Download and unpack the enterprise bundle into dest_dir in one pass."""
+        file_name = arch[1]
+        if not dest_dir:
+            dest_dir = join(tempfile.gettempdir(), file_name.rsplit(".", 1)[0])
+        print()
+        try:
+            download_and_extract(
+                f"https://dl.google.com/dl/chrome/install/{file_name}",
+                dest_dir,
+                progress=print_progress(file_name, self.sizeof_fmt),
+            )
+        except KeyboardInterrupt:
+            print("\nDonwload interrompido")
+            return False
+        print()
+        return dest_dir
+
     def download_file(self, download_url, dest_dir=None, file_name=None):
         """Download file with url."""
 
@@ -118,34 +187,16 @@ class ChromeDownloader():
             dest_dir = tempfile.gettempdir()
 
         dest_file = join(dest_dir, file_name)
-        if exists(dest_file):
-            os.remove(path=dest_file)
-            print(f"Arquivo deletado: {dest_file}")
-
-        with open(dest_file, "wb") as binary_file:
-            print()
-            response = requests.get(download_url, stream=True)
-            total = response.headers.get("content-length")
-
-            if total is None:
-                binary_file.write(response.content)
-                return False
-            else:
-                downloaded = 0
-                total = int(total)
-                try:
-                    for data in response.iter_content(chunk_size=max(int(total / 1000), 1024 * 1024)):
-                        downloaded += len(data)
-                        binary_file.write(data)
-                        done = int(50 * downloaded / total)
-                        str_to_format = f"\rBaixando: {dest_file} {'█' * done}{'.' * (50 - done)} | {self.sizeof_fmt(downloaded)}/{self.sizeof_fmt(total)}"
-                        print(str_to_format, end="\r")
-                        if downloaded == total:
-                            return dest_file
-                except KeyboardInterrupt:
-                    print("\nDonwload interrompido")
-                    return False
-                print()
+        print()
+        try:
+            dest_file = download_file(
+                download_url, dest_file, progress=print_progress(dest_file, self.sizeof_fmt)
+            )
+        except KeyboardInterrupt:
+            print("\nDonwload interrompido")
+            return False
+        print()
+        return dest_file
 
     def sizeof_fmt(self, num, suffix="B"):
         """Format size for humans."""
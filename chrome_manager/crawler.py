@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+"""Crawl a URL queue with one ChromeSeleniumDrive per worker process."""
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from multiprocessing.connection import wait
+from time import monotonic, perf_counter, sleep
+
+from chrome_manager import procfs
+
+LOG = logging.getLogger(__name__)
+
+
+class MemoryAdmission:
+    """Admit a new browser only when free memory can hold one more.
+
+    The size of a browser starts at default_browser_bytes and then follows
+    the largest Chrome process tree measured in /proc.
+    """
+
+    def __init__(self, reserve_bytes=1024 ** 3, default_browser_bytes=512 * 1024 ** 2) -> None:
+        self.reserve_bytes = reserve_bytes
+        self.browser_bytes = default_browser_bytes
+        self._measured = False
+
+    def observe(self, tree_sizes) -> None:
+        """Update the browser size estimate with measured tree RSS values."""
+        sizes = [size for size in tree_sizes if size]
+        if not sizes:
+            return
+        largest = max(sizes)
+        self.browser_bytes = largest if not self._measured else max(self.browser_bytes, largest)
+        self._measured = True
+
+    def admit(self) -> bool:
+        """Tell if one more browser fits in memory now."""
+        free = procfs.available_memory()
+        if free is None:
+            return True
+        return free - self.reserve_bytes >= self.browser_bytes
+
+
+def start_drive(drive_kwargs, options_kwargs):
+    """Return a started ChromeSeleniumDrive, the default drive_factory."""
+    # pylint: disable=import-outside-toplevel
+    from chrome_manager.chrome_driver import ChromeSeleniumDrive
+    from chrome_manager.service import create_service
+
+    drive = ChromeSeleniumDrive(service=create_service(chrome_root=drive_kwargs.get("chrome_root")), **drive_kwargs)
+    drive.create_driver(drive.set_options(**options_kwargs))
+    return drive
+
+
+def _worker(shard, conn, drive_factory, drive_kwargs, options_kwargs, scrape_kwargs, handler):
+    # pylint: disable=too-many-arguments
+    stats = {"shard": shard, "pages": 0, "errors": 0, "busy_seconds": 0.0}
+    started = perf_counter()
+    drive = drive_factory(drive_kwargs, options_kwargs)
+    try:
+        conn.send(("started", procfs.drive_pid(drive)))
+        while True:
+            # URLs come one at a time, so the parent always knows which one
+            # this process holds if it dies.
+            url = conn.recv()
+            if url is None:
+                break
+            page_started = perf_counter()
+            try:
+                html = drive.scrap_tab_two(url, **scrape_kwargs)
+                output = handler(url, html) if handler else html
+                stats["pages"] += 1
+                conn.send(("result", url, output, None))
+            except Exception as error:  # pylint: disable=broad-except
+                stats["errors"] += 1
+                conn.send(("result", url, None, repr(error)))
+            stats["busy_seconds"] += perf_counter() - page_started
+    except EOFError:
+        pass
+    finally:
+        drive.quit()
+        stats["elapsed"] = perf_counter() - started
+        stats["pages_per_minute"] = round(60 * stats["pages"] / stats["elapsed"], 2) if stats["elapsed"] else 0
+        try:
+            conn.send(("stopped", stats))
+        except OSError:
+            pass
+
+
+class _Shard:
+    """Worker process slot with its restart budget."""
+
+    def __init__(self, shard) -> None:
+        self.shard = shard
+        self.process = None
+        self.conn = None
+        self.started = False
+        self.url = None
+        self.failures = 0
+        self.next_start = 0.0
+        self.driver_pid = None
+
+
+class ShardedCrawler:
+    """Shard URLs over worker processes, each owning its own browser.
+
+    handler(url, html) runs in the worker, so parsing uses every core. It
+    must be picklable (a module level function), like drive_factory, which
+    gets (drive_kwargs, options_kwargs) and returns a started drive. New
+    browsers are launched only when MemoryAdmission says they fit.
+
+    A worker that dies gets its URL requeued (up to url_attempts tries) and
+    is relaunched after restart_backoff * 2 ** failures seconds. A shard that
+    fails max_restarts times in a row is retired, and the crawl raises
+    RuntimeError when every shard is retired with URLs left.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        handler=None,
+        drive_kwargs=None,
+        options_kwargs=None,
+        scrape_kwargs=None,
+        admission=None,
+        poll_interval=1.0,
+        drive_factory=start_drive,
+        max_restarts=3,
+        restart_backoff=2.0,
+        url_attempts=2,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.handler = handler
+        self.drive_kwargs = dict(drive_kwargs or {"headless": True})
+        self.options_kwargs = options_kwargs or {}
+        self.scrape_kwargs = scrape_kwargs or {}
+        self.admission = admission or MemoryAdmission()
+        self.poll_interval = poll_interval
+        self.drive_factory = drive_factory
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.url_attempts = url_attempts
+        self.stats = {}
+        self.rejected_launches = 0
+        self.worker_deaths = 0
+
+    def run(self, urls):
+        """Crawl urls and yield (url, output, error) as workers finish them."""
+        context = multiprocessing.get_context("spawn")
+        todo = deque(urls)
+        pending = len(todo)
+        shards = [_Shard(shard) for shard in range(self.workers)]
+        attempts = {}
+        next_check = 0.0
+        try:
+            while pending:
+                now = monotonic()
+                if now >= next_check:
+                    next_check = now + self.poll_interval
+                    if all(shard.failures >= self.max_restarts for shard in shards):
+                        raise RuntimeError(f"Every crawler shard failed, {pending} URLs left.")
+                    self._launch(context, shards, pending)
+
+                for shard in shards:
+                    if shard.process is not None and shard.started and shard.url is None and todo:
+                        shard.url = todo.popleft()
+                        try:
+                            shard.conn.send(shard.url)
+                        except OSError:
+                            # Died meanwhile, the URL is requeued when it is reaped.
+                            pass
+
+                live = [shard for shard in shards if shard.process is not None]
+                if not live:
+                    LOG.info("Nenhum navegador ativo, aguardando memoria livre ou o intervalo de reinicio.")
+                    sleep(self.poll_interval)
+                    continue
+                ready = wait(
+                    [shard.conn for shard in live] + [shard.process.sentinel for shard in live],
+                    timeout=self.poll_interval,
+                )
+                for shard in live:
+                    exited = shard.process.sentinel in ready
+                    if shard.conn in ready or exited:
+                        for item in self._receive(shard):
+                            pending -= 1
+                            yield item
+                    if exited:
+                        url = self._reap(shard)
+                        if url is None:
+                            continue
+                        attempts[url] = attempts.get(url, 0) + 1
+                        if attempts[url] < self.url_attempts:
+                            LOG.info(f"Recolocando {url} na fila apos a morte do worker.")
+                            todo.appendleft(url)
+                        else:
+                            pending -= 1
+                            yield url, None, "worker morreu"
+        finally:
+            for shard in shards:
+                if shard.process is None:
+                    continue
+                try:
+                    shard.conn.send(None)
+                except OSError:
+                    pass
+                shard.process.join(timeout=30)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+                self._receive(shard)
+                shard.conn.close()
+
+    def _receive(self, shard) -> list:
+        """Apply every message waiting from shard, return finished URLs."""
+        finished = []
+        while True:
+            try:
+                if not shard.conn.poll():
+                    return finished
+                message = shard.conn.recv()
+            except (EOFError, OSError):
+                return finished
+            kind = message[0]
+            if kind == "started":
+                shard.started = True
+                shard.failures = 0
+                shard.driver_pid = message[1]
+            elif kind == "stopped":
+                self.stats[shard.shard] = message[1]
+            else:
+                shard.url = None
+                finished.append(message[1:])
+
+    def _reap(self, shard) -> None | str:
+        """Forget an exited worker, return the URL it died holding."""
+        shard.process.join()
+        exitcode = shard.process.exitcode
+        url, shard.url = shard.url, None
+        shard.conn.close()
+        started, shard.started = shard.started, False
+        shard.process = shard.conn = shard.driver_pid = None
+        if exitcode != 0 or not started or url is not None:
+            self.worker_deaths += 1
+            shard.failures += 1
+            shard.next_start = monotonic() + self.restart_backoff * 2 ** (shard.failures - 1)
+            LOG.error(f"Worker {shard.shard} terminou com codigo {exitcode} ({shard.failures} falhas).")
+        return url
+
+    def _launch(self, context, shards, pending) -> None:
+        if procfs.available():
+            self.admission.observe(procfs.tree_rss(shard.driver_pid) for shard in shards if shard.driver_pid)
+        alive = sum(shard.process is not None for shard in shards)
+        now = monotonic()
+        for shard in shards:
+            if alive >= pending:
+                return
+            if shard.process is not None or shard.failures >= self.max_restarts or now < shard.next_start:
+                continue
+            if not self.admission.admit():
+                self.rejected_launches += 1
+                return
+            shard.conn, child_conn = context.Pipe()
+            shard.started = False
+            shard.process = context.Process(
+                target=_worker,
+                args=(
+                    shard.shard, child_conn, self.drive_factory,
+                    self.drive_kwargs, self.options_kwargs, self.scrape_kwargs, self.handler,
+                ),
+                name=f"chrome-shard-{shard.shard}",
+                daemon=True,
+            )
+            shard.process.start()
+            child_conn.close()
+            # One launch per check, the next one waits for its memory to show up.
+            return
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""CRX2/CRX3 parsing and a persistent cache of unpacked extensions."""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zipfile
+from os.path import exists, isdir, join
+
+from chrome_manager.downloader import file_sha256
+from chrome_manager.storage import CACHE_DIR
+
+LOG = logging.getLogger(__name__)
+
+CRX_MAGIC = b"Cr24"
+CHUNK_SIZE = 256 * 1024
+
+_HASHES = {}
+_LOCK = threading.Lock()
+
+
+class CrxHeader:
+    """Fields of a CRX header needed to unpack it."""
+
+    def __init__(self, version, payload_offset, public_key=None) -> None:
+        self.version = version
+        self.payload_offset = payload_offset
+        self.public_key = public_key
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _protobuf_fields(data):
+    """Yield (field number, value) of length delimited and varint fields."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 2:
+            size, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + size], pos + size
+        elif wire_type == 5:
+            value, pos = data[pos:pos + 4], pos + 4
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field, value
+
+
+def _crx3_public_key(header):
+    """Return the key matching the crx_id of a CRX3 CrxFileHeader."""
+    keys = []
+    crx_id = None
+    for field, value in _protobuf_fields(header):
+        if field in (2, 3):  # sha256_with_rsa, sha256_with_ecdsa
+            keys.extend(key for number, key in _protobuf_fields(value) if number == 1)
+        elif field == 10000:  # signed_header_data
+            crx_id = next((v for number, v in _protobuf_fields(value) if number == 1), None)
+    for key in keys:
+        if crx_id is None or hashlib.sha256(key).digest()[:16] == crx_id:
+            return key
+    return None
+
+
+def read_crx_header(binary_file) -> CrxHeader:
+    """Parse the header at the start of an open CRX file."""
+    magic, version = struct.unpack("<4sI", binary_file.read(8))
+    if magic != CRX_MAGIC:
+        raise ValueError("Not a CRX file.")
+    if version == 3:
+        (header_size,) = struct.unpack("<I", binary_file.read(4))
+        header = binary_file.read(header_size)
+        return CrxHeader(version, 12 + header_size, _crx3_public_key(header))
+    if version == 2:
+        key_size, signature_size = struct.unpack("<II", binary_file.read(8))
+        public_key = binary_file.read(key_size)
+        return CrxHeader(version, 16 + key_size + signature_size, public_key)
+    raise ValueError(f"Unsupported CRX version {version}.")
+
+
+class _Payload(io.RawIOBase):
+    """Seekable view of the zip payload that follows the CRX header."""
+
+    def __init__(self, binary_file, offset) -> None:
+        super().__init__()
+        self._file = binary_file
+        self._offset = offset
+        self._file.seek(offset)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._file.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset += self._offset
+        return self._file.seek(offset, whence) - self._offset
+
+    def tell(self):
+        return self._file.tell() - self._offset
+
+
+def unpack_crx(crx_path, dest_dir) -> str:
+    """Stream the zip payload of a CRX into dest_dir and return it."""
+    with open(crx_path, "rb") as binary_file:
+        header = read_crx_header(binary_file)
+        with zipfile.ZipFile(_Payload(binary_file, header.payload_offset)) as archive:
+            root = os.path.realpath(dest_dir)
+            for member in archive.infolist():
+                target = os.path.realpath(join(root, member.filename))
+                if not target.startswith(root + os.sep):
+                    raise ValueError(f"Unsafe path in {crx_path}: {member.filename}")
+                if member.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with archive.open(member) as source, open(target, "wb") as output:
+                    shutil.copyfileobj(source, output, CHUNK_SIZE)
+
+    if header.public_key:
+        _pin_extension_id(dest_dir, header.public_key)
+    return dest_dir
+
+
+def _pin_extension_id(dest_dir, public_key) -> None:
+    """Keep the packed extension id by writing its key in the manifest."""
+    manifest_path = join(dest_dir, "manifest.json")
+    try:
+        with open(manifest_path, encoding="utf-8-sig") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        LOG.info(f"Manifest ilegivel em {dest_dir}, id da extensao nao fixado.")
+        return
+    if "key" in manifest:
+        return
+    manifest["key"] = base64.b64encode(public_key).decode("ascii")
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+
+def _crx_hash(crx_path) -> str:
+    stat = os.stat(crx_path)
+    key = (os.path.realpath(crx_path), stat.st_size, stat.st_mtime_ns)
+    with _LOCK:
+        if key not in _HASHES:
+            _HASHES[key] = file_sha256(crx_path)
+        return _HASHES[key]
+
+
+def unpacked_extension_dir(crx_path, cache_root=None) -> str:
+    """Return a cached unpacked copy of a CRX, keyed by the file hash."""
+    cache_root = cache_root or join(CACHE_DIR, "unpacked")
+    target = join(cache_root, _crx_hash(crx_path))
+    if isdir(target):
+        return target
+
+    os.makedirs(cache_root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_root, prefix=".unpacking-")
+    try:
+        unpack_crx(crx_path, staging)
+        os.rename(staging, target)
+    except OSError:
+        # Another process published the same hash first.
+        if not isdir(target):
+            raise
+    finally:
+        if exists(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+    return target
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+"""Shared download engine: pooled, ranged, parallel and resumable."""
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import exists
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from chrome_manager.storage import read_json, write_json
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+STATE_SAVE_EVERY = 8 * 1024 * 1024
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def shared_session(pool_size=16) -> requests.Session:
+    """Return a process wide requests.Session with a connection pool."""
+    global _SESSION  # pylint: disable=global-statement
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def file_sha256(path) -> str:
+    """Hash a file without loading it in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as binary_file:
+        for block in iter(lambda: binary_file.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def print_progress(dest_file, sizeof_fmt):
+    """Return a progress callback drawing the classic download bar."""
+
+    def progress(downloaded, total):
+        if not total:
+            print(f"\rBaixando: {dest_file} {sizeof_fmt(downloaded)}", end="\r")
+            return
+        done = int(50 * downloaded / total)
+        print(
+            f"\rBaixando: {dest_file} {'█' * done}{'.' * (50 - done)} | {sizeof_fmt(downloaded)}/{sizeof_fmt(total)}",
+            end="\r",
+        )
+
+    return progress
+
+
+class _Probe:
+    """What the server tells about a resource before downloading it."""
+
+    def __init__(self, url, size, ranges, etag) -> None:
+        self.url = url
+        self.size = size
+        self.ranges = ranges
+        self.etag = etag
+
+
+def probe(session, url, timeout=30) -> _Probe:
+    """Find final url, size, Range support and validator of a resource."""
+    response = session.head(url, allow_redirects=True, timeout=timeout)
+    if response.status_code >= 400:
+        # Some servers refuse HEAD, ask for the first byte instead.
+        response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout)
+        response.close()
+        response.raise_for_status()
+        if response.status_code == 206:
+            size = response.headers.get("content-range", "").rpartition("/")[2]
+            return _Probe(response.url, int(size) if size.isdigit() else None, True, response.headers.get("etag"))
+    length = response.headers.get("content-length")
+    return _Probe(
+        response.url,
+        int(length) if length is not None else None,
+        response.headers.get("accept-ranges", "").lower() == "bytes",
+        response.headers.get("etag"),
+    )
+
+
+class _Download:
+    """State of one download, persisted next to the partial file."""
+
+    def __init__(self, dest_file, session, info, progress) -> None:
+        self.dest_file = str(dest_file)
+        self.part_file = self.dest_file + ".part"
+        self.state_file = self.dest_file + ".part.json"
+        self.session = session
+        self.info = info
+        self.progress = progress
+        self.lock = threading.Lock()
+        # A ranged .part is sized up front, so a state only resumes the same mode.
+        self.mode = None
+        self.segments = []
+        self.downloaded = 0
+        self._unsaved = 0
+        self.stop = threading.Event()
+
+    def load_state(self, mode) -> bool:
+        """Load segments saved by an interrupted download of the same mode."""
+        state = read_json(self.state_file)
+        if (
+            not state
+            or not exists(self.part_file)
+            or state.get("mode") != mode
+            or state.get("size") != self.info.size
+            or state.get("etag") != self.info.etag
+        ):
+            return False
+        self.segments = state["segments"]
+        self.downloaded = sum(segment[2] for segment in self.segments)
+        return True
+
+    def received(self) -> int:
+        """Return how many bytes the segments got, holes left by short responses excluded."""
+        return sum(segment[2] for segment in self.segments)
+
+    def save_state(self) -> None:
+        # Writers flush after every chunk, so one fsync makes every byte the
+        # state counts durable before the state claims it.
+        if exists(self.part_file):
+            with open(self.part_file, "r+b") as binary_file:
+                os.fsync(binary_file.fileno())
+        write_json(
+            self.state_file,
+            {"mode": self.mode, "size": self.info.size, "etag": self.info.etag, "segments": self.segments},
+        )
+
+    def advance(self, segment, size) -> None:
+        with self.lock:
+            segment[2] += size
+            self.downloaded += size
+            self._unsaved += size
+            if self._unsaved >= STATE_SAVE_EVERY:
+                self._unsaved = 0
+                self.save_state()
+            if self.progress:
+                self.progress(self.downloaded, self.info.size)
+
+    def fetch_segment(self, segment, timeout, retries) -> None:
+        start, end = segment[0], segment[1]
+        for attempt in range(retries + 1):
+            offset = start + segment[2]
+            if offset > end or self.stop.is_set():
+                return
+            headers = {"Range": f"bytes={offset}-{end}"}
+            try:
+                with self.session.get(self.info.url, headers=headers, stream=True, timeout=timeout) as response:
+                    if response.status_code != 206:
+                        raise IOError(f"Range not honoured: HTTP {response.status_code}")
+                    with open(self.part_file, "r+b") as binary_file:
+                        binary_file.seek(offset)
+                        for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if self.stop.is_set():
+                                return
+                            data = data[: end + 1 - (start + segment[2])]
+                            binary_file.write(data)
+                            binary_file.flush()
+                            self.advance(segment, len(data))
+                            if start + segment[2] > end:
+                                return
+                    raise IOError(f"Segment {start}-{end} ended at byte {start + segment[2]}")
+            except (requests.RequestException, IOError) as error:
+                if attempt == retries:
+                    raise
+                LOG.info(f"Segmento {start}-{end} falhou ({error!r}), tentando de novo.")
+
+    def ranged(self, segments, min_segment_size, timeout, retries) -> None:
+        self.mode = "ranged"
+        if not self.load_state("ranged"):
+            size = self.info.size
+            count = max(1, min(segments, size // min_segment_size))
+            step = -(-size // count)
+            self.segments = [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+            self.downloaded = 0
+            with open(self.part_file, "wb") as binary_file:
+                binary_file.truncate(size)
+            self.save_state()
+        executor = ThreadPoolExecutor(max_workers=len(self.segments))
+        futures = [
+            executor.submit(self.fetch_segment, segment, timeout, retries)
+            for segment in self.segments
+            if segment[0] + segment[2] <= segment[1]
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # Ctrl-C or a failed segment: the others stop at their next chunk
+            # instead of being waited for until they finish.
+            self.stop.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+            raise
+        else:
+            executor.shutdown()
+        finally:
+            with self.lock:
+                self.save_state()
+
+    def streamed(self, timeout) -> None:
+        self.mode = "streamed"
+        headers = {}
+        offset = 0
+        if self.info.ranges and self.load_state("streamed") and self.segments:
+            # Bytes past the saved offset may not have reached the disk.
+            offset = self.segments[0][2]
+            if self.info.size and offset >= self.info.size:
+                return
+            headers["Range"] = f"bytes={offset}-"
+        with self.session.get(self.info.url, headers=headers, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0
+            segment = [0, (self.info.size or 0) - 1, offset]
+            self.segments = [segment]
+            self.downloaded = offset
+            try:
+                with open(self.part_file, "r+b" if offset else "wb") as binary_file:
+                    binary_file.seek(offset)
+                    binary_file.truncate()
+                    for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                        binary_file.write(data)
+                        binary_file.flush()
+                        self.advance(segment, len(data))
+            finally:
+                with self.lock:
+                    self.save_state()
+
+
+def download_file(
+    url,
+    dest_file,
+    session=None,
+    segments=4,
+    min_segment_size=MIN_SEGMENT_SIZE,
+    expected_size=None,
+    expected_sha256=None,
+    progress=None,
+    timeout=30,
+    retries=3,
+) -> str:
+    """Download url into dest_file and return its path.
+
+    Large files on servers supporting Range are fetched in parallel segments.
+    Interrupted downloads resume from dest_file.part. Memory use is bounded by
+    CHUNK_SIZE per segment. Raise IOError when size or hash do not match.
+    """
+    session = session or shared_session()
+    info = probe(session, url, timeout=timeout)
+    download = _Download(dest_file, session, info, progress)
+
+    if info.ranges and info.size and info.size >= 2 * min_segment_size and segments > 1:
+        download.ranged(segments, min_segment_size, timeout, retries)
+    else:
+        download.streamed(timeout)
+
+    size = os.path.getsize(download.part_file)
+    received = download.received()
+    expected = expected_size or info.size
+    if expected and (size != expected or received != expected):
+        raise IOError(f"Tamanho inesperado para {dest_file}: {received} de {expected} bytes recebidos.")
+    if expected_sha256 and file_sha256(download.part_file) != expected_sha256.lower():
+        for path in (download.part_file, download.state_file):
+            if exists(path):
+                os.remove(path)
+        raise IOError(f"Hash inesperado para {dest_file}.")
+
+    os.replace(download.part_file, download.dest_file)
+    if exists(download.state_file):
+        os.remove(download.state_file)
+    return download.dest_file
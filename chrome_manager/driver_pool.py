@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""Pool of pre-launched ChromeSeleniumDrive sessions."""
+
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from time import perf_counter
+
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    JavascriptException,
+    NoSuchWindowException,
+    WebDriverException,
+)
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from chrome_manager.chrome_driver import ChromeSeleniumDrive
+from chrome_manager.service import create_service
+
+LOG = logging.getLogger(__name__)
+
+DEAD_SESSION_ERRORS = (
+    ConnectionRefusedError,
+    MaxRetryError,
+    NewConnectionError,
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    WebDriverException,
+)
+
+MAX_SPAWN_BACKOFF = 60.0
+
+# Put in the idle queue to wake waiting acquirers when sessions keep failing.
+_SPAWN_FAILED = object()
+
+RESET_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
+class PoolStats:
+    """Counters used to size a DriverPool."""
+
+    def __init__(self, latency_window=256) -> None:
+        self.hits = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.spawned = 0
+        self.spawn_failures = 0
+        self.discarded = 0
+        self.spawn_latencies = deque(maxlen=latency_window)
+
+    def as_dict(self) -> dict:
+        """Return stats as a plain dict."""
+        latencies = sorted(self.spawn_latencies)
+        return {
+            "hits": self.hits,
+            "waits": self.waits,
+            "wait_time": round(self.wait_time, 4),
+            "spawned": self.spawned,
+            "spawn_failures": self.spawn_failures,
+            "discarded": self.discarded,
+            "spawn_latency_avg": round(sum(latencies) / len(latencies), 4) if latencies else None,
+            "spawn_latency_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 4) if latencies else None,
+            "spawn_latency_max": round(latencies[-1], 4) if latencies else None,
+        }
+
+
+class DriverPool:
+    """Keep N warm ChromeSeleniumDrive sessions built from the same options.
+
+    A session that fails to start is retried with exponential backoff. After
+    max_spawn_failures failures in a row acquire raises instead of waiting,
+    until a session starts again.
+    """
+
+    def __init__(
+        self,
+        size=2,
+        service_factory=None,
+        options_kwargs=None,
+        spawn_workers=None,
+        max_spawn_failures=3,
+        spawn_backoff=1.0,
+        **drive_kwargs,
+    ) -> None:
+        self.size = size
+        self.max_spawn_failures = max_spawn_failures
+        self.spawn_backoff = spawn_backoff
+        self.service_factory = service_factory or partial(create_service, chrome_root=drive_kwargs.get("chrome_root"))
+        self.options_kwargs = options_kwargs or {}
+        self.drive_kwargs = drive_kwargs
+        self.stats = PoolStats()
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._drives = set()
+        self._pending = 0
+        self._closed = False
+        self._stopped = threading.Event()
+        self._failures = 0
+        self._spawn_error = None
+        self._spawner = ThreadPoolExecutor(
+            max_workers=spawn_workers or size,
+            thread_name_prefix="chrome-pool-spawn",
+        )
+        for _ in range(size):
+            self._schedule_spawn()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _schedule_spawn(self, delay=0.0) -> None:
+        # Submit under the lock, so close() cannot shut the spawner down in between.
+        with self._lock:
+            if self._closed:
+                return
+            self._pending += 1
+            self._spawner.submit(self._spawn, delay)
+
+    def _spawn(self, delay=0.0) -> None:
+        if delay and self._stopped.wait(delay):
+            with self._lock:
+                self._pending -= 1
+            return
+        started = perf_counter()
+        drive = None
+        try:
+            drive = ChromeSeleniumDrive(service=self.service_factory(), **self.drive_kwargs)
+            drive.create_driver(drive.set_options(**self.options_kwargs))
+        # create_driver calls sys.exit on launch failures, keep the spawner alive.
+        except (Exception, SystemExit) as error:  # pylint: disable=broad-except
+            LOG.error(f"Falha ao iniciar sessao do pool: {error!r}")
+            with self._lock:
+                self._pending -= 1
+                self.stats.spawn_failures += 1
+                self._failures += 1
+                failures = self._failures
+                if failures >= self.max_spawn_failures and self._spawn_error is None:
+                    self._spawn_error = error
+                    self._idle.put(_SPAWN_FAILED)
+            if drive is not None:
+                drive.quit()
+            self._schedule_spawn(min(self.spawn_backoff * 2 ** (failures - 1), MAX_SPAWN_BACKOFF))
+            return
+
+        with self._lock:
+            self._pending -= 1
+            self._failures = 0
+            self._spawn_error = None
+            closed = self._closed
+            if not closed:
+                self._drives.add(drive)
+                self.stats.spawned += 1
+                self.stats.spawn_latencies.append(perf_counter() - started)
+        if closed:
+            drive.quit()
+            return
+        self._idle.put(drive)
+
+    @staticmethod
+    def is_healthy(drive) -> bool:
+        """Check that the session and chromedriver still answer."""
+        process = getattr(drive.service, "process", None)
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            return drive.driver.execute_script("return 1;") == 1
+        except (AttributeError, JavascriptException, *DEAD_SESSION_ERRORS):
+            return False
+
+    @staticmethod
+    def reset(drive) -> None:
+        """Leave a session as a fresh one: one blank tab, no cookies or storage."""
+        driver = drive.driver
+        if getattr(drive, "context_host", None) is not None:
+            drive.context_host.close()
+            drive.context_host = None
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.execute_script(RESET_STORAGE_SCRIPT)
+        try:
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except (AttributeError, WebDriverException):
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def _discard(self, drive) -> None:
+        with self._lock:
+            self._drives.discard(drive)
+            self.stats.discarded += 1
+            closed = self._closed
+            if not closed:
+                self._spawner.submit(drive.quit)
+        if closed:
+            drive.quit()
+            return
+        self._schedule_spawn()
+
+    def _take(self, drive):
+        """Return drive, None for a stale failure marker, or raise while spawns fail."""
+        if drive is not _SPAWN_FAILED:
+            return drive
+        with self._lock:
+            error = self._spawn_error
+        if error is None:
+            return None
+        try:
+            # A session checked in after the marker is still good to lend.
+            drive = self._idle.get_nowait()
+        except queue.Empty:
+            drive = None
+        # Put the marker back so every other waiter wakes up too.
+        self._idle.put(_SPAWN_FAILED)
+        if drive is not None:
+            return drive
+        raise RuntimeError(f"DriverPool could not start a session: {error!r}") from error
+
+    def checkin(self, drive) -> None:
+        """Return a session to the pool, replacing it when it is dead."""
+        if self._closed:
+            drive.quit()
+            return
+        try:
+            healthy = self.is_healthy(drive)
+            if healthy:
+                self.reset(drive)
+        except DEAD_SESSION_ERRORS:
+            healthy = False
+        if not healthy:
+            LOG.info("Sessao morta devolvida ao pool, substituindo.")
+            self._discard(drive)
+            return
+        self._idle.put(drive)
+
+    def acquire(self, timeout=None) -> ChromeSeleniumDrive:
+        """Take a warm session, waiting up to timeout seconds for one."""
+        if self._closed:
+            raise RuntimeError("DriverPool is closed.")
+        try:
+            drive = self._take(self._idle.get_nowait())
+            if drive is not None:
+                with self._lock:
+                    self.stats.hits += 1
+                return drive
+        except queue.Empty:
+            pass
+
+        started = perf_counter()
+        try:
+            while True:
+                remaining = None if timeout is None else max(0.0, started + timeout - perf_counter())
+                try:
+                    drive = self._take(self._idle.get(timeout=remaining))
+                except queue.Empty as error:
+                    raise TimeoutError(f"No warm session available after {timeout}s.") from error
+                if drive is not None:
+                    return drive
+        finally:
+            with self._lock:
+                self.stats.waits += 1
+                self.stats.wait_time += perf_counter() - started
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Context manager that lends a warm session and checks it back in."""
+        drive = self.acquire(timeout=timeout)
+        try:
+            yield drive
+        finally:
+            self.checkin(drive)
+
+    def get_stats(self) -> dict:
+        """Return pool stats plus current occupancy."""
+        with self._lock:
+            stats = self.stats.as_dict()
+            stats["size"] = self.size
+            stats["alive"] = len(self._drives)
+            stats["pending"] = self._pending
+            marker = 1 if self._spawn_error is not None else 0
+        stats["idle"] = max(0, self._idle.qsize() - marker)
+        stats["in_use"] = stats["alive"] - stats["idle"]
+        return stats
+
+    def close(self) -> None:
+        """Quit every session owned by the pool."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            drives = list(self._drives)
+            self._drives.clear()
+        self._stopped.set()
+        self._spawner.shutdown(wait=True)
+        for drive in drives:
+            drive.quit()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""Content addressed cache of downloaded CRX files."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from os.path import exists, join
+from time import time
+
+from chrome_manager.storage import CACHE_DIR, FileLock, read_json, write_json
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+
+class ExtensionCache:
+    """CRX files stored by sha256 and indexed by (extension id, version, arch).
+
+    Entries younger than max_age are served without any request, older ones
+    are revalidated with If-None-Match/If-Modified-Since. The least recently
+    used entries are evicted when blobs go over max_bytes.
+    """
+
+    def __init__(self, root=None, max_bytes=512 * 1024 * 1024, max_age=24 * 3600) -> None:
+        self.root = root or join(CACHE_DIR, "extensions")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index_file = join(self.root, "index.json")
+        self._file_lock = FileLock(join(self.root, "index.lock"))
+        self._lock = threading.Lock()
+        os.makedirs(join(self.root, "tmp"), exist_ok=True)
+
+    @staticmethod
+    def key(extension_id, version, arch) -> str:
+        """Return the index key of an extension build."""
+        return f"{extension_id}/{version}/{arch}"
+
+    def blob_path(self, sha256) -> str:
+        """Return where the blob with this hash is stored."""
+        return join(self.root, "blobs", sha256[:2], sha256 + ".crx")
+
+    def _update(self, func):
+        with self._lock, self._file_lock:
+            index = read_json(self.index_file, {})
+            result = func(index)
+            write_json(self.index_file, index)
+            return result
+
+    def get(self, key, fresh_only=True):
+        """Return the cached entry for key, touching it, or None."""
+        def touch(index):
+            entry = index.get(key)
+            if not entry or not exists(self.blob_path(entry["sha256"])):
+                return None
+            if fresh_only and time() - entry["fetched_at"] > self.max_age:
+                return None
+            entry["last_access"] = time()
+            return dict(entry)
+
+        return self._update(touch)
+
+    def fetch(self, session, url, key, timeout=60) -> str:
+        """Return the CRX for key, downloading or revalidating only when needed."""
+        entry = self.get(key)
+        if entry:
+            return self.blob_path(entry["sha256"])
+
+        stale = read_json(self.index_file, {}).get(key)
+        headers = {}
+        if stale and exists(self.blob_path(stale["sha256"])):
+            if stale.get("etag"):
+                headers["If-None-Match"] = stale["etag"]
+            if stale.get("last_modified"):
+                headers["If-Modified-Since"] = stale["last_modified"]
+
+        path = self._download(session, url, key, headers, stale, timeout)
+        if path is None:
+            # Evicted while we revalidated, and a 304 has no body to store.
+            path = self._download(session, url, key, {}, None, timeout)
+        return path
+
+    def _download(self, session, url, key, headers, stale, timeout):
+        """Store the response for key and return its path, None on a 304 for a vanished entry."""
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304 and headers:
+                def revalidate(index):
+                    entry = index.get(key)
+                    if not entry or entry["sha256"] != stale["sha256"] or not exists(self.blob_path(stale["sha256"])):
+                        return False
+                    entry["fetched_at"] = entry["last_access"] = time()
+                    return True
+                return self.blob_path(stale["sha256"]) if self._update(revalidate) else None
+            response.raise_for_status()
+            sha256, size = self._store(response)
+            entry = {
+                "sha256": sha256,
+                "size": size,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched_at": time(),
+                "last_access": time(),
+            }
+
+        def insert(index):
+            index[key] = entry
+            self._evict(index, keep=key)
+        self._update(insert)
+        return self.blob_path(sha256)
+
+    def _store(self, response):
+        digest = hashlib.sha256()
+        size = 0
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=join(self.root, "tmp"), suffix=".crx")
+        try:
+            with os.fdopen(file_descriptor, "wb") as binary_file:
+                for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                    digest.update(data)
+                    binary_file.write(data)
+                    size += len(data)
+            sha256 = digest.hexdigest()
+            blob = self.blob_path(sha256)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(tmp_path, blob)
+        finally:
+            if exists(tmp_path):
+                os.remove(tmp_path)
+        return sha256, size
+
+    def _evict(self, index, keep=None) -> None:
+        blobs = {}
+        for entry in index.values():
+            blobs[entry["sha256"]] = entry["size"]
+        total = sum(blobs.values())
+        for key, entry in sorted(index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            del index[key]
+            sha256 = entry["sha256"]
+            if any(other["sha256"] == sha256 for other in index.values()):
+                continue
+            total -= blobs[sha256]
+            if exists(self.blob_path(sha256)):
+                os.remove(self.blob_path(sha256))
+            LOG.info(f"Extensao removida do cache: {key}")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""Evaluate a whole extraction spec in one WebDriver round trip."""
+
+from time import perf_counter
+
+from chrome_manager.waits import ensure_script_timeout
+
+# Waits until the document reaches readyState and every ready selector
+# matches (or the deadline expires), then extracts every field at once.
+EXTRACT_SCRIPT = """
+var spec = arguments[0], readySelectors = arguments[1], readyState = arguments[2];
+var timeoutMs = arguments[3], done = arguments[arguments.length - 1];
+var started = Date.now(), deadline = started + timeoutMs, finished = false;
+var observer = null, timer = null;
+var states = {loading: 0, interactive: 1, complete: 2};
+
+function read(element, get) {
+    if (!element) { return null; }
+    if (get.charAt(0) === "@") { return element.getAttribute(get.slice(1)); }
+    switch (get) {
+        case "html": return element.innerHTML;
+        case "outer_html": return element.outerHTML;
+        case "inner_text": return element.innerText;
+        case "value": return element.value === undefined ? null : element.value;
+        default: return element.textContent === null ? null : element.textContent.trim();
+    }
+}
+function field(rule) {
+    if (rule.selector === "$title") { return document.title; }
+    if (rule.selector === "$url") { return location.href; }
+    if (rule.all) {
+        return Array.prototype.map.call(
+            document.querySelectorAll(rule.selector), function (el) { return read(el, rule.get); });
+    }
+    return read(document.querySelector(rule.selector), rule.get);
+}
+function isReady() {
+    if (states[document.readyState] < states[readyState]) { return false; }
+    for (var i = 0; i < readySelectors.length; i++) {
+        if (!document.querySelector(readySelectors[i])) { return false; }
+    }
+    return true;
+}
+function finish(ready) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(timer);
+    document.removeEventListener("readystatechange", check);
+    var data = {}, errors = {};
+    for (var name in spec) {
+        try { data[name] = field(spec[name]); } catch (e) { data[name] = null; errors[name] = String(e); }
+    }
+    done({ready: ready, data: data, errors: errors, elapsed_ms: Date.now() - started});
+}
+function check() {
+    if (isReady()) { finish(true); } else if (Date.now() >= deadline) { finish(false); }
+}
+
+check();
+if (!finished) {
+    observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true, attributes: true});
+    document.addEventListener("readystatechange", check);
+    timer = setTimeout(function () { finish(isReady()); }, Math.max(0, deadline - Date.now()));
+}
+"""
+
+
+class ExtractionResult:
+    """Fields extracted from a page and whether it got ready in time."""
+
+    def __init__(self, ready, data, errors, elapsed) -> None:
+        self.ready = ready
+        self.data = data
+        self.errors = errors
+        self.elapsed = elapsed
+
+    def __bool__(self) -> bool:
+        return bool(self.ready)
+
+    def __repr__(self) -> str:
+        return f"ExtractionResult(ready={self.ready}, data={self.data!r}, elapsed={self.elapsed:.3f})"
+
+
+def normalize_spec(spec) -> dict:
+    """Expand the short forms of a spec.
+
+    "h1" reads the text of the first match. A dict takes selector, get
+    ("text", "inner_text", "html", "outer_html", "value" or "@attribute")
+    and all (every match as a list). "$title" and "$url" read the document.
+    """
+    rules = {}
+    for name, rule in spec.items():
+        if isinstance(rule, str):
+            rule = {"selector": rule}
+        rules[name] = {
+            "selector": rule["selector"],
+            "get": rule.get("get", "text"),
+            "all": bool(rule.get("all", False)),
+        }
+    return rules
+
+
+def extract(driver, spec, ready_selectors=(), ready_state="interactive", wait_time=10) -> ExtractionResult:
+    """Wait for readiness and extract spec with one execute_async_script."""
+    started = perf_counter()
+    ensure_script_timeout(driver, wait_time)
+    result = driver.execute_async_script(
+        EXTRACT_SCRIPT, normalize_spec(spec), list(ready_selectors), ready_state, int(wait_time * 1000)
+    )
+    return ExtractionResult(result["ready"], result["data"], result["errors"], perf_counter() - started)
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+"""Fetch pages over plain HTTP and fall back to Chrome only when needed."""
+
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from time import time
+from urllib.parse import urlsplit
+
+from chrome_manager.downloader import shared_session
+from chrome_manager.storage import cache_path
+
+LOG = logging.getLogger(__name__)
+
+NOSCRIPT_MARKERS = (
+    "enable javascript",
+    "javascript is required",
+    "javascript is disabled",
+    "requires javascript",
+    "habilite o javascript",
+    "ative o javascript",
+)
+
+_SKIP_TEXT_TAGS = {"script", "style", "noscript", "template", "title"}
+
+
+def _parse_selector(selector):
+    """Split a compound selector like div.card#main[data-id] into its parts.
+
+    Only the last compound of a selector with combinators is kept, which
+    makes the match looser than the browser one, never stricter.
+    """
+    compound = selector.replace(">", " ").replace("+", " ").replace("~", " ").split()[-1]
+    tag, ids, classes, attrs = None, [], [], []
+    current, kind = "", "tag"
+    for char in compound + "\0":
+        if char in "#.[]\0":
+            if current:
+                if kind == "tag":
+                    tag = current.lower()
+                elif kind == "id":
+                    ids.append(current)
+                elif kind == "class":
+                    classes.append(current)
+                elif kind == "attr":
+                    attrs.append(current.split("=", 1)[0].strip().lower())
+            current = ""
+            kind = {"#": "id", ".": "class", "[": "attr"}.get(char, "tag")
+        else:
+            current += char
+    return tag if tag != "*" else None, ids, classes, attrs
+
+
+class PageSignals(HTMLParser):
+    """Collect visible and noscript text and which required selectors matched."""
+
+    def __init__(self, selectors=()) -> None:
+        super().__init__(convert_charrefs=True)
+        self.text_length = 0
+        self.visible_text = []
+        self.noscript_text = []
+        self.missing = {selector: _parse_selector(selector) for selector in selectors}
+        self._skip = 0
+        self._in_noscript = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip += 1
+            self._in_noscript = self._in_noscript or tag == "noscript"
+        if self.missing:
+            attributes = dict(attrs)
+            classes = (attributes.get("class") or "").split()
+            for selector, (name, ids, wanted, needed) in list(self.missing.items()):
+                if (
+                    (name is None or name == tag)
+                    and all(attributes.get("id") == value for value in ids)
+                    and all(value in classes for value in wanted)
+                    and all(attr in attributes for attr in needed)
+                ):
+                    del self.missing[selector]
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TEXT_TAGS and self._skip:
+            self._skip -= 1
+            if tag == "noscript":
+                self._in_noscript = False
+
+    def handle_data(self, data):
+        if self._in_noscript:
+            self.noscript_text.append(data)
+        elif not self._skip:
+            data = data.strip()
+            if data:
+                self.text_length += len(data)
+                self.visible_text.append(data)
+
+    def has_marker(self, markers) -> bool:
+        """Tell if a lowercase marker shows in noscript or visible text, never in scripts or attributes."""
+        text = " ".join(self.noscript_text + self.visible_text).lower()
+        return any(marker in text for marker in markers)
+
+
+class DomainTable:
+    """Per domain counts of pages that needed the browser, kept in sqlite.
+
+    Counts older than ttl seconds are stale: the domain is tried over HTTP
+    again and learned from scratch, so a site that moved to server side
+    rendering leaves the browser path.
+    """
+
+    def __init__(self, path=None, min_samples=3, ratio=0.5, ttl=7 * 24 * 3600) -> None:
+        self.min_samples = min_samples
+        self.ratio = ratio
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path or cache_path("needs_js.sqlite"), check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS domains ("
+                "domain TEXT PRIMARY KEY, http INTEGER NOT NULL DEFAULT 0, "
+                "browser INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+            )
+
+    def needs_js(self, domain) -> bool:
+        """Tell if pages of domain are known to need the browser."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT http, browser, updated_at FROM domains WHERE domain = ?", (domain,)
+            ).fetchone()
+        if not row:
+            return False
+        http, browser, updated_at = row
+        if time() - updated_at > self.ttl:
+            return False
+        return browser >= self.min_samples and browser >= self.ratio * (http + browser)
+
+    def record(self, domain, needed_js) -> None:
+        """Count one page of domain served over HTTP or escalated to Chrome."""
+        column = "browser" if needed_js else "http"
+        now = time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM domains WHERE domain = ? AND updated_at < ?", (domain, now - self.ttl)
+            )
+            self._connection.execute(
+                f"INSERT INTO domains (domain, {column}, updated_at) VALUES (?, 1, ?) "
+                f"ON CONFLICT(domain) DO UPDATE SET {column} = {column} + 1, updated_at = excluded.updated_at",
+                (domain, now),
+            )
+
+    def forget(self, domain) -> None:
+        """Drop what was learned about domain."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM domains WHERE domain = ?", (domain,))
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+
+class HybridFetcher:
+    """Try a pooled HTTP request first and use drive.scrap_tab_two only when needed.
+
+    The browser is used when the domain is known to need JavaScript, the
+    response is not a 200, the page has a noscript marker, too little
+    visible text or misses one of required_selectors.
+    """
+
+    def __init__(
+        self,
+        drive,
+        session=None,
+        required_selectors=(),
+        markers=NOSCRIPT_MARKERS,
+        min_text_length=200,
+        table=None,
+        timeout=15,
+        wait_time=2,
+    ) -> None:
+        self.drive = drive
+        self.session = session or shared_session()
+        self.required_selectors = tuple(required_selectors)
+        self.markers = tuple(marker.lower() for marker in markers)
+        self.min_text_length = min_text_length
+        self.table = table or DomainTable()
+        self.timeout = timeout
+        self.wait_time = wait_time
+        self.headers = {
+            "User-Agent": drive.user_agent,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+        }
+        self.stats = {"http": 0, "browser": 0, "reasons": {}}
+        self._stats_lock = threading.Lock()
+
+    def escalation_reason(self, response) -> None | str:
+        """Return why response is not good enough, None when it is."""
+        if response.status_code != 200:
+            return f"status {response.status_code}"
+        content_type = response.headers.get("Content-Type", "")
+        if content_type and "html" not in content_type:
+            return None
+        signals = PageSignals(self.required_selectors)
+        signals.feed(response.text)
+        signals.close()
+        if signals.has_marker(self.markers):
+            return "noscript"
+        if signals.text_length < self.min_text_length:
+            return "empty body"
+        if signals.missing:
+            return "missing selectors"
+        return None
+
+    def fetch_http(self, url):
+        """Return (html, reason) of the HTTP attempt, reason is None on success."""
+        domain = urlsplit(url).hostname or ""
+        if self.table.needs_js(domain):
+            return None, "domain needs js"
+        try:
+            response = self.session.get(url, headers=self.headers, timeout=self.timeout)
+        except OSError as error:
+            LOG.info(f"Falha na requisicao HTTP de {url}: {error!r}")
+            return None, "request failed"
+        reason = self.escalation_reason(response)
+        if reason is None:
+            self.table.record(domain, False)
+            return response.text, None
+        if reason in ("noscript", "empty body", "missing selectors"):
+            self.table.record(domain, True)
+        return None, reason
+
+    def _count(self, source, reason=None) -> None:
+        with self._stats_lock:
+            self.stats[source] += 1
+            if reason:
+                self.stats["reasons"][reason] = self.stats["reasons"].get(reason, 0) + 1
+
+    def fetch(self, url):
+        """Return (html, source) where source is "http" or "browser"."""
+        html, reason = self.fetch_http(url)
+        if reason is None:
+            self._count("http")
+            return html, "http"
+        self._count("browser", reason)
+        return self.drive.scrap_tab_two(url, wait_time=self.wait_time), "browser"
+
+    def fetch_many(self, urls, max_workers=8):
+        """Yield (url, html, source), HTTP fetches run in parallel.
+
+        Escalations go through the browser one at a time in the calling
+        thread, since the drive is not thread safe.
+        """
+        urls = list(urls)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            escalated = []
+            for url, (html, reason) in zip(urls, executor.map(self.fetch_http, urls)):
+                if reason is None:
+                    self._count("http")
+                    yield url, html, "http"
+                else:
+                    self._count("browser", reason)
+                    escalated.append(url)
+        for url in escalated:
+            yield url, self.drive.scrap_tab_two(url, wait_time=self.wait_time), "browser"
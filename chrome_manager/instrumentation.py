@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""Opt-in latency instrumentation for WebDriver commands and drive helpers."""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, sleep
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Cumulative-on-export latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value) -> None:
+        """Record one value in seconds."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def as_dict(self) -> dict:
+        """Return count, sum and cumulative buckets."""
+        cumulative = []
+        running = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            running += count
+            cumulative.append([bound, running])
+        return {"count": self.count, "sum": round(self.total, 6), "buckets": cumulative}
+
+
+class Instrumentation:
+    """Collect per command latencies, helper sleep vs work time and bytes.
+
+    Recording is a dict lookup and a bisect under a lock, cheap enough to
+    leave on in production.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.commands = {}
+        self.helpers = {}
+        self.helper_sleep = {}
+        self.response_bytes = {}
+        self.sleep_total = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, driver) -> None:
+        """Time every command sent through the driver remote connection."""
+        executor = driver.command_executor
+        original = executor.execute
+
+        def execute(command, params):
+            started = perf_counter()
+            response = None
+            try:
+                response = original(command, params)
+                return response
+            finally:
+                value = response.get("value") if isinstance(response, dict) else None
+                # Lone surrogates can come through JSON escapes.
+                size = len(value.encode("utf-8", errors="replace")) if isinstance(value, str) else 0
+                self.observe_command(command, perf_counter() - started, size)
+
+        executor.execute = execute
+
+    def observe_command(self, command, seconds, size=0) -> None:
+        """Record one WebDriver command."""
+        with self._lock:
+            histogram = self.commands.get(command)
+            if histogram is None:
+                histogram = self.commands[command] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if size:
+                self.response_bytes[command] = self.response_bytes.get(command, 0) + size
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "helpers", None)
+        if stack is None:
+            stack = self._local.helpers = []
+        return stack
+
+    @contextmanager
+    def helper(self, name):
+        """Time a ChromeSeleniumDrive helper call."""
+        stack = self._stack()
+        stack.append(name)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = perf_counter() - started
+            with self._lock:
+                histogram = self.helpers.get(name)
+                if histogram is None:
+                    histogram = self.helpers[name] = Histogram(self.buckets)
+                histogram.observe(elapsed)
+
+    def sleep(self, seconds) -> None:
+        """Sleep and charge the time to every helper running in this thread."""
+        started = perf_counter()
+        sleep(seconds)
+        slept = perf_counter() - started
+        helpers = set(self._stack())
+        with self._lock:
+            self.sleep_total += slept
+            for name in helpers:
+                self.helper_sleep[name] = self.helper_sleep.get(name, 0.0) + slept
+
+    def snapshot(self) -> dict:
+        """Return every metric as a JSON serializable dict."""
+        with self._lock:
+            helpers = {}
+            for name, histogram in self.helpers.items():
+                slept = self.helper_sleep.get(name, 0.0)
+                helpers[name] = dict(
+                    histogram.as_dict(),
+                    sleep_seconds=round(slept, 6),
+                    work_seconds=round(max(0.0, histogram.total - slept), 6),
+                )
+            return {
+                "commands": {name: histogram.as_dict() for name, histogram in self.commands.items()},
+                "helpers": helpers,
+                "response_bytes": dict(self.response_bytes),
+                "sleep_seconds": round(self.sleep_total, 6),
+            }
+
+    def to_json(self) -> str:
+        """Return the snapshot as JSON."""
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix="chrome_manager") -> str:
+        """Return metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram(metric, label, items, help_text):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, data in sorted(items.items()):
+                for bound, count in data["buckets"]:
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {data["sum"]}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {data["count"]}')
+
+        def counter(metric, label, items, help_text):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, value in sorted(items.items()):
+                lines.append(f'{metric}{{{label}="{name}"}} {value}')
+
+        histogram(f"{prefix}_command_seconds", "command", snapshot["commands"], "WebDriver command latency.")
+        histogram(f"{prefix}_helper_seconds", "helper", snapshot["helpers"], "ChromeSeleniumDrive helper latency.")
+        counter(
+            f"{prefix}_helper_sleep_seconds_total", "helper",
+            {name: data["sleep_seconds"] for name, data in snapshot["helpers"].items()},
+            "Time helpers spent in sleep().",
+        )
+        counter(
+            f"{prefix}_command_response_bytes_total", "command", snapshot["response_bytes"],
+            "UTF-8 size of string command results, such as page_source.",
+        )
+        lines.append(f"# HELP {prefix}_sleep_seconds_total Time spent in sleep().")
+        lines.append(f"# TYPE {prefix}_sleep_seconds_total counter")
+        lines.append(f"{prefix}_sleep_seconds_total {snapshot['sleep_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path) -> None:
+        """Write metrics for the node_exporter textfile collector."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as metrics_file:
+            metrics_file.write(self.to_prometheus())
+        # Renamed into place so the collector never reads half a file.
+        os.replace(tmp_path, path)
+
+    def serve(self, port=9464, host="127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics (Prometheus) and /snapshot.json on a daemon thread."""
+        instrumentation = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Metrics endpoint."""
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Answer metrics requests."""
+                if self.path.startswith("/snapshot.json"):
+                    data, content_type = instrumentation.to_json(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    data, content_type = instrumentation.to_prometheus(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                body = data.encode("utf8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def instrumented(method):
+    """Time a ChromeSeleniumDrive method when the drive has instrumentation."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.instrumentation is None:
+            return method(self, *args, **kwargs)
+        with self.instrumentation.helper(method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
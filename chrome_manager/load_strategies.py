@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+"""Page load strategies for ChromeSeleniumDrive.wait_page_load."""
+
+import logging
+from time import monotonic, perf_counter, sleep
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+
+from chrome_manager.perf_log import performance_log
+from chrome_manager.waits import ensure_script_timeout
+
+LOG = logging.getLogger(__name__)
+
+# Shared by the in page strategies, finish() reports navigation timings
+# along with the outcome.
+_PRELUDE = """var param = arguments[0], timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var started = Date.now(), deadline = started + timeoutMs, finished = false, timer = null;
+var states = {loading: 0, interactive: 1, complete: 2};
+
+function timings() {
+    var nav = performance.getEntriesByType("navigation")[0];
+    if (!nav) { return {}; }
+    return {response_end: nav.responseEnd, dom_content_loaded: nav.domContentLoadedEventEnd,
+            load: nav.loadEventEnd, resources: performance.getEntriesByType("resource").length};
+}
+function finish(ok, value) {
+    if (finished) { return; }
+    finished = true;
+    clearTimeout(timer);
+    document.removeEventListener("readystatechange", check);
+    done({ok: ok, value: value === undefined ? null : value, state: document.readyState,
+          timings: timings(), waited_ms: Date.now() - started});
+}
+"""
+
+READY_STATE_SCRIPT = _PRELUDE + """
+function check() {
+    if (states[document.readyState] >= states[param]) { finish(true); }
+    else if (Date.now() >= deadline) { finish(false); }
+}
+check();
+if (!finished) {
+    document.addEventListener("readystatechange", check);
+    timer = setTimeout(check, Math.max(0, deadline - Date.now()));
+}
+"""
+
+PREDICATE_SCRIPT = _PRELUDE + """
+function predicate() { __PREDICATE__ }
+function check() {
+    var value;
+    try { value = predicate(); } catch (e) { value = null; }
+    if (value) { finish(true, value); }
+    else if (Date.now() >= deadline) { finish(false); }
+    else { timer = setTimeout(check, Math.min(param, Math.max(0, deadline - Date.now()))); }
+}
+check();
+"""
+
+# Without the performance log only finished requests are visible, so idle
+# means load fired and no resource finished for param ms.
+RESOURCE_IDLE_SCRIPT = _PRELUDE + """
+var count = -1, quietSince = Date.now();
+function check() {
+    var current = performance.getEntriesByType("resource").length;
+    if (current !== count) { count = current; quietSince = Date.now(); }
+    if (document.readyState === "complete" && Date.now() - quietSince >= param) { finish(true); }
+    else if (Date.now() >= deadline) { finish(false); }
+    else { timer = setTimeout(check, 50); }
+}
+check();
+"""
+
+TIMINGS_SCRIPT = _PRELUDE + "finish(true);"
+
+
+class LoadResult:
+    """Outcome of a load strategy and how long it took."""
+
+    def __init__(self, ok, strategy, elapsed, state=None, timings=None, value=None) -> None:
+        self.ok = ok
+        self.strategy = strategy
+        self.elapsed = elapsed
+        self.state = state
+        self.timings = timings or {}
+        self.value = value
+
+    def __bool__(self) -> bool:
+        return bool(self.ok)
+
+    def __repr__(self) -> str:
+        return f"LoadResult(ok={self.ok}, strategy={self.strategy!r}, elapsed={self.elapsed:.3f}, state={self.state!r})"
+
+
+def run_load_script(driver, script, param, wait_time, sleep_func=sleep) -> dict:
+    """Run an in page strategy script, starting over when the document is replaced."""
+    deadline = monotonic() + wait_time
+    while True:
+        remaining = max(0, deadline - monotonic())
+        ensure_script_timeout(driver, remaining)
+        try:
+            return driver.execute_async_script(script, param, int(remaining * 1000))
+        except (JavascriptException, StaleElementReferenceException, TimeoutException):
+            if monotonic() >= deadline:
+                return {"ok": False}
+            sleep_func(min(0.05, max(0, deadline - monotonic())))
+
+
+class ReadyStateStrategy:
+    """Wait for DOMContentLoaded ("interactive") or load ("complete")."""
+
+    def __init__(self, name, ready_state) -> None:
+        self.name = name
+        self.ready_state = ready_state
+
+    def wait(self, driver, wait_time, sleep_func=sleep, network_events=False) -> LoadResult:
+        """Wait on the current page for at most wait_time seconds."""
+        started = perf_counter()
+        result = run_load_script(driver, READY_STATE_SCRIPT, self.ready_state, wait_time, sleep_func)
+        return LoadResult(
+            result["ok"], self.name, perf_counter() - started, result.get("state"), result.get("timings")
+        )
+
+
+class PredicateStrategy:
+    """Wait until a JavaScript function body returns a truthy value.
+
+    The body is inlined in the WebDriver script, so page CSP does not apply.
+    """
+
+    def __init__(self, body, interval_ms=50, name="predicate") -> None:
+        self.name = name
+        self.script = PREDICATE_SCRIPT.replace("__PREDICATE__", body)
+        self.interval_ms = interval_ms
+
+    def wait(self, driver, wait_time, sleep_func=sleep, network_events=False) -> LoadResult:
+        """Wait on the current page for at most wait_time seconds."""
+        started = perf_counter()
+        result = run_load_script(driver, self.script, self.interval_ms, wait_time, sleep_func)
+        return LoadResult(
+            result["ok"], self.name, perf_counter() - started, result.get("state"),
+            result.get("timings"), result.get("value"),
+        )
+
+
+class NetworkIdleStrategy:
+    """Wait for at most max_inflight requests during idle_time seconds.
+
+    With network_events, in flight requests come from Network events of the
+    performance log, counting those of the main frame of the current tab.
+    Otherwise the page is idle once load fired and no resource finished for
+    idle_time.
+    """
+
+    def __init__(self, max_inflight=0, idle_time=0.5, poll_interval=0.1, name=None) -> None:
+        self.name = name or f"networkidle{max_inflight}"
+        self.max_inflight = max_inflight
+        self.idle_time = idle_time
+        self.poll_interval = poll_interval
+
+    def wait(self, driver, wait_time, sleep_func=sleep, network_events=False) -> LoadResult:
+        """Wait on the current page for at most wait_time seconds."""
+        started = perf_counter()
+        if not network_events:
+            result = run_load_script(
+                driver, RESOURCE_IDLE_SCRIPT, int(self.idle_time * 1000), wait_time, sleep_func
+            )
+            return LoadResult(
+                result["ok"], self.name, perf_counter() - started, result.get("state"), result.get("timings")
+            )
+
+        deadline = monotonic() + wait_time
+        ok = self._wait_events(driver, deadline, sleep_func)
+        remaining = deadline - monotonic()
+        # Timings are a bonus, not worth going past wait_time.
+        result = run_load_script(driver, TIMINGS_SCRIPT, None, remaining, sleep_func) if remaining > 0 else {}
+        return LoadResult(ok, self.name, perf_counter() - started, result.get("state"), result.get("timings"))
+
+    def _wait_events(self, driver, deadline, sleep_func) -> bool:
+        inflight = set()
+        # chromedriver uses the DevTools target id as window handle, which is
+        # also the frameId of the main frame.
+        frame_id = driver.current_window_handle
+
+        def sent(params, _entry):
+            if params.get("frameId") == frame_id:
+                inflight.add(params.get("requestId"))
+
+        def ended(params, _entry):
+            inflight.discard(params.get("requestId"))
+
+        log = performance_log(driver)
+        subscriptions = [
+            ("Network.requestWillBeSent", sent),
+            ("Network.loadingFinished", ended),
+            ("Network.loadingFailed", ended),
+        ]
+        for method, callback in subscriptions:
+            log.subscribe(method, callback)
+        try:
+            quiet_since = None
+            while True:
+                log.poll()
+                now = monotonic()
+                if len(inflight) > self.max_inflight:
+                    quiet_since = None
+                elif quiet_since is None:
+                    quiet_since = now
+                elif now - quiet_since >= self.idle_time:
+                    if driver.execute_script("return document.readyState;") == "complete":
+                        return True
+                if now >= deadline:
+                    return False
+                sleep_func(min(self.poll_interval, max(0, deadline - now)))
+        finally:
+            for method, callback in subscriptions:
+                log.unsubscribe(method, callback)
+
+
+STRATEGIES = {}
+
+
+def register_strategy(strategy):
+    """Make a strategy available by name."""
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+register_strategy(ReadyStateStrategy("domcontentloaded", "interactive"))
+register_strategy(ReadyStateStrategy("load", "complete"))
+register_strategy(NetworkIdleStrategy(0, name="networkidle0"))
+register_strategy(NetworkIdleStrategy(2, name="networkidle2"))
+
+
+def get_strategy(strategy):
+    """Accept a strategy or the name of a registered one."""
+    if hasattr(strategy, "wait"):
+        return strategy
+    try:
+        return STRATEGIES[strategy]
+    except KeyError as error:
+        raise ValueError(f"Unknown load strategy {strategy!r}") from error
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""Compressed on-disk cache of scraped pages with TTL and LRU eviction."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from os.path import join
+from time import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from chrome_manager.storage import CACHE_DIR
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url) -> str:
+    """Lowercase scheme and host, drop default port and fragment, sort the query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def _compress(data):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            return None
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class PageCache:
+    """Pages keyed by normalized URL plus a session variant.
+
+    Blobs are sharded files written with a rename, the index lives in a
+    sqlite database in WAL mode, so many worker processes can share one
+    cache. Entries expire after ttl seconds and the least recently used
+    ones are evicted when the blobs go over max_bytes.
+    """
+
+    def __init__(self, root=None, ttl=15 * 60, max_bytes=1024 ** 3) -> None:
+        self.root = root or join(CACHE_DIR, "pages")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        os.makedirs(join(self.root, "tmp"), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, url TEXT NOT NULL, variant TEXT NOT NULL, codec TEXT NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(join(self.root, "index.sqlite"), timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(url, variant="") -> str:
+        """Return the cache key of url for a session variant."""
+        return hashlib.sha256(f"{normalize_url(url)}\0{variant}".encode("utf8")).hexdigest()
+
+    def blob_path(self, key) -> str:
+        """Return where the compressed page of key is stored."""
+        return join(self.root, key[:2], key[2:4], key)
+
+    def _count(self, name, amount=1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def get(self, url, variant="") -> None | str:
+        """Return the cached page or None."""
+        key = self.key(url, variant)
+        connection = self._connection()
+        row = connection.execute("SELECT codec, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        codec, expires_at = row
+        if expires_at <= time():
+            self._count("expired")
+            self._count("misses")
+            self._delete([key])
+            return None
+        try:
+            with open(self.blob_path(key), "rb") as blob:
+                data = _decompress(codec, blob.read())
+        except (OSError, zlib.error) as error:
+            LOG.info(f"Entrada de cache ilegivel para {url}: {error!r}")
+            data = None
+        if data is None:
+            self._count("misses")
+            return None
+        with connection:
+            connection.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time(), key))
+        self._count("hits")
+        return data.decode("utf8")
+
+    def put(self, url, html, variant="", ttl=None) -> None:
+        """Store a page, evicting old entries when over max_bytes."""
+        key = self.key(url, variant)
+        codec, data = _compress(html.encode("utf8"))
+        path = self.blob_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=join(self.root, "tmp"))
+        try:
+            with os.fdopen(file_descriptor, "wb") as blob:
+                blob.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        now = time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, normalize_url(url), variant, codec, len(data), now + (self.ttl if ttl is None else ttl), now),
+            )
+        self._count("stores")
+        self._evict()
+
+    def _delete(self, keys) -> None:
+        connection = self._connection()
+        with connection:
+            connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+        for key in keys:
+            try:
+                os.remove(self.blob_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        connection = self._connection()
+        expired = [key for (key,) in connection.execute("SELECT key FROM entries WHERE expires_at <= ?", (time(),))]
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires_at > ?", (time(),))
+        total = total.fetchone()[0]
+        victims = list(expired)
+        if total > self.max_bytes:
+            for key, size in connection.execute(
+                "SELECT key, size FROM entries WHERE expires_at > ? ORDER BY last_access", (time(),)
+            ):
+                victims.append(key)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        if victims:
+            self._delete(victims)
+            self._count("evictions", len(victims) - len(expired))
+
+    def invalidate(self, url, variant="") -> None:
+        """Drop the cached page of url."""
+        self._delete([self.key(url, variant)])
+
+    def size(self) -> int:
+        """Return the compressed size of every entry in bytes."""
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
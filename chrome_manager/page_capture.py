@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Capture huge page sources in chunks with bounded memory."""
+
+import gzip
+import uuid
+import zlib
+
+# The serialized document stays in the page, Python only ever holds one chunk.
+SERIALIZE_SCRIPT = """
+var doctype = document.doctype ? new XMLSerializer().serializeToString(document.doctype) : "";
+window[arguments[0]] = doctype + document.documentElement.outerHTML;
+return window[arguments[0]].length;
+"""
+
+# Never ends a chunk between the two halves of a surrogate pair.
+SLICE_SCRIPT = """
+var text = window[arguments[0]], start = arguments[1];
+var end = Math.min(start + arguments[2], text.length);
+var code = text.charCodeAt(end - 1);
+if (end < text.length && end - 1 > start && code >= 0xD800 && code <= 0xDBFF) { end -= 1; }
+return [text.substring(start, end), end];
+"""
+
+RELEASE_SCRIPT = "delete window[arguments[0]];"
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def iter_page_source(driver, chunk_size=CHUNK_SIZE):
+    """Yield the serialized DOM of the current page in chunks of text."""
+    key = f"__cmCapture_{uuid.uuid4().hex}"
+    total = driver.execute_script(SERIALIZE_SCRIPT, key)
+    position = 0
+    try:
+        while position < total:
+            chunk, position = driver.execute_script(SLICE_SCRIPT, key, position, chunk_size)
+            yield chunk
+    finally:
+        driver.execute_script(RELEASE_SCRIPT, key)
+
+
+class _ZlibWriter:
+    """Binary file wrapper compressing with zlib."""
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+        self.compressor = zlib.compressobj()
+
+    def write(self, data) -> None:
+        self.raw.write(self.compressor.compress(data))
+
+    def close(self) -> None:
+        self.raw.write(self.compressor.flush())
+
+
+def save_page_source(driver, dest, compress=None, chunk_size=CHUNK_SIZE, encoding="utf-8") -> int:
+    """Write the current page source to a path or binary file object.
+
+    compress is None, "gzip" or "zlib". Return the uncompressed size in bytes.
+    """
+    if compress not in (None, "gzip", "zlib"):
+        raise ValueError(f"Unknown compression {compress!r}")
+    own_file = isinstance(dest, (str, bytes)) or hasattr(dest, "__fspath__")
+    raw = open(dest, "wb") if own_file else dest  # pylint: disable=consider-using-with
+    if compress == "gzip":
+        sink = gzip.GzipFile(fileobj=raw, mode="wb")
+    elif compress == "zlib":
+        sink = _ZlibWriter(raw)
+    else:
+        sink = None
+
+    written = 0
+    try:
+        for chunk in iter_page_source(driver, chunk_size=chunk_size):
+            data = chunk.encode(encoding)
+            (sink or raw).write(data)
+            written += len(data)
+    finally:
+        if sink is not None:
+            sink.close()
+        if own_file:
+            raw.close()
+    return written
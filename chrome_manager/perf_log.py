@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""Dispatch of CDP events read from the chromedriver performance log."""
+
+import json
+import logging
+import threading
+import weakref
+
+from selenium.common.exceptions import WebDriverException
+
+LOG = logging.getLogger(__name__)
+
+_LOGS = weakref.WeakKeyDictionary()
+_LOGS_LOCK = threading.Lock()
+
+
+def enable_performance_log(options) -> None:
+    """Ask chromedriver to record Network and Page events."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": True})
+
+
+class PerformanceLog:
+    """Drain the performance log of a driver and hand events to listeners.
+
+    get_log empties the log, so every consumer of a driver must share one
+    instance, see performance_log().
+    """
+
+    def __init__(self, driver) -> None:
+        self.driver = driver
+        self._listeners = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, method, callback) -> None:
+        """Call callback(params, entry) for each event named method."""
+        with self._lock:
+            self._listeners.setdefault(method, []).append(callback)
+
+    def unsubscribe(self, method, callback) -> None:
+        """Stop calling callback for method."""
+        with self._lock:
+            callbacks = self._listeners.get(method, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def poll(self) -> int:
+        """Read pending events and dispatch them, return how many were read."""
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException as error:
+            LOG.info(f"Performance log indisponivel: {error!r}")
+            return 0
+        with self._lock:
+            listeners = {method: list(callbacks) for method, callbacks in self._listeners.items()}
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            for callback in listeners.get(message.get("method"), ()):
+                callback(message.get("params", {}), entry)
+        return len(entries)
+
+
+def performance_log(driver) -> PerformanceLog:
+    """Return the PerformanceLog shared by every consumer of driver."""
+    with _LOGS_LOCK:
+        if driver not in _LOGS:
+            _LOGS[driver] = PerformanceLog(driver)
+        return _LOGS[driver]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""Memory and process tree readings from Linux /proc."""
+
+import os
+from os.path import exists
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def available() -> bool:
+    """Tell if /proc can be read on this host."""
+    return exists("/proc/meminfo")
+
+
+def available_memory() -> None | int:
+    """Return MemAvailable in bytes, None without /proc."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _parent_pid(pid) -> None | int:
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as stat:
+            # comm may contain spaces and parentheses, fields restart after the last ")".
+            return int(stat.read().rsplit(")", 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def process_tree(pid) -> list:
+    """Return pid and every descendant of it."""
+    children = {}
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            parent = _parent_pid(name)
+            if parent is not None:
+                children.setdefault(parent, []).append(int(name))
+    tree = [pid]
+    for current in tree:
+        tree.extend(children.get(current, ()))
+    return tree
+
+
+def rss(pid) -> int:
+    """Return resident memory of one process in bytes, 0 when it is gone."""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def tree_rss(pid) -> int:
+    """Return resident memory of a process and its descendants in bytes.
+
+    Shared pages are counted once per process, so this overestimates.
+    """
+    return sum(rss(member) for member in process_tree(pid))
+
+
+def drive_pid(drive) -> None | int:
+    """Return the chromedriver pid of a ChromeSeleniumDrive, Chrome runs under it."""
+    process = getattr(drive.service, "process", None)
+    return process.pid if process is not None else None
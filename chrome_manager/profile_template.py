@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""Copy-on-write clones of a warmed Chrome profile for parallel sessions."""
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+from os.path import expanduser, isdir, join
+
+from chrome_manager.storage import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOG = logging.getLogger(__name__)
+
+# linux/fs.h FICLONE, shares extents on btrfs, xfs and other CoW filesystems.
+FICLONE = 0x40049409
+
+# Files that tie a profile to a running Chrome instance.
+STRIP_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile", "DevToolsActivePort")
+SKIP_DIRS = ("Crashpad",)
+OWNER_FILE = ".chrome_manager_owner"
+
+
+def _pid_alive(pid) -> bool:
+    if os.name == "nt":
+        import ctypes  # pylint: disable=import-outside-toplevel
+
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if handle:
+            ctypes.windll.kernel32.CloseHandle(handle)
+            return True
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ProfileTemplate:
+    """A master user data dir cloned per session.
+
+    Files are reflinked when the filesystem supports it and copied otherwise.
+    Hardlinks are not used: Chrome rewrites its SQLite files in place, which
+    would write through to the master profile.
+    """
+
+    def __init__(self, master_dir=None, clones_root=None, skip_dirs=SKIP_DIRS) -> None:
+        self.master_dir = master_dir or join(expanduser("~"), ".chrome_storage")
+        self.clones_root = clones_root or join(CACHE_DIR, "profiles")
+        self.skip_dirs = skip_dirs
+        self._reflink = fcntl is not None
+
+    def warm(self, service, url="about:blank", wait_time=5) -> str:
+        """Launch Chrome once on the master profile so clones start initialized."""
+        from chrome_manager.chrome_driver import ChromeSeleniumDrive  # pylint: disable=import-outside-toplevel
+
+        os.makedirs(self.master_dir, exist_ok=True)
+        drive = ChromeSeleniumDrive(service=service, headless=True, user_data_dir=self.master_dir)
+        try:
+            drive.create_driver()
+            drive.driver.get(url)
+            drive.wait_page_load(wait_time=wait_time, verbose=False)
+        finally:
+            drive.quit()
+        return self.master_dir
+
+    def _copy_file(self, source, target) -> None:
+        if self._reflink:
+            with open(source, "rb") as source_file, open(target, "wb") as target_file:
+                try:
+                    fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+                    shutil.copystat(source, target)
+                    return
+                except OSError as error:
+                    if error.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                        self._reflink = False
+                    else:
+                        raise
+        shutil.copy2(source, target)
+
+    def clone(self) -> str:
+        """Create a new clone of the master profile and return its path."""
+        if not isdir(self.master_dir):
+            raise FileNotFoundError(f"Profile template not found: {self.master_dir}")
+        os.makedirs(self.clones_root, exist_ok=True)
+        clone_dir = tempfile.mkdtemp(dir=self.clones_root, prefix="profile-")
+
+        for current, dirs, files in os.walk(self.master_dir):
+            dirs[:] = [name for name in dirs if name not in self.skip_dirs]
+            relative = os.path.relpath(current, self.master_dir)
+            target_dir = os.path.normpath(join(clone_dir, relative))
+            os.makedirs(target_dir, exist_ok=True)
+            for name in files:
+                if name in STRIP_FILES:
+                    continue
+                source = join(current, name)
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), join(target_dir, name))
+                else:
+                    self._copy_file(source, join(target_dir, name))
+
+        with open(join(clone_dir, OWNER_FILE), "w", encoding="utf8") as owner_file:
+            owner_file.write(str(os.getpid()))
+        return clone_dir
+
+    def release(self, clone_dir) -> None:
+        """Delete a clone once its browser is gone."""
+        shutil.rmtree(clone_dir, ignore_errors=True)
+
+    def gc(self) -> int:
+        """Delete clones left behind by processes that are not running anymore."""
+        removed = 0
+        if not isdir(self.clones_root):
+            return removed
+        for name in os.listdir(self.clones_root):
+            clone_dir = join(self.clones_root, name)
+            try:
+                with open(join(clone_dir, OWNER_FILE), encoding="utf8") as owner_file:
+                    owner = int(owner_file.read().strip())
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(owner):
+                LOG.info(f"Removendo perfil orfao: {clone_dir}")
+                self.release(clone_dir)
+                removed += 1
+        return removed
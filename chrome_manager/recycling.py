@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""Decide when a long lived browser should be restarted."""
+
+from collections import deque
+from time import monotonic
+
+from chrome_manager import procfs
+
+
+class RecyclePolicy:
+    """Thresholds that trigger a browser restart, None disables one.
+
+    max_rss is the chromedriver plus Chrome process tree RSS in bytes,
+    max_age is in seconds and max_p95 is the p95 page latency in seconds
+    over the last latency_window pages.
+    """
+
+    def __init__(
+        self,
+        max_rss=1536 * 1024 ** 2,
+        max_pages=500,
+        max_age=6 * 3600,
+        max_p95=None,
+        latency_window=50,
+        rss_check_interval=30,
+    ) -> None:
+        self.max_rss = max_rss
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.max_p95 = max_p95
+        self.latency_window = latency_window
+        self.rss_check_interval = rss_check_interval
+
+
+class SessionHealth:
+    """Pages, age, latency and memory of one browser session."""
+
+    def __init__(self, policy) -> None:
+        self.policy = policy
+        self.started = monotonic()
+        self.pages = 0
+        self.latencies = deque(maxlen=policy.latency_window)
+        self.rss = 0
+        self._next_rss_check = 0.0
+
+    def record_page(self, seconds) -> None:
+        """Record one finished page and how long it took."""
+        self.pages += 1
+        self.latencies.append(seconds)
+
+    def p95(self) -> None | float:
+        """Return the p95 latency of the recent pages."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def age(self) -> float:
+        """Return seconds since the session started."""
+        return monotonic() - self.started
+
+    def reason(self, pid=None) -> None | str:
+        """Return why the session should be recycled, None when it is fine."""
+        policy = self.policy
+        if policy.max_pages and self.pages >= policy.max_pages:
+            return f"{self.pages} paginas carregadas"
+        if policy.max_age and self.age() >= policy.max_age:
+            return f"sessao com {self.age():.0f}s"
+        if policy.max_p95 and len(self.latencies) == self.latencies.maxlen:
+            p95 = self.p95()
+            if p95 >= policy.max_p95:
+                return f"latencia p95 de {p95:.2f}s"
+        if policy.max_rss and pid and procfs.available():
+            now = monotonic()
+            # Walking /proc costs a few ms, so it is not done on every page.
+            if now >= self._next_rss_check:
+                self._next_rss_check = now + policy.rss_check_interval
+                self.rss = procfs.tree_rss(pid)
+            if self.rss >= policy.max_rss:
+                return f"RSS de {self.rss / 1024 ** 2:.0f} MiB"
+        return None
+
+    def as_dict(self) -> dict:
+        """Return the current readings."""
+        return {"pages": self.pages, "age": round(self.age(), 3), "p95": self.p95(), "rss": self.rss}
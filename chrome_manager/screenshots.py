@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""Screenshots captured through CDP and written by a thread pool."""
+
+import base64
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, dirname, exists
+from time import perf_counter
+
+from chrome_manager.instrumentation import Histogram
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+LOG = logging.getLogger(__name__)
+
+FORMATS = ("png", "jpeg", "webp")
+
+
+class ScreenshotPipeline:
+    """Capture with Page.captureScreenshot and decode, resize and write off thread.
+
+    The calling thread only waits for Chrome to encode the image, the rest
+    runs in workers. At most max_queue screenshots wait for a worker, more
+    captures block until one is written. Resizing to max_width needs Pillow.
+    """
+
+    def __init__(self, workers=2, max_queue=64, max_width=None) -> None:
+        self.max_width = max_width
+        self.max_queue = max_queue
+        self.capture_seconds = Histogram()
+        self.write_seconds = Histogram()
+        self.counters = {"captured": 0, "written": 0, "failed": 0, "bytes": 0, "max_depth": 0}
+        self._depth = 0
+        self._closed = False
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot")
+        if max_width and Image is None:
+            LOG.info("Pillow nao instalado, capturas serao gravadas sem redimensionar.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def capture_params(driver, fmt="png", quality=None, clip=None, full_page=False) -> dict:
+        """Build Page.captureScreenshot parameters.
+
+        clip is {"x", "y", "width", "height"} in CSS pixels, with an
+        optional "scale". quality (0-100) applies to jpeg and webp.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown screenshot format {fmt!r}")
+        params = {"format": fmt}
+        if quality is not None and fmt != "png":
+            params["quality"] = int(quality)
+        if full_page and clip is None:
+            metrics = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+            size = metrics.get("cssContentSize") or metrics["contentSize"]
+            clip = {"x": 0, "y": 0, "width": size["width"], "height": size["height"]}
+        if clip is not None:
+            params["clip"] = dict({"scale": 1}, **clip)
+            params["captureBeyondViewport"] = True
+        return params
+
+    def capture(self, driver, dest, fmt="png", quality=None, clip=None, full_page=False):
+        """Capture the current page of driver and return a Future of dest."""
+        if self._closed:
+            raise RuntimeError("ScreenshotPipeline is closed.")
+        params = self.capture_params(driver, fmt, quality, clip, full_page)
+        self._slots.acquire()
+        try:
+            started = perf_counter()
+            data = driver.execute_cdp_cmd("Page.captureScreenshot", params)["data"]
+            elapsed = perf_counter() - started
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            # Closed while Chrome was encoding, the slot would never be released.
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError("ScreenshotPipeline is closed.")
+            self.capture_seconds.observe(elapsed)
+            self.counters["captured"] += 1
+            self._depth += 1
+            self.counters["max_depth"] = max(self.counters["max_depth"], self._depth)
+            return self._executor.submit(self._write, data, dest, fmt, quality)
+
+    def _write(self, data, dest, fmt, quality) -> str:
+        started = perf_counter()
+        tmp_path = None
+        try:
+            image = base64.b64decode(data)
+            if self.max_width and Image is not None:
+                image = self._downscale(image, fmt, quality)
+            os.makedirs(dirname(abspath(dest)), exist_ok=True)
+            file_descriptor, tmp_path = tempfile.mkstemp(dir=dirname(abspath(dest)), suffix=".tmp")
+            with os.fdopen(file_descriptor, "wb") as image_file:
+                image_file.write(image)
+            os.replace(tmp_path, dest)
+        except BaseException as error:
+            LOG.error(f"Falha ao gravar captura {dest}: {error!r}")
+            if tmp_path and exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self.counters["failed"] += 1
+            raise
+        else:
+            with self._lock:
+                self.counters["written"] += 1
+                self.counters["bytes"] += len(image)
+            return dest
+        finally:
+            with self._lock:
+                self.write_seconds.observe(perf_counter() - started)
+                self._depth -= 1
+            self._slots.release()
+
+    def _downscale(self, data, fmt, quality) -> bytes:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= self.max_width:
+                return data
+            height = max(1, round(image.height * self.max_width / image.width))
+            resized = image.resize((self.max_width, height), Image.LANCZOS)
+            output = io.BytesIO()
+            options = {"quality": quality} if quality is not None and fmt != "png" else {}
+            resized.save(output, format=fmt.upper(), **options)
+            return output.getvalue()
+
+    @property
+    def depth(self) -> int:
+        """Return how many screenshots are waiting or being written."""
+        return self._depth
+
+    def stats(self) -> dict:
+        """Return counters, queue depth and capture/write latency histograms."""
+        with self._lock:
+            return dict(
+                self.counters,
+                depth=self._depth,
+                capture_seconds=self.capture_seconds.as_dict(),
+                write_seconds=self.write_seconds.as_dict(),
+            )
+
+    def close(self, wait=True) -> None:
+        """Stop the workers, by default after every pending write."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait)
@@ -2,15 +2,153 @@
 
 """Create a webdriver service."""
 
+import hashlib
 import os
+import platform
+import sys
+import threading
+from os.path import exists, join
 
 os.environ['WDM_LOG'] = '0'
 os.environ['WDM_LOG_LEVEL'] = '0'
 os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
 
 from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.utils import ChromeType
 from selenium.webdriver.chrome.service import Service
 
-def create_service():
-    """Return a webdriver service."""
-    return Service(ChromeDriverManager(version="114.0.5735.90").install())
+from chrome_manager.bundle_pipeline import download_and_extract
+from chrome_manager.storage import CACHE_DIR, FileLock, read_json, write_json
+from chrome_manager.version_cache import browser_version, pinned_binary
+from chrome_manager.version_manifest import VersionManifest, milestone_manifest
+
+# write_json and FileLock create the folder on first use.
+DRIVER_CACHE_FILE = join(CACHE_DIR, "chromedrivers.json")
+DRIVER_LOCK_FILE = join(CACHE_DIR, "chromedrivers.lock")
+DRIVER_DIR = join(CACHE_DIR, "chromedriver")
+
+# Drivers older than this are only in the storage webdriver_manager knows.
+CFT_FIRST_MILESTONE = 115
+CFT_STORAGE_URL = "https://storage.googleapis.com/chrome-for-testing-public"
+
+_RESOLVED = {}
+_LOCK = threading.Lock()
+
+
+def _sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as binary_file:
+        for block in iter(lambda: binary_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _record(path) -> dict:
+    stat = os.stat(path)
+    return {
+        "path": path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _sha256(path),
+    }
+
+
+def _verified(record) -> bool:
+    """Check a cached driver is still there, executable and unchanged."""
+    path = record.get("path")
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return False
+    if not os.access(path, os.X_OK):
+        return False
+    if (stat.st_size, stat.st_mtime_ns) == (record.get("size"), record.get("mtime_ns")):
+        return True
+    # Touched on disk, only trust it when the content is the same.
+    return stat.st_size == record.get("size") and _sha256(path) == record.get("sha256")
+
+
+def _cache_key(driver_version) -> str:
+    if driver_version:
+        return driver_version
+    installed = browser_version(ChromeType.GOOGLE)
+    return installed.split(".")[0] if installed else "latest"
+
+
+def cft_platform() -> str:
+    """Return the Chrome for Testing platform name of this machine."""
+    if sys.platform.startswith("win"):
+        return "win64" if sys.maxsize > 2 ** 32 else "win32"
+    if sys.platform == "darwin":
+        return "mac-arm64" if platform.machine() == "arm64" else "mac-x64"
+    return "linux64"
+
+
+def _cft_driver(key) -> str:
+    """Download the Chrome for Testing chromedriver of a version, milestone or "latest"."""
+    target = cft_platform()
+    if key.count(".") == 3:
+        version = key
+        url = f"{CFT_STORAGE_URL}/{version}/{target}/chromedriver-{target}.zip"
+    else:
+        manifest, channel = (VersionManifest(), "Stable") if key == "latest" else (milestone_manifest(), key)
+        try:
+            version = manifest.version(channel)
+        except KeyError as error:
+            raise ValueError(f"No chromedriver for Chrome {key} in Chrome for Testing.") from error
+        url = manifest.download_url("chromedriver", target, channel)
+
+    dest_dir = join(DRIVER_DIR, version)
+    path = join(dest_dir, f"chromedriver-{target}", "chromedriver.exe" if target.startswith("win") else "chromedriver")
+    if not exists(path):
+        download_and_extract(url, dest_dir)
+    return path
+
+
+def _install_driver(key, driver_version) -> str:
+    major = key.split(".")[0]
+    if major.isdigit() and int(major) < CFT_FIRST_MILESTONE:
+        return ChromeDriverManager(version=driver_version).install()
+    return _cft_driver(key)
+
+
+def resolve_driver_path(driver_version=None) -> str:
+    """Return a chromedriver path for the installed browser major version.
+
+    Resolved paths are memoized in process and recorded in a file shared by
+    every process, so only a miss reaches the network. Misses are resolved
+    through the Chrome for Testing manifests, webdriver_manager only serves
+    drivers older than Chrome 115.
+    """
+    key = _cache_key(driver_version)
+    path = _RESOLVED.get(key)
+    if path and os.path.isfile(path):
+        return path
+
+    with _LOCK:
+        record = read_json(DRIVER_CACHE_FILE, {}).get(key)
+        if record and _verified(record):
+            _RESOLVED[key] = record["path"]
+            return record["path"]
+
+        with FileLock(DRIVER_LOCK_FILE):
+            # Another process may have resolved it while we waited for the lock.
+            records = read_json(DRIVER_CACHE_FILE, {})
+            record = records.get(key)
+            if not record or not _verified(record):
+                record = _record(_install_driver(key, driver_version))
+                records[key] = record
+                write_json(DRIVER_CACHE_FILE, records)
+        _RESOLVED[key] = record["path"]
+        return record["path"]
+
+
+def create_service(driver_version=None, chrome_root=None):
+    """Return a webdriver service.
+
+    With chrome_root (True for the default root) the chromedriver installed
+    next to the pinned Chrome by ChromeDownloader.install_linux is used.
+    """
+    if chrome_root:
+        return Service(pinned_binary("chromedriver", chrome_root))
+    return Service(resolve_driver_path(driver_version))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""On-disk locations and helpers shared by the chrome_manager caches."""
+
+import json
+import os
+import tempfile
+from os.path import dirname, expanduser, join
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    import msvcrt
+
+CACHE_DIR = os.environ.get(
+    "CHROME_MANAGER_CACHE", join(expanduser("~"), ".cache", "chrome_manager")
+)
+
+
+def cache_path(*parts) -> str:
+    """Return a path inside the cache dir, creating its parent folder."""
+    path = join(CACHE_DIR, *parts)
+    os.makedirs(dirname(path), exist_ok=True)
+    return path
+
+
+def read_json(path, default=None):
+    """Read a JSON file, returning default when missing or broken."""
+    try:
+        with open(path, encoding="utf8") as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data) -> None:
+    """Write a JSON file atomically so readers never see half of it."""
+    os.makedirs(dirname(path), exist_ok=True)
+    file_descriptor, tmp_path = tempfile.mkstemp(dir=dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf8") as json_file:
+            json.dump(data, json_file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FileLock:
+    """Exclusive lock on a file shared between processes."""
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a+b")  # pylint: disable=consider-using-with
+        self._file.seek(0)
+        if msvcrt:
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if msvcrt:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""Supervise a ChromeSeleniumDrive with a hot standby browser."""
+
+import logging
+import threading
+from time import perf_counter
+
+from selenium.common.exceptions import WebDriverException
+
+from chrome_manager.chrome_driver import ChromeSeleniumDrive
+from chrome_manager.driver_pool import DEAD_SESSION_ERRORS
+from chrome_manager.service import create_service
+
+LOG = logging.getLogger(__name__)
+
+
+class SessionSupervisor:
+    """Detect dead sessions and fail over to a pre-launched standby.
+
+    A heartbeat thread checks the active session and remembers its URL and
+    cookies. When the session dies the standby takes its place, gets the
+    cookies and URL replayed, and a new standby is launched in background.
+    """
+
+    def __init__(self, factory=None, heartbeat_interval=2.0, cookie_every=5, replay_url=True, **drive_kwargs) -> None:
+        self.factory = factory or self._default_factory(drive_kwargs)
+        self.heartbeat_interval = heartbeat_interval
+        self.cookie_every = cookie_every
+        self.replay_url = replay_url
+        self.last_url = None
+        self.cookies = []
+        self.failovers = 0
+        self.last_failover_time = None
+
+        self._lock = threading.RLock()
+        self._standby = None
+        self._standby_ready = threading.Event()
+        self._stop = threading.Event()
+        self._beats = 0
+
+        self.active = self.factory()
+        self._respawn_standby()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="chrome-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    @staticmethod
+    def _default_factory(drive_kwargs):
+        def factory():
+            service = create_service(chrome_root=drive_kwargs.get("chrome_root"))
+            drive = ChromeSeleniumDrive(service=service, **drive_kwargs)
+            drive.create_driver()
+            return drive
+        return factory
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def drive(self) -> ChromeSeleniumDrive:
+        """Return the active session."""
+        return self.active
+
+    def _respawn_standby(self) -> None:
+        self._standby_ready.clear()
+
+        def spawn():
+            try:
+                standby = self.factory()
+            # create_driver calls sys.exit on launch failures.
+            except (Exception, SystemExit) as error:  # pylint: disable=broad-except
+                LOG.error(f"Falha ao iniciar navegador reserva: {error!r}")
+                self._standby_ready.set()
+                return
+            with self._lock:
+                if self._stop.is_set():
+                    standby.quit()
+                else:
+                    self._standby = standby
+            self._standby_ready.set()
+
+        threading.Thread(target=spawn, name="chrome-standby", daemon=True).start()
+
+    @staticmethod
+    def is_alive(drive) -> bool:
+        """Cheap liveness check: chromedriver process plus one command.
+
+        Getting the window handle does not handle user prompts, so an open
+        alert of the session is left alone.
+        """
+        process = getattr(drive.service, "process", None)
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            return bool(drive.driver.current_window_handle)
+        except (AttributeError, *DEAD_SESSION_ERRORS):
+            return False
+
+    @staticmethod
+    def page_url(driver) -> str:
+        """Return the current URL through CDP, which leaves prompts alone."""
+        return driver.execute_cdp_cmd("Target.getTargetInfo", {})["targetInfo"]["url"]
+
+    def checkpoint(self) -> None:
+        """Remember URL and cookies of the active session for a failover.
+
+        Only CDP commands are used, WebDriver ones would dismiss an open
+        alert under the default prompt behavior.
+        """
+        driver = self.active.driver
+        self.last_url = self.page_url(driver)
+        self.cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                try:
+                    self._beats += 1
+                    if self._beats % self.cookie_every == 0:
+                        self.checkpoint()
+                    else:
+                        self.last_url = self.page_url(self.active.driver)
+                    continue
+                except (AttributeError, KeyError, WebDriverException):
+                    pass
+                dead = self.active
+                if self._stop.is_set() or self.is_alive(dead):
+                    continue
+            LOG.info("Sessao morta detectada pelo heartbeat.")
+            try:
+                self.failover(dead=dead)
+            except (RuntimeError, WebDriverException) as error:
+                LOG.error(f"Failover falhou: {error!r}")
+
+    def _replay(self, drive) -> None:
+        driver = drive.driver
+        if self.cookies:
+            try:
+                driver.execute_cdp_cmd("Network.setCookies", {"cookies": self.cookies})
+            except (AttributeError, WebDriverException):
+                LOG.info("Nao foi possivel restaurar cookies via CDP.")
+        if self.replay_url and self.last_url and self.last_url != "about:blank":
+            driver.get(self.last_url)
+
+    def failover(self, wait_time=60, dead=None) -> ChromeSeleniumDrive:
+        """Swap the standby in place of the active session and return it.
+
+        dead is the session the caller saw failing, when another thread
+        already replaced it the current session is returned as is.
+        """
+        started = perf_counter()
+        with self._lock:
+            if dead is not None and dead is not self.active:
+                return self.active
+            standby_missing = self._standby is None
+        if standby_missing:
+            # Waiting outside the lock, the standby spawner needs it to publish.
+            self._standby_ready.wait(wait_time)
+        with self._lock:
+            if dead is not None and dead is not self.active:
+                return self.active
+            if self._standby is None:
+                self._respawn_standby()
+                raise RuntimeError("No standby browser available.")
+            dead, self.active, self._standby = self.active, self._standby, None
+            try:
+                self._replay(self.active)
+            finally:
+                # Even when the replay fails the old browser goes away and a
+                # new standby is on its way.
+                threading.Thread(target=dead.quit, daemon=True).start()
+                self._respawn_standby()
+            self.failovers += 1
+            self.last_failover_time = perf_counter() - started
+            LOG.info(f"Failover concluido em {self.last_failover_time:.3f}s.")
+        return self.active
+
+    def call(self, func, *args, **kwargs):
+        """Run func(active_drive, ...) and retry once on a fresh session if it dies."""
+        drive = self.active
+        try:
+            return func(drive, *args, **kwargs)
+        except DEAD_SESSION_ERRORS:
+            if self.is_alive(drive):
+                raise
+        return func(self.failover(dead=drive), *args, **kwargs)
+
+    def close(self) -> None:
+        """Stop the heartbeat and quit both browsers."""
+        self._stop.set()
+        self._heartbeat.join(timeout=self.heartbeat_interval + 1)
+        with self._lock:
+            drives = [self.active, self._standby]
+            self._standby = None
+        for drive in drives:
+            if drive is not None:
+                drive.quit()
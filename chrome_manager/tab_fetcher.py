@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""Fetch many URLs on one driver keeping several tabs in flight."""
+
+import logging
+from collections import deque
+from time import perf_counter, sleep
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoSuchWindowException,
+    TimeoutException,
+    WebDriverException,
+)
+
+LOG = logging.getLogger(__name__)
+
+# Navigation is started from inside the page so the call returns at once.
+# The token lives on the old window object and disappears with it, which
+# tells a committed navigation apart from the previous document.
+NAVIGATE_SCRIPT = "window.__cmFetchToken = arguments[1]; window.location.href = arguments[0];"
+STATE_SCRIPT = "return [window.__cmFetchToken === arguments[0], document.readyState];"
+
+_DONE = object()
+
+
+class _Slot:
+    """One tab owned by the fetcher."""
+
+    def __init__(self, handle) -> None:
+        self.handle = handle
+        self.url = None
+        self.token = None
+        self.queued = None
+        self.started = None
+
+
+class TabFetcher:
+    """Round-robin K tabs of a driver over an iterable of URLs."""
+
+    def __init__(self, drive, tabs=4, wait_time=45, ready_states=("complete",), poll_interval=0.05) -> None:
+        self.drive = drive
+        self.tabs = max(1, tabs)
+        self.wait_time = wait_time
+        self.ready_states = ready_states
+        self.poll_interval = poll_interval
+        self._tokens = 0
+
+    def _open_tabs(self, driver, origin):
+        created = []
+        for _ in range(self.tabs):
+            driver.switch_to.new_window("tab")
+            self.drive.prepare_tab()
+            created.append(driver.current_window_handle)
+        driver.switch_to.window(origin)
+        return created
+
+    def _start(self, driver, slot, url, queued) -> None:
+        self._tokens += 1
+        slot.url = url
+        slot.token = f"cm-{self._tokens}"
+        slot.queued = queued
+        slot.started = perf_counter()
+        driver.switch_to.window(slot.handle)
+        driver.execute_script(NAVIGATE_SCRIPT, url, slot.token)
+
+    @staticmethod
+    def _take(pending):
+        """Return the next (url, queued) of pending, None once it is exhausted."""
+        while True:
+            url = next(pending, _DONE)
+            if url is _DONE:
+                return None
+            if url is not None:
+                return url, perf_counter()
+            LOG.info("URL vazia ignorada pelo fetcher.")
+
+    def _state(self, driver, slot):
+        driver.switch_to.window(slot.handle)
+        try:
+            same_document, ready_state = driver.execute_script(STATE_SCRIPT, slot.token)
+        except (JavascriptException, TimeoutException):
+            # The page is being replaced right now.
+            return None
+        if same_document:
+            return None
+        return ready_state
+
+    def fetch(self, urls):
+        """Yield (url, html, timings) as each tab reaches a ready state.
+
+        html is None when the page did not get ready in wait_time seconds.
+        Results come in completion order, not input order. None entries
+        of urls are skipped. timings["total"] runs from the moment a URL is
+        taken from urls, so it includes the wait for a free tab.
+        """
+        driver = self.drive.driver
+        origin = driver.current_window_handle
+        host = self.drive.context_host
+        if host is not None and host.owns(origin):
+            # Tabs opened from a context tab would share its cookies.
+            origin = host.default_handle
+            driver.switch_to.window(origin)
+        pending = iter(urls)
+        created = self._open_tabs(driver, origin)
+        idle = deque(_Slot(handle) for handle in created)
+        busy = deque()
+
+        # One URL is taken ahead, so its total includes the wait for a tab.
+        waiting = None
+
+        try:
+            while True:
+                while True:
+                    if waiting is None:
+                        waiting = self._take(pending)
+                    if waiting is None or not idle:
+                        break
+                    slot = idle.popleft()
+                    self._start(driver, slot, *waiting)
+                    busy.append(slot)
+                    waiting = None
+                if not busy:
+                    return
+
+                progressed = False
+                for _ in range(len(busy)):
+                    slot = busy.popleft()
+                    now = perf_counter()
+                    state = self._state(driver, slot)
+                    if state in self.ready_states:
+                        ready = perf_counter()
+                        html = driver.page_source
+                        done = perf_counter()
+                        self.drive.drain_performance_log()
+                        timings = {
+                            "load": ready - slot.started,
+                            "capture": done - ready,
+                            "total": done - slot.queued,
+                        }
+                    elif now - slot.started >= self.wait_time:
+                        LOG.info(f"Timeout carregando {slot.url}")
+                        html = None
+                        done = perf_counter()
+                        timings = {"load": None, "capture": None, "total": done - slot.queued}
+                        driver.execute_script("window.stop();")
+                    else:
+                        busy.append(slot)
+                        continue
+                    progressed = True
+                    if self.drive.session_health:
+                        self.drive.session_health.record_page(done - slot.started)
+                    idle.append(slot)
+                    yield slot.url, html, timings
+                    slot.url = slot.token = None
+                if not progressed:
+                    sleep(self.poll_interval)
+        finally:
+            self._close_tabs(driver, created, origin)
+
+    @staticmethod
+    def _close_tabs(driver, handles, origin) -> None:
+        try:
+            for handle in handles:
+                try:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                except NoSuchWindowException:
+                    pass
+            driver.switch_to.window(origin)
+        except WebDriverException as error:
+            LOG.info(f"Falha ao fechar abas do fetcher: {error!r}")
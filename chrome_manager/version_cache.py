@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""Cached browser version detection.
+
+get_browser_version_from_os runs a subprocess. Results are memoized in
+process and recorded on disk keyed by the browser binary path, mtime and
+inode, so a browser upgrade invalidates the record by itself.
+"""
+
+import os
+import platform
+import shutil
+import threading
+from os.path import basename, exists, expandvars, join, realpath
+
+from webdriver_manager.core.utils import ChromeType, get_browser_version_from_os
+
+from chrome_manager.storage import CACHE_DIR, read_json, write_json
+
+# write_json creates the folder when the first record is saved.
+VERSION_CACHE_FILE = join(CACHE_DIR, "browser_versions.json")
+# Where ChromeDownloader.install_linux keeps its versions and current link.
+CHROME_ROOT = join(CACHE_DIR, "chrome")
+
+LINUX_BINARIES = {
+    ChromeType.GOOGLE: ["google-chrome", "google-chrome-stable", "google-chrome-beta", "google-chrome-dev"],
+    ChromeType.CHROMIUM: ["chromium", "chromium-browser"],
+}
+
+MAC_BINARIES = {
+    ChromeType.GOOGLE: ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"],
+    ChromeType.CHROMIUM: ["/Applications/Chromium.app/Contents/MacOS/Chromium"],
+}
+
+WIN_BINARIES = {
+    ChromeType.GOOGLE: [
+        r"%PROGRAMFILES%\Google\Chrome\Application\chrome.exe",
+        r"%PROGRAMFILES(X86)%\Google\Chrome\Application\chrome.exe",
+        r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe",
+    ],
+    ChromeType.CHROMIUM: [
+        r"%PROGRAMFILES%\Chromium\Application\chrome.exe",
+        r"%PROGRAMFILES(X86)%\Chromium\Application\chrome.exe",
+        r"%LOCALAPPDATA%\Chromium\Application\chrome.exe",
+    ],
+}
+
+_MEMO = {}
+_LOCK = threading.Lock()
+
+
+def find_browser_binary(chrome_type=ChromeType.GOOGLE) -> None | str:
+    """Return the resolved path of the browser binary, if one is found."""
+    system = platform.system()
+    if system == "Windows":
+        candidates = [expandvars(path) for path in WIN_BINARIES.get(chrome_type, [])]
+    elif system == "Darwin":
+        candidates = MAC_BINARIES.get(chrome_type, [])
+    else:
+        candidates = [shutil.which(name) for name in LINUX_BINARIES.get(chrome_type, [])]
+    for candidate in candidates:
+        if candidate and exists(candidate):
+            return realpath(candidate)
+    return None
+
+
+def _binary_key(chrome_type, binary) -> str:
+    stat = os.stat(binary)
+    return f"{chrome_type}|{binary}|{stat.st_mtime_ns}|{stat.st_ino}"
+
+
+def browser_version(chrome_type=ChromeType.GOOGLE) -> None | str:
+    """Return the installed browser version, probing the OS only on a cache miss."""
+    with _LOCK:
+        if chrome_type in _MEMO:
+            return _MEMO[chrome_type]
+
+        binary = find_browser_binary(chrome_type)
+        key = _binary_key(chrome_type, binary) if binary else None
+        records = read_json(VERSION_CACHE_FILE, {}) if key else {}
+        version = records.get(key)
+
+        if version is None:
+            version = get_browser_version_from_os(chrome_type)
+            if key and version:
+                prefix = f"{chrome_type}|{binary}|"
+                records = {k: v for k, v in records.items() if not k.startswith(prefix)}
+                records[key] = version
+                write_json(VERSION_CACHE_FILE, records)
+
+        _MEMO[chrome_type] = version
+        return version
+
+
+def pinned_version(chrome_root=True) -> None | str:
+    """Return the version root/current points to, chrome_root=True is CHROME_ROOT."""
+    current = join(CHROME_ROOT if chrome_root is True else chrome_root, "current")
+    if not os.path.lexists(current):
+        return None
+    return basename(os.readlink(current))
+
+
+def pinned_binary(name, chrome_root=True, platform_name="linux64") -> str:
+    """Return the chrome or chromedriver binary of the pinned install."""
+    root = CHROME_ROOT if chrome_root is True else chrome_root
+    path = join(root, "current", f"{name}-{platform_name}", name)
+    if not exists(path):
+        raise IOError(f"No {name} installed in {root}, run ChromeDownloader().install_linux first.")
+    return path
+
+
+def clear_cache() -> None:
+    """Forget memoized versions, e.g. after installing a new browser."""
+    with _LOCK:
+        _MEMO.clear()
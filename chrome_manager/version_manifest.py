@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Chrome release manifest fetched once, cached on disk and revalidated."""
+
+import json
+import logging
+import os
+import threading
+from time import time
+
+from chrome_manager.downloader import shared_session
+from chrome_manager.storage import FileLock, cache_path, read_json, write_json
+
+LOG = logging.getLogger(__name__)
+
+CFT_MANIFEST_URL = (
+    "https://googlechromelabs.github.io/chrome-for-testing/last-known-good-versions-with-downloads.json"
+)
+CFT_MILESTONES_URL = (
+    "https://googlechromelabs.github.io/chrome-for-testing/latest-versions-per-milestone-with-downloads.json"
+)
+
+
+class HttpManifestSource:
+    """Manifest served over HTTP, revalidated with ETag/Last-Modified."""
+
+    def __init__(self, url=CFT_MANIFEST_URL, session=None, timeout=30) -> None:
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+
+    def fetch(self, validators):
+        """Return (data, validators), data is None when not modified."""
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        session = self.session or shared_session()
+        response = session.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None, validators
+        response.raise_for_status()
+        return response.json(), {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+
+class FileManifestSource:
+    """Manifest read from a local file, revalidated by its mtime."""
+
+    def __init__(self, path) -> None:
+        self.path = path
+
+    def fetch(self, validators):
+        """Return (data, validators), data is None when the file did not change."""
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if validators.get("mtime_ns") == mtime_ns:
+            return None, validators
+        with open(self.path, encoding="utf8") as manifest_file:
+            return json.load(manifest_file), {"mtime_ns": mtime_ns}
+
+
+def compact(manifest) -> dict:
+    """Keep version and download URLs per channel of a Chrome for Testing manifest.
+
+    Per milestone manifests are kept the same way, keyed by milestone.
+    """
+    channels = {}
+    for channel, info in (manifest.get("channels") or manifest.get("milestones") or {}).items():
+        channels[channel] = {
+            "version": info["version"],
+            "downloads": {
+                name: {item["platform"]: item["url"] for item in items}
+                for name, items in info.get("downloads", {}).items()
+            },
+        }
+    return channels
+
+
+class VersionManifest:
+    """Release channels, served from disk while younger than ttl.
+
+    Past the ttl the source is asked once with the stored validators, so a
+    node checking for updates costs one conditional request at most.
+    """
+
+    def __init__(self, source=None, cache_file=None, ttl=6 * 3600) -> None:
+        self.source = source or HttpManifestSource()
+        self.cache_file = cache_file or cache_path("version_manifest.json")
+        self.ttl = ttl
+        self._channels = None
+        self._lock = threading.Lock()
+
+    def channels(self, refresh=False) -> dict:
+        """Return {channel: {"version": ..., "downloads": {name: {platform: url}}}}."""
+        with self._lock:
+            if self._channels is not None and not refresh:
+                return self._channels
+            with FileLock(f"{self.cache_file}.lock"):
+                record = read_json(self.cache_file, {})
+                if refresh or not record or time() - record.get("fetched_at", 0) > self.ttl:
+                    record = self._revalidate(record)
+            self._channels = record["channels"]
+            return self._channels
+
+    def _revalidate(self, record) -> dict:
+        try:
+            data, validators = self.source.fetch(record.get("validators", {}) if record else {})
+        except (OSError, ValueError) as error:
+            if not record:
+                raise
+            LOG.error(f"Falha ao atualizar manifesto de versoes, usando o cache: {error!r}")
+            return record
+        if data is None and record:
+            record["fetched_at"] = time()
+        else:
+            record = {"channels": compact(data), "validators": validators, "fetched_at": time()}
+        write_json(self.cache_file, record)
+        return record
+
+    def version(self, channel="Stable") -> str:
+        """Return the version string of a channel."""
+        return self.channels()[channel]["version"]
+
+    def download_url(self, name, platform, channel="Stable") -> str:
+        """Return the archive URL of chrome or chromedriver for a platform."""
+        try:
+            return self.channels()[channel]["downloads"][name][platform]
+        except KeyError as error:
+            raise ValueError(f"No {name} download for {platform} in {channel}.") from error
+
+
+def milestone_manifest() -> VersionManifest:
+    """Return the manifest of the newest version of every milestone, "131" style channels."""
+    return VersionManifest(HttpManifestSource(CFT_MILESTONES_URL), cache_file=cache_path("milestone_manifest.json"))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""Event driven waits used by ChromeSeleniumDrive."""
+
+import logging
+import weakref
+from time import monotonic, sleep
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+
+LOG = logging.getLogger(__name__)
+
+# Resolves as soon as the selector matches or when the deadline expires.
+# Checks are scheduled on the next animation frame, with a timer fallback
+# because background tabs do not run requestAnimationFrame.
+OBSERVE_SELECTOR_SCRIPT = """
+var selector = arguments[0], multiple = arguments[1], timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var deadline = Date.now() + timeoutMs, finished = false, scheduled = false;
+var observer = null, timer = null;
+
+function finish(value) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(timer);
+    done(value);
+}
+function query() {
+    if (multiple) {
+        var all = document.querySelectorAll(selector);
+        return all.length ? Array.prototype.slice.call(all) : null;
+    }
+    return document.querySelector(selector);
+}
+function check() {
+    scheduled = false;
+    var found;
+    try { found = query(); } catch (e) { finish({__error: String(e)}); return; }
+    if (found) { finish(found); } else if (Date.now() >= deadline) { finish(null); }
+}
+function schedule() {
+    if (scheduled || finished) { return; }
+    scheduled = true;
+    var fallback = setTimeout(check, 50);
+    requestAnimationFrame(function () { clearTimeout(fallback); if (scheduled) { check(); } });
+}
+
+check();
+if (!finished) {
+    observer = new MutationObserver(schedule);
+    observer.observe(document, {childList: true, subtree: true, attributes: true});
+    timer = setTimeout(check, Math.max(0, deadline - Date.now()));
+}
+"""
+
+# Margin over the in page deadline before WebDriver gives up on the script.
+SCRIPT_TIMEOUT_MARGIN = 5
+
+_SCRIPT_TIMEOUTS = weakref.WeakKeyDictionary()
+
+
+def ensure_script_timeout(driver, seconds) -> None:
+    """Raise the driver async script timeout when a wait needs more time."""
+    if _SCRIPT_TIMEOUTS.get(driver, 0) >= seconds:
+        return
+    timeout = seconds + SCRIPT_TIMEOUT_MARGIN
+    driver.set_script_timeout(timeout)
+    _SCRIPT_TIMEOUTS[driver] = timeout
+
+
+def wait_for_css(driver, selector, wait_time=10, multiple=False, sleep_func=sleep):
+    """Wait in page for a CSS selector with a single async script per document.
+
+    Return the WebElement (or list of them when multiple) or None on timeout.
+    """
+    deadline = monotonic() + wait_time
+    while True:
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return None
+        ensure_script_timeout(driver, remaining)
+        try:
+            result = driver.execute_async_script(
+                OBSERVE_SELECTOR_SCRIPT, selector, multiple, int(remaining * 1000)
+            )
+        except (JavascriptException, StaleElementReferenceException, TimeoutException):
+            # The document was replaced while waiting, observe the new one.
+            sleep_func(min(0.05, max(0, deadline - monotonic())))
+            continue
+        if isinstance(result, dict) and "__error" in result:
+            LOG.error(f"Seletor invalido {selector!r}: {result['__error']}")
+            return None
+        return result or None
+
+
+def poll_with_backoff(
+    predicate, wait_time=10, ignored=(), initial=0.01, factor=2, max_interval=0.25, sleep_func=sleep
+):
+    """Call predicate until it returns a truthy value, backing off between tries.
+
+    Return the value or None when wait_time seconds pass.
+    """
+    deadline = monotonic() + wait_time
+    interval = initial
+    while True:
+        try:
+            result = predicate()
+            if result:
+                return result
+        except ignored:
+            pass
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return None
+        sleep_func(min(interval, remaining))
+        interval = min(interval * factor, max_interval)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""AsyncChromeSeleniumDrive on the stub WebDriver, across event loops."""
+
+import asyncio
+
+from benchmarks.run import FixtureServer, StubChromeSeleniumDrive
+from benchmarks.stub_webdriver import StubConfig, StubWebDriver
+from chrome_manager import async_driver
+from chrome_manager.async_driver import AsyncChromeSeleniumDrive
+from chrome_manager.load_strategies import LoadResult
+
+CONFIG = StubConfig(session_latency=0.05, navigation_latency=0.005, load_latency=0.005, selector_delay=0)
+
+
+async def load_pages(executor_url, url, sessions=2):
+    async def load():
+        async with AsyncChromeSeleniumDrive(StubChromeSeleniumDrive(executor_url, headless=True)) as drive:
+            await drive.get(url)
+            return await drive.wait_page_load(wait_time=5)
+
+    return await asyncio.gather(*(load() for _ in range(sessions)))
+
+
+def test_sessions_run_in_successive_loops(monkeypatch):
+    # One launch slot, so the second session waits on the semaphore.
+    monkeypatch.setattr(async_driver, "DEFAULT_LAUNCH_LIMIT", 1)
+    fixtures = FixtureServer()
+    try:
+        with StubWebDriver(CONFIG) as stub:
+            for _ in range(2):
+                results = asyncio.run(load_pages(stub.url, fixtures.url()))
+                for result in results:
+                    assert isinstance(result, LoadResult)
+                    assert result.ok and result.state == "complete"
+    finally:
+        fixtures.stop()
+
+
+def test_wait_page_load_timeout_is_falsy():
+    async def wait(executor_url):
+        async with AsyncChromeSeleniumDrive(StubChromeSeleniumDrive(executor_url, headless=True)) as drive:
+            return await drive.wait_page_load(wait_time=0.05, states=("unknown",), interval=0.01)
+
+    with StubWebDriver(CONFIG) as stub:
+        result = asyncio.run(wait(stub.url))
+    assert not result
+    assert result.state == "complete"
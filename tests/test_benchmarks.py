@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite helpers and a short run against the stub WebDriver."""
+
+from benchmarks.run import StubChromeSeleniumDrive, percentiles, run
+from benchmarks.stub_webdriver import StubConfig, StubWebDriver
+from chrome_manager.instrumentation import Instrumentation
+
+
+def test_percentiles():
+    summary = percentiles([0.5, 0.1, 0.4, 0.2, 0.3])
+    assert summary["count"] == 5
+    assert (summary["min"], summary["p50"], summary["max"]) == (0.1, 0.3, 0.5)
+    assert summary["mean"] == 0.3
+    assert percentiles([]) == {"count": 0}
+
+
+def test_stub_run_reports_every_benchmark():
+    config = StubConfig(session_latency=0.01, navigation_latency=0.005, load_latency=0.005, selector_delay=0.005)
+    report = run(mode="stub", iterations=2, tabs=2, config=config)
+
+    assert report["mode"] == "stub"
+    assert report["stub_config"] == config.as_dict()
+    results = report["results"]
+    assert set(results) == {"session_creation", "navigation", "scrap_tab_two", "scrap_tabs", "wait_for_selector"}
+    for name in ("navigation", "scrap_tab_two", "wait_for_selector"):
+        assert results[name]["count"] == 2
+    assert results["scrap_tabs"]["pages_per_minute"] > 0
+    # wait_for_selector returns once #late shows up, not after a polling second.
+    assert results["wait_for_selector"]["max"] < 1
+
+
+def test_stub_drive_runs_the_real_create_driver():
+    with StubWebDriver(StubConfig(session_latency=0)) as stub:
+        drive = StubChromeSeleniumDrive(stub.url, headless=True, instrumentation=Instrumentation())
+        assert "create_driver" not in vars(StubChromeSeleniumDrive)
+        drive.create_driver()
+        try:
+            assert len(stub.sessions) == 1
+            # Attached by ChromeSeleniumDrive.create_driver itself.
+            drive.driver.execute_script("return 1;")
+            assert "w3cExecuteScript" in drive.instrumentation.snapshot()["commands"]
+        finally:
+            drive.quit()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""URL patterns produced by the blocking policies."""
+
+import json
+import re
+from urllib.parse import urlsplit
+
+import pytest
+
+from chrome_manager.blocking import BlockingPolicy, ResourceBlocker, get_policy
+
+
+def glob(pattern, text) -> bool:
+    return re.fullmatch(".*".join(re.escape(part) for part in pattern.split("*")), text) is not None
+
+
+def blocked(url, policy) -> bool:
+    """Match like Network.setBlockedURLs.
+
+    In urls only * is a wildcard, across the whole URL. urlPatterns match
+    scheme, host and path separately, as URLPattern does.
+    """
+    if any(glob(pattern, url) for pattern in policy.patterns()):
+        return True
+    parts = urlsplit(url)
+    for pattern in policy.domain_patterns():
+        scheme, rest = pattern.split("://", 1)
+        host, path = rest.split("/", 1)
+        if glob(scheme, parts.scheme) and glob(host, parts.hostname) and glob("/" + path, parts.path or "/"):
+            return True
+    return False
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://example.com/logo.png", True),
+        ("https://cdn.example.com/photos/cat.jpeg", True),
+        ("https://example.com/photo.webp?width=300", True),
+        ("https://example.com/index.html", False),
+        ("https://example.com/app.js", False),
+    ],
+)
+def test_images_policy(url, expected):
+    assert blocked(url, get_policy("images")) is expected
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://www.google-analytics.com/collect?v=1", True),
+        ("https://google-analytics.com/analytics.js", True),
+        ("https://stats.g.doubleclick.net/r/collect", True),
+        ("https://notdoubleclick.net/page", False),
+        ("https://example.com/doubleclick.net", False),
+        ("https://site.com/r?u=https://x.doubleclick.net/", False),
+        ("https://site.com/r?u=https://doubleclick.net/", False),
+    ],
+)
+def test_tracker_domains(url, expected):
+    assert blocked(url, get_policy("no-trackers")) is expected
+
+
+def test_exempt_domains_only_leave_the_deny_list():
+    policy = BlockingPolicy(
+        "test",
+        resource_types=("Font",),
+        deny_domains=("doubleclick.net", "hotjar.com", "static.hotjar.com"),
+        exempt_domains=("hotjar.com",),
+    )
+
+    assert blocked("https://ad.doubleclick.net/x", policy)
+    assert not blocked("https://hotjar.com/tag", policy)
+    assert not blocked("https://static.hotjar.com/c/hotjar.js", policy)
+    # Not an allowlist, unlisted hosts load and resource types still apply.
+    assert not blocked("https://example.com/", policy)
+    assert blocked("https://hotjar.com/font.woff2", policy)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        get_policy("everything")
+
+
+class FakeDriver:
+    """Driver whose performance log holds one blocked image per page."""
+
+    def __init__(self) -> None:
+        self.commands = []
+        self.pending = []
+
+    def execute_cdp_cmd(self, method, params):
+        self.commands.append((method, params))
+
+    def load_page(self):
+        params = {"blockedReason": "inspector", "type": "Image"}
+        self.pending.append({"message": json.dumps({"message": {"method": "Network.loadingFailed", "params": params}})})
+
+    def get_log(self, _name):
+        entries, self.pending = self.pending, []
+        return entries
+
+
+def test_blocker_sends_domains_as_url_patterns():
+    driver = FakeDriver()
+    ResourceBlocker(driver, "lean").apply()
+    method, params = driver.commands[-1]
+    assert method == "Network.setBlockedURLs"
+    assert "*.png" in params["urls"]
+    assert {"urlPattern": "*://*.doubleclick.net/*", "block": True} in params["urlPatterns"]
+
+
+def test_counts_survive_a_new_blocker():
+    driver = FakeDriver()
+    blocker = ResourceBlocker(driver, "images")
+    driver.load_page()
+    blocker.collect()
+
+    restarted = FakeDriver()
+    blocker = ResourceBlocker(restarted, "images", stats=blocker.stats(collect=False))
+    restarted.load_page()
+
+    assert blocker.stats()["images"]["blocked"] == 2
+    assert blocker.stats()["images"]["by_type"] == {"Image": 2}
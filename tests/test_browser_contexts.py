@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""ContextHost tabs next to the scraping helpers, on the stub WebDriver."""
+
+import pytest
+
+from benchmarks.run import FixtureServer, StubChromeSeleniumDrive
+from benchmarks.stub_webdriver import StubConfig, StubWebDriver
+from chrome_manager.browser_contexts import ContextHost, ContextSession
+from chrome_manager.recycling import RecyclePolicy
+
+CONFIG = StubConfig(session_latency=0, navigation_latency=0.005, load_latency=0.005, selector_delay=0)
+
+
+@pytest.fixture
+def fixtures():
+    server = FixtureServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def drive():
+    with StubWebDriver(CONFIG) as stub:
+        drive = StubChromeSeleniumDrive(stub.url, headless=True, recycle_policy=RecyclePolicy(max_pages=100))
+        drive.create_driver()
+        yield drive
+        drive.quit()
+
+
+def add_context_tab(drive, url):
+    """Register a tab as a context session, CDP contexts are not in the stub."""
+    host = drive.context_host = ContextHost(drive)
+    driver = drive.driver
+    driver.switch_to.new_window("tab")
+    handle = driver.current_window_handle
+    driver.get(url)
+    host.sessions[handle] = ContextSession(host, "context", handle)
+    return host, handle
+
+
+def test_scrap_tab_two_leaves_context_tabs_alone(drive, fixtures):
+    host, handle = add_context_tab(drive, fixtures.url("page.html"))
+
+    for _ in range(2):
+        assert drive.scrap_tab_two(fixtures.url("page.html"), wait_time=0) is not None
+        assert handle in drive.driver.window_handles
+        assert drive.driver.current_window_handle == host.default_handle
+
+    host.switch(handle)
+    assert drive.driver.current_url == fixtures.url("page.html")
+
+
+def test_switch_follows_windows_changed_behind_the_host(drive, fixtures):
+    host, handle = add_context_tab(drive, fixtures.url("page.html"))
+    host.switch(handle)
+    drive.driver.switch_to.window(host.default_handle)
+
+    host.switch(handle)
+    assert drive.driver.current_window_handle == handle
+
+
+def test_context_pages_count_in_session_health(drive, fixtures):
+    host, handle = add_context_tab(drive, fixtures.url("page.html"))
+    assert host.sessions[handle].scrap(fixtures.url("page.html"), wait_time=5) is not None
+    assert drive.session_health.pages == 1
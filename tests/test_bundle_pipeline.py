@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""Streamed zip extraction and hash checks of bundle_pipeline."""
+
+import hashlib
+import io
+import os
+import stat
+import zipfile
+
+import pytest
+
+from chrome_manager.bundle_pipeline import download_and_extract, stream_extract
+
+BINARY = os.urandom(300 * 1024)
+TEXT = b"chrome for testing\n" * 5000
+
+
+class Unseekable(io.RawIOBase):
+    """Write only stream, makes zipfile use data descriptors."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+
+class FakeResponse:
+    def __init__(self, body, piece=1000) -> None:
+        self.body = body
+        self.piece = piece
+        self.headers = {"Content-Length": str(len(body))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, _chunk_size):
+        for start in range(0, len(self.body), self.piece):
+            yield self.body[start : start + self.piece]
+
+
+class FakeSession:
+    def __init__(self, body) -> None:
+        self.body = body
+
+    def get(self, _url, stream=True, timeout=None):  # pylint: disable=unused-argument
+        return FakeResponse(self.body)
+
+
+def unix_entry(name, mode):
+    info = zipfile.ZipInfo(name)
+    info.create_system = 3
+    info.external_attr = mode << 16
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def bundle(fileobj=None, license_compression=zipfile.ZIP_STORED) -> bytes:
+    target = fileobj or io.BytesIO()
+    with zipfile.ZipFile(target, "w") as archive:
+        archive.writestr("chrome-linux64/", b"")
+        archive.writestr(unix_entry("chrome-linux64/chrome", stat.S_IFREG | 0o755), BINARY)
+        archive.writestr("chrome-linux64/LICENSE", TEXT, compress_type=license_compression)
+        archive.writestr(unix_entry("chrome-linux64/chrome-link", stat.S_IFLNK | 0o777), b"chrome")
+    return bytes(target.buffer) if fileobj else target.getvalue()
+
+
+def check_tree(root):
+    folder = root / "chrome-linux64"
+    assert (folder / "chrome").read_bytes() == BINARY
+    assert os.access(folder / "chrome", os.X_OK)
+    assert (folder / "LICENSE").read_bytes() == TEXT
+    assert os.readlink(folder / "chrome-link") == "chrome"
+
+
+def test_extracts_stored_deflated_modes_and_symlinks(tmp_path):
+    body = bundle()
+    sha256 = stream_extract("http://bundle", str(tmp_path), session=FakeSession(body))
+    assert sha256 == hashlib.sha256(body).hexdigest()
+    check_tree(tmp_path)
+
+
+def test_extracts_members_with_data_descriptors(tmp_path):
+    body = bundle(Unseekable(), license_compression=zipfile.ZIP_DEFLATED)
+    assert zipfile.ZipFile(io.BytesIO(body)).getinfo("chrome-linux64/").flag_bits & 0x08
+    stream_extract("http://bundle", str(tmp_path), session=FakeSession(body))
+    check_tree(tmp_path)
+
+
+def test_stored_member_with_data_descriptor_is_refused(tmp_path):
+    # Its size is only known after the data, so it cannot be streamed.
+    with pytest.raises(ValueError):
+        stream_extract("http://bundle", str(tmp_path), session=FakeSession(bundle(Unseekable())))
+
+
+def test_hash_mismatch(tmp_path):
+    with pytest.raises(IOError):
+        stream_extract("http://bundle", str(tmp_path), session=FakeSession(bundle()), expected_sha256="0" * 64)
+
+
+def test_corrupted_member_fails_crc(tmp_path):
+    body = bytearray(bundle())
+    offset = body.index(TEXT[:40])
+    body[offset] ^= 0xFF
+    with pytest.raises(IOError):
+        stream_extract("http://bundle", str(tmp_path), session=FakeSession(bytes(body)))
+
+
+def test_member_outside_dest_is_refused(tmp_path):
+    target = io.BytesIO()
+    with zipfile.ZipFile(target, "w") as archive:
+        archive.writestr("../evil.sh", b"echo")
+    with pytest.raises(IOError):
+        stream_extract("http://bundle", str(tmp_path / "dest"), session=FakeSession(target.getvalue()))
+    assert not (tmp_path / "evil.sh").exists()
+
+
+def test_download_and_extract_keeps_dest_on_failure(tmp_path):
+    dest = tmp_path / "chrome"
+    download_and_extract("http://bundle", str(dest), session=FakeSession(bundle()))
+    check_tree(dest)
+
+    with pytest.raises(IOError):
+        download_and_extract("http://bundle", str(dest), session=FakeSession(b"not a zip" * 10))
+    check_tree(dest)
+    assert os.listdir(tmp_path) == ["chrome"]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""ShardedCrawler worker supervision, with fake drives instead of Chrome."""
+
+import os
+
+import pytest
+
+from chrome_manager.crawler import MemoryAdmission, ShardedCrawler
+
+
+class FakeDrive:
+    """Drive that kills its process on URLs containing "crash"."""
+
+    service = None
+
+    def __init__(self, marker_dir) -> None:
+        self.marker_dir = marker_dir
+
+    def scrap_tab_two(self, url):
+        marker = os.path.join(self.marker_dir, url.replace("/", "_"))
+        if "crash" in url and ("always" in url or not os.path.exists(marker)):
+            open(marker, "w", encoding="utf8").close()
+            os._exit(1)  # pylint: disable=protected-access
+        return f"<html>{url}</html>"
+
+    def quit(self):
+        pass
+
+
+def fake_factory(drive_kwargs, _options_kwargs):
+    return FakeDrive(drive_kwargs["marker_dir"])
+
+
+def broken_factory(_drive_kwargs, _options_kwargs):
+    raise RuntimeError("chromedriver not found")
+
+
+def crawler(tmp_path, **kwargs):
+    kwargs.setdefault("drive_factory", fake_factory)
+    return ShardedCrawler(
+        drive_kwargs={"marker_dir": str(tmp_path)},
+        admission=MemoryAdmission(reserve_bytes=0, default_browser_bytes=0),
+        poll_interval=0.05,
+        restart_backoff=0.01,
+        **kwargs,
+    )
+
+
+def test_url_of_dead_worker_is_requeued(tmp_path):
+    sharded = crawler(tmp_path, workers=1)
+    results = {url: (output, error) for url, output, error in sharded.run(["a", "crash", "b"])}
+    assert results == {url: (f"<html>{url}</html>", None) for url in ("a", "crash", "b")}
+    assert sharded.worker_deaths == 1
+
+
+def test_url_killing_every_worker_fails_after_its_attempts(tmp_path):
+    sharded = crawler(tmp_path, workers=2, url_attempts=2)
+    results = {url: error for url, _, error in sharded.run(["always-crash", "a"])}
+    assert results == {"always-crash": "worker morreu", "a": None}
+    assert sharded.worker_deaths == 2
+
+
+def test_crawl_aborts_when_every_shard_fails_to_start(tmp_path):
+    sharded = crawler(tmp_path, workers=2, max_restarts=2, drive_factory=broken_factory)
+    with pytest.raises(RuntimeError):
+        list(sharded.run(["a", "b"]))
+    assert sharded.worker_deaths == 4
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""download_file against a local http.server that honours Range."""
+
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from chrome_manager.downloader import _Download, download_file, probe
+from chrome_manager.storage import write_json
+
+PAYLOAD = bytes(range(256)) * 256
+ETAG = '"payload-v1"'
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serve PAYLOAD, with or without Range support."""
+
+    ranges = True
+    short = None
+    requests = []
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.send_header("ETag", ETAG)
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        header = self.headers.get("Range")
+        self.requests.append(header)
+        if not header or not self.ranges:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(PAYLOAD)
+            return
+        start, _, end = header[len("bytes="):].partition("-")
+        start, end = int(start), int(end) if end else len(PAYLOAD) - 1
+        if self.short:
+            end = min(end, start + self.short - 1)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(PAYLOAD[start : end + 1])
+
+
+@pytest.fixture
+def server():
+    RangeHandler.ranges = True
+    RangeHandler.short = None
+    RangeHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/payload.bin"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def save_state(tmp_path, mode, segments):
+    state = {"mode": mode, "size": len(PAYLOAD), "etag": ETAG, "segments": segments}
+    write_json(str(tmp_path / "payload.bin.part.json"), state)
+
+
+def fetch(url, dest, **kwargs):
+    return download_file(url, dest, session=requests.Session(), min_segment_size=8 * 1024, **kwargs)
+
+
+def test_ranged_download_splits_in_segments(server, tmp_path):
+    dest = tmp_path / "payload.bin"
+    sha = hashlib.sha256(PAYLOAD).hexdigest()
+
+    assert fetch(server, dest, segments=4, expected_sha256=sha) == str(dest)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert sorted(RangeHandler.requests) == [
+        "bytes=0-16383",
+        "bytes=16384-32767",
+        "bytes=32768-49151",
+        "bytes=49152-65535",
+    ]
+    assert not (tmp_path / "payload.bin.part").exists()
+    assert not (tmp_path / "payload.bin.part.json").exists()
+
+
+def test_ranged_download_resumes_from_state(server, tmp_path):
+    dest = tmp_path / "payload.bin"
+    part = bytearray(len(PAYLOAD))
+    part[:1000] = PAYLOAD[:1000]
+    part[32768:40000] = PAYLOAD[32768:40000]
+    (tmp_path / "payload.bin.part").write_bytes(bytes(part))
+    segments = [[0, 32767, 1000], [32768, 65535, 40000 - 32768]]
+    save_state(tmp_path, "ranged", segments)
+
+    fetch(server, dest, segments=2)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert sorted(RangeHandler.requests) == ["bytes=1000-32767", "bytes=40000-65535"]
+
+
+def test_short_range_responses_fail(server, tmp_path):
+    RangeHandler.short = 100
+    dest = tmp_path / "payload.bin"
+
+    with pytest.raises(IOError):
+        download_file(server, dest, session=requests.Session(), min_segment_size=8 * 1024, retries=1)
+
+    assert not dest.exists()
+
+
+def test_streamed_download_ignores_ranged_state(server, tmp_path):
+    dest = tmp_path / "payload.bin"
+    (tmp_path / "payload.bin.part").write_bytes(bytes(len(PAYLOAD)))
+    segments = [[0, 32767, 32768], [32768, 65535, 32768]]
+    save_state(tmp_path, "ranged", segments)
+
+    fetch(server, dest, segments=1)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert RangeHandler.requests == [None]
+
+
+def test_streamed_download_resumes_from_saved_offset(server, tmp_path):
+    dest = tmp_path / "payload.bin"
+    # Bytes past the saved offset are not trusted, even if they are on disk.
+    (tmp_path / "payload.bin.part").write_bytes(PAYLOAD[:1000] + bytes(500))
+    segments = [[0, len(PAYLOAD) - 1, 1000]]
+    save_state(tmp_path, "streamed", segments)
+
+    fetch(server, dest, segments=1)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert RangeHandler.requests == ["bytes=1000-"]
+
+
+def test_streamed_download_without_range_support(server, tmp_path):
+    RangeHandler.ranges = False
+    dest = tmp_path / "payload.bin"
+
+    fetch(server, dest)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert RangeHandler.requests == [None]
+
+
+def test_hash_mismatch_drops_partial_file(server, tmp_path):
+    dest = tmp_path / "payload.bin"
+
+    with pytest.raises(IOError):
+        fetch(server, dest, expected_sha256="0" * 64)
+
+    assert not dest.exists()
+    assert not (tmp_path / "payload.bin.part").exists()
+    assert not (tmp_path / "payload.bin.part.json").exists()
+
+
+def test_stopped_segment_writes_nothing(server, tmp_path):
+    session = requests.Session()
+    download = _Download(tmp_path / "payload.bin", session, probe(session, server), None)
+    (tmp_path / "payload.bin.part").write_bytes(bytes(len(PAYLOAD)))
+    segment = [0, len(PAYLOAD) - 1, 0]
+
+    download.stop.set()
+    download.fetch_segment(segment, timeout=5, retries=0)
+
+    assert segment[2] == 0
+    assert not RangeHandler.requests
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""DriverPool spawn retries and shutdown, with fake drives instead of Chrome."""
+
+import threading
+from time import perf_counter, sleep
+
+import pytest
+
+from chrome_manager import driver_pool
+from chrome_manager.driver_pool import DriverPool
+
+
+class FakeDrive:
+    def __init__(self, service, **_kwargs) -> None:
+        self.service = service
+        self.quits = 0
+
+    def set_options(self, **_kwargs):
+        return None
+
+    def create_driver(self, _options=None):
+        pass
+
+    def quit(self):
+        self.quits += 1
+
+
+class FlakyFactory:
+    """Service factory failing its first failures calls."""
+
+    def __init__(self, failures) -> None:
+        self.failures = failures
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise RuntimeError("chromedriver not found")
+        return object()
+
+
+@pytest.fixture(autouse=True)
+def fake_drive(monkeypatch):
+    monkeypatch.setattr(driver_pool, "ChromeSeleniumDrive", FakeDrive)
+
+
+def test_failed_spawn_is_retried():
+    factory = FlakyFactory(failures=2)
+    with DriverPool(size=1, service_factory=factory, spawn_backoff=0.01, max_spawn_failures=5) as pool:
+        drive = pool.acquire(timeout=5)
+        assert isinstance(drive, FakeDrive)
+        assert pool.get_stats()["spawn_failures"] == 2
+
+
+def test_waiting_acquirers_fail_after_consecutive_failures():
+    factory = FlakyFactory(failures=1000)
+    with DriverPool(size=1, service_factory=factory, spawn_backoff=0.01, max_spawn_failures=2) as pool:
+        errors = []
+
+        def wait():
+            try:
+                pool.acquire(timeout=10)
+            except RuntimeError as error:
+                errors.append(error)
+
+        waiters = [threading.Thread(target=wait) for _ in range(3)]
+        for waiter in waiters:
+            waiter.start()
+        for waiter in waiters:
+            waiter.join(timeout=10)
+        assert len(errors) == 3
+        assert pool.get_stats()["idle"] == 0
+
+
+def test_pool_recovers_after_failures():
+    factory = FlakyFactory(failures=2)
+    with DriverPool(size=1, service_factory=factory, spawn_backoff=0.05, max_spawn_failures=2) as pool:
+        with pytest.raises(RuntimeError):
+            pool.acquire(timeout=10)
+        deadline = perf_counter() + 10
+        while pool.get_stats()["spawned"] == 0 and perf_counter() < deadline:
+            sleep(0.01)
+        assert isinstance(pool.acquire(timeout=10), FakeDrive)
+
+
+def test_close_does_not_wait_for_backoff():
+    pool = DriverPool(size=2, service_factory=FlakyFactory(failures=1000), spawn_backoff=30, max_spawn_failures=1)
+    with pytest.raises(RuntimeError):
+        pool.acquire(timeout=10)
+    started = perf_counter()
+    pool.close()
+    assert perf_counter() - started < 5
+    assert pool.get_stats()["pending"] == 0
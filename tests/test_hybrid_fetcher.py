@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""Escalation heuristics and DomainTable of the HybridFetcher."""
+
+import pytest
+
+from chrome_manager import hybrid_fetcher
+from chrome_manager.hybrid_fetcher import DomainTable, HybridFetcher
+
+ARTICLE = "<p>" + "Texto visivel da pagina. " * 20 + "</p>"
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, content_type="text/html; charset=utf-8") -> None:
+        self.text = text
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type}
+
+
+class FakeDrive:
+    user_agent = "Mozilla/5.0 test"
+
+
+@pytest.fixture
+def table(tmp_path):
+    table = DomainTable(str(tmp_path / "needs_js.sqlite"), min_samples=2, ratio=0.5, ttl=60)
+    yield table
+    table.close()
+
+
+@pytest.fixture
+def fetcher(table):
+    return HybridFetcher(FakeDrive(), session=object(), required_selectors=("div.card#main",), table=table)
+
+
+def page(body):
+    return FakeResponse(f"<html><head><title>t</title></head><body>{body}</body></html>")
+
+
+def test_good_page_is_not_escalated(fetcher):
+    assert fetcher.escalation_reason(page(ARTICLE + '<div id="main" class="card big"></div>')) is None
+
+
+@pytest.mark.parametrize(
+    "response, reason",
+    [
+        (FakeResponse("", status_code=403), "status 403"),
+        (page("<noscript>Please enable JavaScript to continue.</noscript>" + ARTICLE), "noscript"),
+        (page("<p>This app requires JavaScript.</p>" + ARTICLE), "noscript"),
+        (page('<div id="main" class="card"></div><p>pouco texto</p>'), "empty body"),
+        (page(ARTICLE + '<div id="main"></div>'), "missing selectors"),
+    ],
+)
+def test_escalation_reasons(fetcher, response, reason):
+    assert fetcher.escalation_reason(response) == reason
+
+
+def test_markers_in_scripts_and_attributes_are_ignored(fetcher):
+    body = (
+        '<script>if (!window.x) alert("enable javascript");</script>'
+        '<a title="requires javascript" href="#">link</a>'
+        + ARTICLE
+        + '<div id="main" class="card"></div>'
+    )
+    assert fetcher.escalation_reason(page(body)) is None
+
+
+def test_non_html_is_never_escalated(fetcher):
+    assert fetcher.escalation_reason(FakeResponse("{}", content_type="application/json")) is None
+
+
+def test_domain_needs_js_after_enough_samples(table):
+    table.record("spa.example", True)
+    assert not table.needs_js("spa.example")
+    table.record("spa.example", True)
+    assert table.needs_js("spa.example")
+    for _ in range(3):
+        table.record("spa.example", False)
+    assert not table.needs_js("spa.example")
+
+
+def test_stale_domain_is_probed_and_relearned(table, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(hybrid_fetcher, "time", lambda: now[0])
+    for _ in range(5):
+        table.record("spa.example", True)
+    assert table.needs_js("spa.example")
+
+    now[0] += 61
+    assert not table.needs_js("spa.example")
+    table.record("spa.example", False)
+    table.record("spa.example", True)
+    assert not table.needs_js("spa.example")
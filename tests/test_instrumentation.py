@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""Command timing and response sizes recorded by Instrumentation."""
+
+from chrome_manager.instrumentation import Instrumentation
+
+
+class FakeExecutor:
+    def execute(self, command, _params):
+        if command == "getPageSource":
+            return {"value": "<p>ação ✓</p>"}
+        return {"value": None}
+
+
+class FakeDriver:
+    def __init__(self) -> None:
+        self.command_executor = FakeExecutor()
+
+
+def test_response_bytes_are_utf8_bytes():
+    driver = FakeDriver()
+    instrumentation = Instrumentation()
+    instrumentation.attach(driver)
+
+    driver.command_executor.execute("getPageSource", {})
+    driver.command_executor.execute("get", {"url": "about:blank"})
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot["response_bytes"] == {"getPageSource": len("<p>ação ✓</p>".encode("utf-8"))}
+    assert snapshot["commands"]["get"]["count"] == 1
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""NetworkIdleStrategy fed by performance log events."""
+
+import json
+
+from chrome_manager.load_strategies import TIMINGS_SCRIPT, NetworkIdleStrategy
+
+
+def event(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+class FakeDriver:
+    """Tab TAB whose own request finishes while an other frame keeps one open."""
+
+    current_window_handle = "TAB"
+
+    def __init__(self) -> None:
+        self.pending = [
+            event("Network.requestWillBeSent", requestId="1", frameId="TAB"),
+            event("Network.requestWillBeSent", requestId="2", frameId="OTHER"),
+            event("Network.loadingFinished", requestId="1"),
+        ]
+        self.scripts = []
+
+    def get_log(self, _name):
+        entries, self.pending = self.pending, []
+        return entries
+
+    def execute_script(self, _script):
+        return "complete"
+
+    def set_script_timeout(self, _seconds):
+        pass
+
+    def execute_async_script(self, script, *_args):
+        self.scripts.append(script)
+        return {"ok": True, "state": "complete", "timings": {"load": 1.0}}
+
+
+def test_counts_requests_of_the_current_tab_only():
+    driver = FakeDriver()
+    result = NetworkIdleStrategy(0, idle_time=0.02, poll_interval=0.01).wait(driver, 5, network_events=True)
+
+    assert result.ok
+    assert result.timings == {"load": 1.0}
+    assert driver.scripts == [TIMINGS_SCRIPT]
+
+
+def test_no_timings_once_wait_time_is_spent():
+    driver = FakeDriver()
+    driver.current_window_handle = "OTHER"
+    result = NetworkIdleStrategy(0, idle_time=0.02, poll_interval=0.01).wait(driver, 0.1, network_events=True)
+
+    assert not result.ok
+    assert driver.scripts == []
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""PageCache store, expiry and LRU eviction."""
+
+import os
+
+import pytest
+
+from chrome_manager import page_cache
+from chrome_manager.page_cache import PageCache, normalize_url
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(page_cache, "time", clock)
+    return clock
+
+
+def page(seed) -> str:
+    """Return html that does not compress, so sizes are predictable."""
+    return f"<html>{seed}{os.urandom(4096).hex()}</html>"
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com:443/a?b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_put_and_get(tmp_path, clock):
+    cache = PageCache(str(tmp_path))
+    html = page("a")
+    cache.put("https://example.com/a?y=1&x=2", html)
+
+    assert cache.get("https://EXAMPLE.com/a?x=2&y=1#frag") == html
+    assert cache.get("https://example.com/a?y=1&x=2", variant="mobile") is None
+    assert cache.get("https://example.com/b") is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+
+
+def test_expired_entries_are_dropped(tmp_path, clock):
+    cache = PageCache(str(tmp_path), ttl=60)
+    cache.put("https://example.com/", page("a"))
+    key = cache.key("https://example.com/")
+
+    clock.now += 61
+    assert cache.get("https://example.com/") is None
+    assert cache.stats["expired"] == 1
+    assert not os.path.exists(cache.blob_path(key))
+    assert cache.size() == 0
+
+
+def test_least_recently_used_is_evicted(tmp_path, clock):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.com/a", page("a"))
+    cache.max_bytes = int(cache.size() * 2.5)
+    cache.put("https://example.com/b", page("b"))
+    assert cache.get("https://example.com/a") is not None
+
+    cache.put("https://example.com/c", page("c"))
+
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a") is not None
+    assert cache.get("https://example.com/c") is not None
+    assert cache.stats["evictions"] == 1
+    assert not os.path.exists(cache.blob_path(cache.key("https://example.com/b")))
+    assert cache.size() <= cache.max_bytes
+
+
+def test_missing_blob_is_a_miss(tmp_path, clock):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.com/", page("a"))
+    os.remove(cache.blob_path(cache.key("https://example.com/")))
+
+    assert cache.get("https://example.com/") is None
+    assert cache.stats["misses"] == 1
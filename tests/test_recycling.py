@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""RecyclePolicy triggers and the pages counted by the scraping helpers."""
+
+import pytest
+
+from benchmarks.run import FixtureServer, StubChromeSeleniumDrive
+from benchmarks.stub_webdriver import StubConfig, StubWebDriver
+from chrome_manager.recycling import RecyclePolicy, SessionHealth
+
+CONFIG = StubConfig(session_latency=0, navigation_latency=0.005, load_latency=0.005, selector_delay=0)
+PAGES_ONLY = {"max_rss": None, "max_age": None}
+
+
+@pytest.fixture
+def fixtures():
+    server = FixtureServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def stub():
+    with StubWebDriver(CONFIG) as stub:
+        yield stub
+
+
+def test_max_pages_trigger():
+    health = SessionHealth(RecyclePolicy(max_pages=3, **PAGES_ONLY))
+    for _ in range(2):
+        health.record_page(0.1)
+    assert health.reason() is None
+    health.record_page(0.1)
+    assert health.reason() == "3 paginas carregadas"
+
+
+def test_scrap_tab_two_recycles_after_max_pages(stub, fixtures):
+    drive = StubChromeSeleniumDrive(stub.url, headless=True, recycle_policy=RecyclePolicy(max_pages=2, **PAGES_ONLY))
+    drive.create_driver()
+    try:
+        for _ in range(3):
+            assert drive.scrap_tab_two(fixtures.url(), wait_time=0) is not None
+        assert drive.recycles == 1
+        assert drive.session_health.pages == 1
+    finally:
+        drive.quit()
+
+
+def test_scrap_tabs_counts_pages(stub, fixtures):
+    drive = StubChromeSeleniumDrive(stub.url, headless=True, recycle_policy=RecyclePolicy(max_pages=3, **PAGES_ONLY))
+    drive.create_driver()
+    try:
+        assert len(list(drive.scrap_tabs([fixtures.url()] * 3, tabs=2, wait_time=10))) == 3
+        assert drive.session_health.pages == 3
+        assert drive.recycles == 0
+
+        list(drive.scrap_tabs([fixtures.url()], tabs=1, wait_time=10))
+        assert drive.recycles == 1
+        assert drive.session_health.pages == 1
+    finally:
+        drive.quit()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""SessionSupervisor failover, with fake drives instead of Chrome."""
+
+import threading
+from time import monotonic, sleep
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+
+from chrome_manager.supervisor import SessionSupervisor
+
+
+class FakeDriver:
+    """Just the WebDriver calls the supervisor makes."""
+
+    def __init__(self, fail_get=False) -> None:
+        self.dead = False
+        self.fail_get = fail_get
+        self.scripts = []
+        self.visited = []
+
+    @property
+    def current_window_handle(self):
+        if self.dead:
+            raise InvalidSessionIdException("dead")
+        return "MAIN"
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+
+    def execute_cdp_cmd(self, cmd, _params):
+        if self.dead:
+            raise InvalidSessionIdException("dead")
+        if cmd == "Target.getTargetInfo":
+            return {"targetInfo": {"url": "https://example.com/page"}}
+        if cmd == "Network.getAllCookies":
+            return {"cookies": [{"name": "a", "value": "1"}]}
+        return {}
+
+    def get(self, url):
+        if self.fail_get:
+            raise WebDriverException("navigation failed")
+        self.visited.append(url)
+
+
+class FakeDrive:
+    service = None
+
+    def __init__(self, fail_get=False) -> None:
+        self.driver = FakeDriver(fail_get)
+        self.quit_called = threading.Event()
+
+    def quit(self):
+        self.quit_called.set()
+
+
+class Factory:
+    """Hand out drives, slowly after the first ones."""
+
+    def __init__(self, fast=2, delay=2.0, fail_get_from=None) -> None:
+        self.fast = fast
+        self.delay = delay
+        self.fail_get_from = fail_get_from
+        self.drives = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            index = len(self.drives)
+            drive = FakeDrive(fail_get=self.fail_get_from is not None and index >= self.fail_get_from)
+            self.drives.append(drive)
+        if index >= self.fast:
+            sleep(self.delay)
+        return drive
+
+
+def wait_until(predicate, timeout=3.0):
+    deadline = monotonic() + timeout
+    while not predicate():
+        if monotonic() > deadline:
+            return False
+        sleep(0.01)
+    return True
+
+
+def test_failover_for_an_already_replaced_session_does_not_wait():
+    factory = Factory()
+    supervisor = SessionSupervisor(factory=factory, heartbeat_interval=60)
+    try:
+        first = supervisor.active
+        assert wait_until(lambda: supervisor._standby is not None)  # pylint: disable=protected-access
+        second = supervisor.failover(dead=first)
+        assert second is not first
+        started = monotonic()
+        # The replacement standby takes 2s to launch, this must not wait for it.
+        assert supervisor.failover(dead=first) is second
+        assert monotonic() - started < 0.5
+    finally:
+        supervisor.close()
+
+
+def test_failed_replay_still_quits_dead_browser_and_respawns():
+    factory = Factory(fast=3, fail_get_from=1)
+    supervisor = SessionSupervisor(factory=factory, heartbeat_interval=60)
+    try:
+        first = supervisor.active
+        supervisor.last_url = "https://example.com/page"
+        assert wait_until(lambda: supervisor._standby is not None)  # pylint: disable=protected-access
+        with pytest.raises(WebDriverException):
+            supervisor.failover(dead=first)
+        assert first.quit_called.wait(1)
+        assert wait_until(lambda: len(factory.drives) == 3)
+    finally:
+        supervisor.close()
+
+
+def test_heartbeat_leaves_prompts_alone_and_survives_failover_errors():
+    factory = Factory(fast=3, fail_get_from=1)
+    supervisor = SessionSupervisor(factory=factory, heartbeat_interval=0.02, cookie_every=2)
+    try:
+        first = supervisor.active
+        assert wait_until(lambda: supervisor.cookies and supervisor.last_url)
+        assert not first.driver.scripts
+        first.driver.dead = True
+        assert wait_until(lambda: supervisor.active is not first)
+        assert supervisor._heartbeat.is_alive()  # pylint: disable=protected-access
+    finally:
+        supervisor.close()
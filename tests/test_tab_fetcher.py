@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""TabFetcher on the stub WebDriver."""
+
+import pytest
+
+from benchmarks.run import FixtureServer, StubChromeSeleniumDrive
+from benchmarks.stub_webdriver import StubConfig, StubWebDriver
+from chrome_manager.tab_fetcher import TabFetcher
+
+CONFIG = StubConfig(session_latency=0, navigation_latency=0.05, load_latency=0.05, selector_delay=0)
+
+
+@pytest.fixture
+def fixtures():
+    server = FixtureServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def drive():
+    with StubWebDriver(CONFIG) as stub:
+        drive = StubChromeSeleniumDrive(stub.url, headless=True)
+        drive.create_driver()
+        yield drive
+        drive.quit()
+
+
+def test_fetch_skips_none_and_closes_its_tabs(drive, fixtures):
+    url = fixtures.url()
+    results = list(TabFetcher(drive, tabs=2, wait_time=10, poll_interval=0.01).fetch([None, url, None, url, url]))
+
+    assert len(results) == 3
+    assert all(result_url == url and html for result_url, html, _timings in results)
+    assert drive.driver.window_handles == [drive.driver.current_window_handle]
+
+
+def test_total_includes_the_wait_for_a_tab(drive, fixtures):
+    urls = [fixtures.url()] * 3
+    timings = [timings for _, _, timings in TabFetcher(drive, tabs=1, poll_interval=0.01).fetch(urls)]
+
+    # Each page takes about 0.1s to load, the second URL waited for the first.
+    assert all(timing["total"] >= timing["load"] for timing in timings)
+    assert timings[1]["total"] - timings[1]["load"] >= 0.05